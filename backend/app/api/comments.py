@@ -1,24 +1,46 @@
 """Task comments API endpoints (audit trail)."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 from typing import Optional
-from uuid import uuid4
+from concurrent.futures import wait
+from app.config import settings
 from app.core.database import get_db
 from app.core.models import Task, TaskComment, CommentType
 from app.core.schemas import (
     TaskCommentCreate,
     TaskCommentResponse,
     TaskCommentListResponse,
+    TaskCommentBatchCreate,
+    TaskCommentBatchResponse,
 )
+from app.services import run_versions
+from app.services.comments import (
+    comment_projection,
+    comment_values,
+    insert_comments,
+)
+from app.services.events import comment_event_data, publish_event
+from app.services.file_refs import insert_file_refs
+from app.services.comment_buffer import (
+    BufferFullError,
+    CommentWriteBuffer,
+    get_comment_buffer,
+)
+from app.services.response_cache import ResponseCache, get_response_cache, versioned_response
+from app.utils.pagination import paginate
+from app.utils.responses import row_dicts, schema_columns
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/tasks/{task_id}/comments", tags=["Comments"])
+batch_router = APIRouter(prefix="/api/comments", tags=["Comments"])
+
+# Keyset sort key for list_comments: newest first (served by idx_comment_task_created)
+COMMENT_SORT_KEY = [(TaskComment.created_at, True), (TaskComment.id, True)]
 
 
 @router.post("", response_model=TaskCommentResponse, status_code=201)
-async def create_comment(
+def create_comment(
     task_id: str,
     comment_data: TaskCommentCreate,
     db: Session = Depends(get_db),
@@ -29,90 +51,83 @@ async def create_comment(
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Validate comment type
     try:
-        comment_type = CommentType[comment_data.comment_type.upper()]
-    except KeyError:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid comment_type. Choose from: {', '.join([c.value for c in CommentType])}"
-        )
+        values = comment_values(task_id, comment_data)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
-    new_comment = TaskComment(
-        id=str(uuid4()),
-        task_id=task_id,
-        agent_id=comment_data.agent_id,
-        agent_role=comment_data.agent_role,
-        comment_type=comment_type,
-        title=comment_data.title,
-        content=comment_data.content,
-        work_summary=comment_data.work_summary,
-        approach=comment_data.approach,
-        challenges=comment_data.challenges,
-        solutions=comment_data.solutions,
-        time_spent_hours=comment_data.time_spent_hours,
-        files_created=comment_data.files_created,
-        files_modified=comment_data.files_modified,
-        git_commits=comment_data.git_commits,
-        git_branch=comment_data.git_branch,
-        pr_url=comment_data.pr_url,
-        needs_review=comment_data.needs_review,
-        confidence_level=comment_data.confidence_level,
-        blockers=comment_data.blockers,
-        next_steps=comment_data.next_steps,
-        metrics=comment_data.metrics,
-        vulnerabilities_found=comment_data.vulnerabilities_found,
-        critical_issues=comment_data.critical_issues,
-    )
+    new_comment = TaskComment(**values)
     db.add(new_comment)
+    db.flush()
+    insert_file_refs(db, [values])
+    run_versions.bump(db, [task.project_run_id])
     db.commit()
     db.refresh(new_comment)
+    publish_event(task.project_run_id, "comment.created", **comment_event_data(new_comment))
 
-    logger.info(f"✅ Created comment on task {task_id}: {comment_data.title} (agent={comment_data.agent_id})")
+    logger.info("✅ Created comment on task %s: %s (agent=%s)", task_id, comment_data.title, comment_data.agent_id)
     return TaskCommentResponse.model_validate(new_comment)
 
 
 @router.get("", response_model=TaskCommentListResponse)
-async def list_comments(
+def list_comments(
     task_id: str,
+    request: Request,
     comment_type: Optional[str] = Query(None, description="Filter by comment type"),
     agent_id: Optional[str] = Query(None, description="Filter by agent"),
+    view: str = Query("full", description="summary (title/type/agent/time) or full"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to add to the summary view"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matches (skip for cheap deep paging)"),
     db: Session = Depends(get_db),
-) -> TaskCommentListResponse:
-    """List comments for a task with optional filtering."""
-    # Verify task exists
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
+    cache: Optional[ResponseCache] = Depends(get_response_cache),
+) -> Response:
+    """List comments for a task with optional filtering.
 
-    query = db.query(TaskComment).filter(TaskComment.task_id == task_id)
+    ``view=summary`` (or any ``fields``) loads only the listed columns, leaving
+    the heavy text, array and JSONB columns in the database. Rows are
+    serialized directly (see app.utils.responses). Conditional and cacheable
+    on the task's run version.
+    """
+    try:
+        columns = comment_projection(view, fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
+    ct = None
     if comment_type:
         try:
             ct = CommentType[comment_type.upper()]
-            query = query.filter(TaskComment.comment_type == ct)
         except KeyError:
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid comment_type. Choose from: {', '.join([c.value for c in CommentType])}"
             )
 
-    if agent_id:
-        query = query.filter(TaskComment.agent_id == agent_id)
+    # Verify task exists (and get its run's version)
+    run_version = run_versions.task_run_version(db, task_id)
+    if not run_version:
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    def load():
+        selected = schema_columns(TaskComment, TaskCommentResponse, columns)
+        query = db.query(*selected).filter(TaskComment.task_id == task_id)
+        if ct is not None:
+            query = query.filter(TaskComment.comment_type == ct)
+        if agent_id:
+            query = query.filter(TaskComment.agent_id == agent_id)
 
-    total = query.count()
-    comments = query.order_by(desc(TaskComment.created_at)).offset(skip).limit(limit).all()
+        total = query.count() if include_total else None
+        rows, next_cursor = paginate(query, COMMENT_SORT_KEY, limit, skip=skip, cursor=cursor)
+        return {"comments": row_dicts(rows, selected), "total": total, "next_cursor": next_cursor}
 
-    return TaskCommentListResponse(
-        comments=[TaskCommentResponse.model_validate(c) for c in comments],
-        total=total,
-    )
+    return versioned_response(request, run_version.version, run_version.updated_at, load, cache)
 
 
 @router.get("/{comment_id}", response_model=TaskCommentResponse)
-async def get_comment(
+def get_comment(
     task_id: str,
     comment_id: str,
     db: Session = Depends(get_db),
@@ -125,3 +140,70 @@ async def get_comment(
     if not comment:
         raise HTTPException(status_code=404, detail="Comment not found")
     return TaskCommentResponse.model_validate(comment)
+
+
+@batch_router.post("/batch", response_model=TaskCommentBatchResponse, status_code=201)
+def create_comments_batch(
+    batch: TaskCommentBatchCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    buffer: Optional[CommentWriteBuffer] = Depends(get_comment_buffer),
+) -> TaskCommentBatchResponse:
+    """Create many comments, possibly across tasks, in one request.
+
+    Without the write-behind buffer the batch is one multi-row INSERT and
+    one commit. With it, rows are coalesced with other requests' comments;
+    ``durability=commit`` waits for the flush, ``durability=enqueue``
+    returns 202 as soon as the rows are queued.
+    """
+    task_ids = {c.task_id for c in batch.comments}
+    task_runs = dict(db.query(Task.id, Task.project_run_id).filter(Task.id.in_(task_ids)))
+    if task_runs.keys() != task_ids:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Tasks not found: {', '.join(sorted(task_ids - task_runs.keys()))}"
+        )
+
+    try:
+        rows = [comment_values(c.task_id, c) for c in batch.comments]
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    comment_ids = [row["id"] for row in rows]
+
+    def publish(row):
+        publish_event(task_runs[row["task_id"]], "comment.created", **comment_event_data(row))
+
+    def publish_when_flushed(row):
+        def callback(future):
+            if future.exception() is None:
+                publish(row)
+        return callback
+
+    if buffer is None:
+        insert_comments(db, rows)
+        db.commit()
+        for row in rows:
+            publish(row)
+        durability = "commit"
+    else:
+        try:
+            futures = buffer.submit(rows)
+        except BufferFullError:
+            raise HTTPException(status_code=503, detail="Comment buffer is full, retry later")
+        # Events go out once the buffer has actually written the rows
+        for row, future in zip(rows, futures):
+            future.add_done_callback(publish_when_flushed(row))
+
+        durability = batch.durability
+        if durability == "commit":
+            done, _ = wait(futures, timeout=settings.comment_buffer_ack_timeout)
+            if len(done) != len(futures):
+                raise HTTPException(status_code=504, detail="Timed out waiting for comment flush")
+            failed = [f.exception() for f in done if f.exception() is not None]
+            if failed:
+                raise failed[0]
+        else:
+            response.status_code = 202
+
+    logger.info("✅ Created %d comments across %d tasks (%s)", len(rows), len(task_ids), durability)
+    return TaskCommentBatchResponse(comment_ids=comment_ids, total=len(rows), durability=durability)
@@ -0,0 +1,55 @@
+"""Real-time run events over WebSocket."""
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
+from app.config import settings
+from app.services.event_hub import RunEventHub, Subscription, get_event_hub
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Events"])
+
+# Close code for consumers dropped for falling behind (RFC 6455 "try again later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+async def _pump(websocket: WebSocket, subscription: Subscription):
+    """Forward queued events to the socket, with heartbeats when idle."""
+    heartbeat = json.dumps({"type": "heartbeat", "run_id": subscription.run_id})
+    while not subscription.dropped:
+        try:
+            message = await asyncio.wait_for(subscription.queue.get(), settings.events_ws_heartbeat)
+        except asyncio.TimeoutError:
+            message = heartbeat
+        await websocket.send_text(message)
+    await websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Slow consumer")
+
+
+@router.websocket("/ws/runs/{run_id}")
+async def run_events(
+    websocket: WebSocket,
+    run_id: str,
+    hub: RunEventHub = Depends(get_event_hub),
+):
+    """Stream a run's task/comment/run events as JSON text frames.
+
+    Consumers that fall ``EVENTS_WS_QUEUE_SIZE`` events behind are closed
+    with code 1013 and should reconnect.
+    """
+    subscription = await hub.subscribe(run_id)
+    await websocket.accept()
+    pump = asyncio.create_task(_pump(websocket, subscription))
+    try:
+        # Inbound frames are ignored; receiving detects the disconnect
+        while not pump.done():
+            receive = asyncio.create_task(websocket.receive_text())
+            done, _ = await asyncio.wait({receive, pump}, return_when=asyncio.FIRST_COMPLETED)
+            if receive not in done:
+                receive.cancel()
+            else:
+                receive.result()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        pump.cancel()
+        await hub.unsubscribe(subscription)
@@ -0,0 +1,54 @@
+"""File and commit lookup API endpoints."""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from typing import Optional
+from app.core.database import get_db
+from app.core.schemas import CommitCommentsResponse, FileTaskTouch, FileTasksResponse
+from app.services import file_refs
+from app.services.comments import comment_projection, comment_summary, project_comments
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api", tags=["Lookups"])
+
+
+@router.get("/files/tasks", response_model=FileTasksResponse)
+def list_file_tasks(
+    path: str = Query(..., max_length=500),
+    prefix: bool = Query(False, description="Match every path starting with `path` (use a trailing / for a directory)"),
+    project_run_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+) -> FileTasksResponse:
+    """Tasks whose comments created or modified a file, most recently touched first."""
+    try:
+        rows = file_refs.tasks_touching(db, path, prefix=prefix, project_run_id=project_run_id, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return FileTasksResponse(
+        path=file_refs.normalize_path(path),
+        prefix=prefix,
+        tasks=[FileTaskTouch.model_validate(row) for row in rows],
+    )
+
+
+@router.get("/commits/{sha}/comments", response_model=CommitCommentsResponse)
+def list_commit_comments(
+    sha: str,
+    project_run_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+) -> CommitCommentsResponse:
+    """Comments that record a git commit, newest first."""
+    try:
+        query = file_refs.comments_for_commit_query(db, sha, project_run_id=project_run_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    columns = comment_projection("summary", None)
+    comments = project_comments(query, columns).limit(limit).all()
+    return CommitCommentsResponse(
+        sha=file_refs.normalize_sha(sha),
+        comments=[comment_summary(comment, columns) for comment in comments],
+    )
@@ -1,27 +1,38 @@
 """Projects API endpoints."""
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 from typing import Optional
 from uuid import uuid4
 from datetime import datetime
 from app.core.database import get_db
-from app.core.models import Project, ProjectRun, ProjectTemplate, ProjectStatus
+from app.core.models import Project, ProjectRun, ProjectStatus
 from app.core.schemas import (
+    CostBreakdownResponse,
     ProjectCreate,
     ProjectResponse,
     ProjectListResponse,
 )
+from app.services import config_resolver, cost_analytics
+from app.services.template_cache import TemplateCache, get_template_cache
+from app.utils.pagination import paginate
+from app.utils.responses import row_dicts, schema_columns
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/projects", tags=["Projects"])
 
+# Keyset sort key for list_projects: newest first
+PROJECT_SORT_KEY = [(Project.created_at, True), (Project.id, True)]
+PROJECT_COLUMNS = schema_columns(Project, ProjectResponse)
+
 
 @router.post("", response_model=ProjectResponse, status_code=201)
-async def create_project(
+def create_project(
     project_data: ProjectCreate,
     db: Session = Depends(get_db),
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
 ) -> ProjectResponse:
     """Create a new project."""
     # Check if project with same name exists
@@ -33,15 +44,18 @@ async def create_project(
         )
 
     # Verify template exists if specified
-    if project_data.template_id:
-        template = db.query(ProjectTemplate).filter(
-            ProjectTemplate.id == project_data.template_id
-        ).first()
-        if not template:
-            raise HTTPException(
-                status_code=404,
-                detail=f"Template '{project_data.template_id}' not found"
-            )
+    patch = config_resolver.template_patch(db, cache, project_data.template_id)
+    if project_data.template_id and patch is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Template '{project_data.template_id}' not found"
+        )
+
+    # Reject overrides that cannot produce a valid config before any run starts
+    try:
+        config_resolver.resolve_config(patch, project_data.config_overrides)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
 
     new_project = Project(
         id=str(uuid4()),
@@ -50,24 +64,27 @@ async def create_project(
         requirements_text=project_data.requirements_text,
         status=ProjectStatus.DRAFT,
         template_id=project_data.template_id,
+        config_overrides=project_data.config_overrides,
     )
     db.add(new_project)
     db.commit()
     db.refresh(new_project)
 
-    logger.info(f"✅ Created project: {project_data.name} (id={new_project.id})")
+    logger.info("✅ Created project: %s (id=%s)", project_data.name, new_project.id)
     return ProjectResponse.model_validate(new_project)
 
 
 @router.get("", response_model=ProjectListResponse)
-async def list_projects(
+def list_projects(
     status: Optional[str] = Query(None, description="Filter by status"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matches (skip for cheap deep paging)"),
     db: Session = Depends(get_db),
-) -> ProjectListResponse:
-    """List projects with optional filtering."""
-    query = db.query(Project)
+) -> ORJSONResponse:
+    """List projects with optional filtering (rows serialized directly, see app.utils.responses)."""
+    query = db.query(*PROJECT_COLUMNS)
 
     if status:
         try:
@@ -79,17 +96,14 @@ async def list_projects(
                 detail=f"Invalid status. Choose from: {', '.join([s.value for s in ProjectStatus])}"
             )
 
-    total = query.count()
-    projects = query.order_by(desc(Project.created_at)).offset(skip).limit(limit).all()
+    total = query.count() if include_total else None
+    rows, next_cursor = paginate(query, PROJECT_SORT_KEY, limit, skip=skip, cursor=cursor)
 
-    return ProjectListResponse(
-        projects=[ProjectResponse.model_validate(p) for p in projects],
-        total=total,
-    )
+    return ORJSONResponse({"projects": row_dicts(rows, PROJECT_COLUMNS), "total": total, "next_cursor": next_cursor})
 
 
 @router.get("/{project_id}", response_model=ProjectResponse)
-async def get_project(
+def get_project(
     project_id: str,
     db: Session = Depends(get_db),
 ) -> ProjectResponse:
@@ -101,7 +115,7 @@ async def get_project(
 
 
 @router.patch("/{project_id}", response_model=ProjectResponse)
-async def update_project(
+def update_project(
     project_id: str,
     name: Optional[str] = None,
     description: Optional[str] = None,
@@ -136,12 +150,12 @@ async def update_project(
     db.commit()
     db.refresh(project)
 
-    logger.info(f"✅ Updated project: {project.name}")
+    logger.info("✅ Updated project: %s", project.name)
     return ProjectResponse.model_validate(project)
 
 
 @router.get("/{project_id}/runs")
-async def get_project_runs(
+def get_project_runs(
     project_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
@@ -169,3 +183,23 @@ async def get_project_runs(
         } for r in runs],
         "total": total,
     }
+
+
+@router.get("/{project_id}/cost-breakdown", response_model=CostBreakdownResponse)
+def get_project_cost_breakdown(
+    project_id: str,
+    bucket: str = Query("day", description="minute, hour or day"),
+    window: int = Query(7, ge=1, le=1000, description="Buckets in the rolling burn rate"),
+    db: Session = Depends(get_db),
+) -> CostBreakdownResponse:
+    """Token spend across all of a project's runs, by run, model, role, agent and time bucket."""
+    project = db.query(Project).filter(Project.id == project_id).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    frame = cost_analytics.load_usage(db, cost_analytics.project_run_ids(project_id))
+    try:
+        breakdown = cost_analytics.cost_breakdown(frame, bucket, window, groups=("run", "model", "role", "agent"))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return CostBreakdownResponse(**breakdown)
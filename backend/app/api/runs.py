@@ -1,50 +1,158 @@
 """Project runs API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func
-from typing import Optional
+from typing import Callable, List, Optional, Sequence
 from uuid import uuid4
 from datetime import datetime
-from app.core.database import get_db
+from app.core.database import get_db, get_session_factory
 from app.core.models import Project, ProjectRun, Task, ProjectRunStatus
-from app.core.schemas import ProjectRunResponse
+from app.core.schemas import (
+    BudgetStatus,
+    CommentSearchResponse,
+    CostBreakdownResponse,
+    ModelDecisionRequest,
+    ModelDecisionResponse,
+    ProjectRunCreate,
+    ProjectRunResponse,
+    TaskResponse,
+    TaskListResponse,
+    TaskTreeResponse,
+    UsageCreate,
+    UsageResponse,
+)
+from app.services import (
+    budget_ledger,
+    comment_search,
+    comment_stream,
+    config_resolver,
+    cost_analytics,
+    metrics,
+    run_counters,
+    run_versions,
+    scheduler,
+    task_tree,
+)
+from app.services.budget_ledger import BudgetLedger, LedgerFullError, get_budget_ledger
+from app.services.event_hub import RunEventHub, get_event_hub
+from app.services.events import publish_event
+from app.services.response_cache import ResponseCache, get_response_cache, versioned_response
+from app.services.template_cache import TemplateCache, get_template_cache
+from app.utils import tokens
+from app.utils.responses import row_dicts, schema_columns
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/runs", tags=["Runs"])
 
+TASK_COLUMNS = schema_columns(Task, TaskResponse)
+
+# Blob-backed fields: decompressed only when a client asks for them
+RUN_BLOB_FIELDS = ["config_snapshot", "final_report"]
+
+
+def parse_include(include: Optional[str]) -> List[str]:
+    """Validate a comma-separated list of blob-backed fields."""
+    names = [name.strip() for name in (include or "").split(",") if name.strip()]
+    unknown = sorted(set(names) - set(RUN_BLOB_FIELDS))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid include. Choose from: {', '.join(RUN_BLOB_FIELDS)}"
+        )
+    return names
+
+
+def run_response(run: ProjectRun, include: Sequence[str] = ()) -> ProjectRunResponse:
+    """Serialize a run, loading only the requested blob-backed fields."""
+    values = {
+        name: getattr(run, name)
+        for name in ProjectRunResponse.model_fields
+        if name not in RUN_BLOB_FIELDS or name in include
+    }
+    return ProjectRunResponse.model_validate(values)
+
+
+def run_summary(db: Session, run: ProjectRun, breakdown: bool) -> dict:
+    """The body of GET /api/runs/{run_id}/summary."""
+    counters = run_counters.get_counters(db, run.id)
+    task_counts = run_counters.counters_to_dict(counters)
+
+    progress_percent = 0
+    if task_counts["total"] > 0:
+        progress_percent = int((task_counts["done"] / task_counts["total"]) * 100)
+
+    summary = {
+        "run_id": run.id,
+        "project_id": run.project_id,
+        "run_number": run.run_number,
+        "status": run.status.value,
+        "task_counts": task_counts,
+        "progress_percent": progress_percent,
+        "hours": {
+            "estimate": round(counters.estimate_hours, 2),
+            "actual": round(counters.actual_hours, 2),
+        },
+        "budget_spent_usd_estimate": run.budget_spent_usd_estimate,
+        "budget_spent_tokens": {
+            "input": run.budget_spent_input_tokens,
+            "output": run.budget_spent_output_tokens,
+        },
+        "started_at": run.started_at,
+        "ended_at": run.ended_at,
+    }
+
+    if breakdown:
+        aggregate = run_counters.aggregate_run_tasks(db, run.id)
+        summary["task_counts_by_type"] = aggregate["by_type"]
+        summary["task_counts_by_agent"] = aggregate["by_agent"]
+
+    return summary
+
 
 @router.post("/projects/{project_id}/start", response_model=ProjectRunResponse, status_code=201)
-async def start_run(
+def start_run(
     project_id: str,
+    run_data: Optional[ProjectRunCreate] = None,
     db: Session = Depends(get_db),
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
 ) -> ProjectRunResponse:
-    """Start a new run for a project."""
+    """Start a new run for a project.
+
+    The run's config is the defaults overlaid with the template's
+    ``config_patch``, the project's overrides and ``run_data.config_overrides``.
+    """
     project = db.query(Project).filter(Project.id == project_id).first()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    try:
+        resolved = config_resolver.resolve_config(
+            config_resolver.template_patch(db, cache, project.template_id),
+            project.config_overrides,
+            run_data.config_overrides if run_data else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
     # Get next run number
     last_run = db.query(func.max(ProjectRun.run_number)).filter(
         ProjectRun.project_id == project_id
     ).scalar() or 0
     run_number = last_run + 1
 
-    # Create run with default config snapshot (in Phase 2, merge with template)
+    # Identical configs share one snapshot row
     new_run = ProjectRun(
         id=str(uuid4()),
         project_id=project_id,
         run_number=run_number,
-        config_snapshot={
-            "team": {"agents_count": 3, "roles_enabled": {"pm": 1, "dev": 1}},
-            "planning": {"target_tasks": 20},
-            "process": {"review_iterations": 1},
-            "quality": {"complexity": "MVP"},
-            "budget": {"max_usd": 2.0},
-        },
+        config_snapshot_hash=config_resolver.store_snapshot(db, resolved),
         status=ProjectRunStatus.QUEUED,
     )
     db.add(new_run)
+    db.flush()
+    run_counters.create_counters(db, new_run.id)
     db.commit()
     db.refresh(new_run)
 
@@ -52,75 +160,263 @@ async def start_run(
     project.active_run_id = new_run.id
     project.updated_at = datetime.utcnow()
     db.commit()
+    publish_event(new_run.id, "run.created", project_id=project_id, run_number=run_number, status=new_run.status)
 
-    logger.info(f"✅ Started run {run_number} for project {project.name} (run_id={new_run.id})")
-    return ProjectRunResponse.model_validate(new_run)
+    logger.info("✅ Started run %d for project %s (run_id=%s)", run_number, project.name, new_run.id)
+    return run_response(new_run, include=["config_snapshot"])
 
 
 @router.get("/{run_id}", response_model=ProjectRunResponse)
-async def get_run(
+def get_run(
     run_id: str,
+    request: Request,
+    include: Optional[str] = Query(None, description="Comma-separated: config_snapshot, final_report"),
     db: Session = Depends(get_db),
-) -> ProjectRunResponse:
-    """Get a specific run."""
+) -> Response:
+    """Get a specific run (ETag from the run's versions; 304 on If-None-Match)."""
+    names = parse_include(include)
     run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
-    return ProjectRunResponse.model_validate(run)
+    return versioned_response(
+        request, run_versions.spend_version(run), run.updated_at,
+        lambda: run_response(run, include=names).model_dump(mode="json"),
+    )
 
 
 @router.get("/{run_id}/summary")
-async def get_run_summary(
+def get_run_summary(
     run_id: str,
+    request: Request,
+    breakdown: bool = Query(False, description="Include per-type and per-agent task counts"),
     db: Session = Depends(get_db),
-):
-    """Get run summary with task counts and progress."""
+    cache: Optional[ResponseCache] = Depends(get_response_cache),
+) -> Response:
+    """Get run summary with task counts and progress.
+
+    Status counts and hour totals come from the run's counters row (O(1));
+    ``breakdown=true`` adds one GROUP BY over the run's tasks. Conditional
+    and cacheable on the run's versions (the summary includes spend).
+    """
     run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
+    return versioned_response(
+        request, run_versions.spend_version(run), run.updated_at, lambda: run_summary(db, run, breakdown), cache,
+    )
 
-    # Count tasks by status
-    task_counts = {
-        "total": 0,
-        "pending": 0,
-        "in_progress": 0,
-        "blocked": 0,
-        "review": 0,
-        "done": 0,
-        "failed": 0,
-    }
 
-    tasks = db.query(Task).filter(Task.project_run_id == run_id).all()
-    task_counts["total"] = len(tasks)
-    for task in tasks:
-        task_counts[task.status.value.lower()] = task_counts.get(task.status.value.lower(), 0) + 1
+@router.post("/{run_id}/usage", response_model=UsageResponse, status_code=201)
+def record_usage(
+    run_id: str,
+    usage_data: UsageCreate,
+    db: Session = Depends(get_db),
+    ledger: Optional[BudgetLedger] = Depends(get_budget_ledger),
+) -> UsageResponse:
+    """Record one LLM call's token usage against the run's budget."""
+    if ledger is not None:
+        # Aggregated in memory; run totals are written with the next ledger flush
+        try:
+            usage = ledger.add_usage(run_id, **usage_data.model_dump())
+        except LedgerFullError:
+            raise HTTPException(status_code=503, detail="Budget ledger is full, retry later")
+        if usage is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return UsageResponse(**usage, budget=ledger.tracker(run_id).get_status())
 
-    progress_percent = 0
-    if task_counts["total"] > 0:
-        progress_percent = int((task_counts["done"] / task_counts["total"]) * 100)
+    run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
 
-    return {
-        "run_id": run.id,
-        "project_id": run.project_id,
-        "run_number": run.run_number,
-        "status": run.status.value,
-        "task_counts": task_counts,
-        "progress_percent": progress_percent,
-        "budget_spent_usd_estimate": run.budget_spent_usd_estimate,
-        "budget_spent_tokens": {
-            "input": run.budget_spent_input_tokens,
-            "output": run.budget_spent_output_tokens,
-        },
-        "started_at": run.started_at,
-        "ended_at": run.ended_at,
-    }
+    tracker = budget_ledger.run_tracker(run)
+    usage = tracker.add_usage(usage_data.model, usage_data.input_tokens, usage_data.output_tokens)
+    budget_ledger.apply_usage(db, [budget_ledger.usage_row(
+        run_id, usage, usage_data.task_id, usage_data.agent_id, usage_data.agent_role,
+    )])
+    db.commit()
+    metrics.record_usage(usage)
+    return UsageResponse(**usage, budget=tracker.get_status())
+
+
+@router.get("/{run_id}/budget", response_model=BudgetStatus)
+def get_run_budget(
+    run_id: str,
+    db: Session = Depends(get_db),
+    ledger: Optional[BudgetLedger] = Depends(get_budget_ledger),
+) -> BudgetStatus:
+    """The run's spend against its budget (includes usage not yet flushed)."""
+    if ledger is not None:
+        tracker = ledger.tracker(run_id)
+    else:
+        run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
+        tracker = budget_ledger.run_tracker(run) if run else None
+    if tracker is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return BudgetStatus(**tracker.get_status())
+
+
+@router.post("/{run_id}/model-decision", response_model=ModelDecisionResponse)
+def decide_model(
+    run_id: str,
+    request: ModelDecisionRequest,
+    db: Session = Depends(get_db),
+    ledger: Optional[BudgetLedger] = Depends(get_budget_ledger),
+) -> ModelDecisionResponse:
+    """Choose the model for an agent's next call, degrading ahead of the budget limit."""
+    if ledger is not None:
+        guard = ledger.guard(run_id)
+    else:
+        run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
+        guard = budget_ledger.load_guard(db, run) if run else None
+    if guard is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    prompt_tokens = request.prompt_tokens
+    if prompt_tokens is None:
+        model = guard.role_model(request.role)
+        prompt_tokens = (
+            tokens.estimate_tokens(request.prompt, model) if request.prompt is not None
+            else tokens.estimate_tokens_from_length(request.prompt_chars or 0, model)
+        )
+    decision = guard.decide(request.role, prompt_tokens, request.max_output_tokens)
+    if decision.action != "allow":
+        logger.info(
+            "💸 Run %s %s: %s %s -> %s (%s)",
+            run_id, request.role, decision.action, decision.requested_model, decision.model, decision.reason,
+        )
+    return ModelDecisionResponse(
+        **decision._asdict(),
+        burn_rate_usd_per_hour=round(guard.burn_rate() * 3600, 6),
+    )
+
+
+@router.get("/{run_id}/cost-breakdown", response_model=CostBreakdownResponse)
+def get_run_cost_breakdown(
+    run_id: str,
+    bucket: str = Query("hour", description="minute, hour or day"),
+    window: int = Query(6, ge=1, le=1000, description="Buckets in the rolling burn rate"),
+    db: Session = Depends(get_db),
+    ledger: Optional[BudgetLedger] = Depends(get_budget_ledger),
+) -> CostBreakdownResponse:
+    """Token spend by model, role, agent and time bucket, with a budget projection."""
+    run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    frame = cost_analytics.load_usage(db, [run_id])
+    try:
+        breakdown = cost_analytics.cost_breakdown(frame, bucket, window)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    tracker = (ledger.tracker(run_id) if ledger is not None else None) or budget_ledger.run_tracker(run)
+    now = datetime.utcnow()
+    window_seconds = cost_analytics.BUCKETS[bucket] * window
+    breakdown["projection"] = cost_analytics.projection(
+        tracker, cost_analytics.recent_burn_rate(frame, window_seconds, now), now,
+    )
+    return CostBreakdownResponse(**breakdown)
+
+
+@router.get("/{run_id}/ready", response_model=TaskListResponse)
+def get_ready_tasks(
+    run_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+) -> ORJSONResponse:
+    """List tasks that can start now (PENDING, unassigned, dependencies DONE)."""
+    run = db.query(ProjectRun.id).filter(ProjectRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    rows = scheduler.ready_tasks_query(db, run_id).with_entities(*TASK_COLUMNS).limit(limit).all()
+    return ORJSONResponse({"tasks": row_dicts(rows, TASK_COLUMNS), "total": len(rows), "next_cursor": None})
+
+
+@router.get("/{run_id}/comments/search", response_model=CommentSearchResponse)
+def search_run_comments(
+    run_id: str,
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms (web-search syntax on Postgres)"),
+    mode: str = Query("text", description="text (ranked full-text) or substring"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    db: Session = Depends(get_db),
+) -> CommentSearchResponse:
+    """Search a run's comments by title, content and work summary."""
+    if not db.query(ProjectRun.id).filter(ProjectRun.id == run_id).first():
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    try:
+        hits, next_cursor = comment_search.search_comments(db, run_id, q, mode, limit, cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return CommentSearchResponse(hits=hits, mode=mode, next_cursor=next_cursor)
+
+
+@router.get("/{run_id}/comments/stream")
+def stream_run_comments(
+    run_id: str,
+    last_event_id: Optional[str] = Header(None, description="Resume after this event ID"),
+    after: Optional[str] = Query(None, description="Resume token for clients that cannot set Last-Event-ID"),
+    session_factory: Callable[[], Session] = Depends(get_session_factory),
+    hub: RunEventHub = Depends(get_event_hub),
+):
+    """Tail a run's comments as Server-Sent Events.
+
+    Replays comments after ``Last-Event-ID`` (oldest first), then pushes new
+    ones as they are created. Each event's ID is its resume token. Sessions
+    are opened per query, never held for the life of the stream.
+    """
+    with session_factory() as db:
+        found = db.query(ProjectRun.id).filter(ProjectRun.id == run_id).first()
+    if not found:
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    try:
+        resume_from = comment_stream.parse_last_event_id(last_event_id or after)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    return StreamingResponse(
+        comment_stream.stream_comments(session_factory, hub, run_id, resume_from),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{run_id}/tree", response_model=TaskTreeResponse)
+def get_run_tree(
+    run_id: str,
+    max_depth: int = Query(10, ge=0, le=50, description="Levels below the root(s) to include"),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to include"),
+    stream: bool = Query(False, description="Stream flat nodes as NDJSON (parents first)"),
+    db: Session = Depends(get_db),
+):
+    """Get a run's whole task hierarchy, loaded with one recursive query."""
+    if not db.query(ProjectRun.id).filter(ProjectRun.id == run_id).first():
+        raise HTTPException(status_code=404, detail="Run not found")
+
+    try:
+        names = task_tree.parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    statement = task_tree.tree_statement((Task.project_run_id == run_id) & Task.parent_task_id.is_(None), names, max_depth)
+    rows = task_tree.stream_rows(db, statement)
+    if stream:
+        return StreamingResponse(task_tree.to_ndjson(rows), media_type="application/x-ndjson")
+
+    nodes = list(rows)
+    return TaskTreeResponse(tasks=task_tree.assemble_tree(nodes), total=len(nodes), max_depth=max_depth)
 
 
 @router.patch("/{run_id}/status/{new_status}")
-async def update_run_status(
+def update_run_status(
     run_id: str,
     new_status: str,
     db: Session = Depends(get_db),
+    ledger: Optional[BudgetLedger] = Depends(get_budget_ledger),
 ):
     """Update run status (RUNNING, PAUSED, STOPPED_MANUAL, etc)."""
     run = db.query(ProjectRun).filter(ProjectRun.id == run_id).first()
@@ -139,7 +435,11 @@ async def update_run_status(
         run.started_at = datetime.utcnow()
     elif new_status.lower() in ["completed", "failed", "stopped_budget", "stopped_manual"]:
         run.ended_at = datetime.utcnow()
+        if ledger is not None:
+            ledger.expire(run_id)
 
+    run_versions.bump_run(run)
     db.commit()
-    logger.info(f"✅ Updated run {run_id} status to {new_status}")
+    publish_event(run_id, "run.updated", status=run.status)
+    logger.info("✅ Updated run %s status to %s", run_id, new_status)
     return {"run_id": run_id, "status": run.status.value}
@@ -1,7 +1,8 @@
 """Tasks API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import insert
 from typing import Optional, List
 from uuid import uuid4
 from datetime import datetime
@@ -9,18 +10,33 @@ from app.core.database import get_db
 from app.core.models import Task, ProjectRun, TaskStatus, TaskType
 from app.core.schemas import (
     TaskCreate,
+    TaskBulkCreate,
+    TaskBulkCreateResponse,
+    TaskClaimRequest,
+    TaskClaimResponse,
     TaskUpdate,
     TaskResponse,
     TaskListResponse,
+    TaskTreeResponse,
 )
+from app.services import run_counters, run_versions, scheduler, task_tree
+from app.services.events import publish_event
+from app.services.response_cache import versioned_response
+from app.services.task_graph import topological_order
+from app.utils.pagination import paginate
+from app.utils.responses import row_dicts, schema_columns
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/tasks", tags=["Tasks"])
 
+# Keyset sort key for list_tasks: highest priority first, then oldest first
+TASK_SORT_KEY = [(Task.priority, True), (Task.created_at, False), (Task.id, False)]
+TASK_COLUMNS = schema_columns(Task, TaskResponse)
+
 
 @router.post("", response_model=TaskResponse, status_code=201)
-async def create_task(
+def create_task(
     task_data: TaskCreate,
     db: Session = Depends(get_db),
 ) -> TaskResponse:
@@ -30,17 +46,13 @@ async def create_task(
     if not run:
         raise HTTPException(status_code=404, detail="Project run not found")
 
-    # Verify parent task exists if specified
-    if task_data.parent_task_id:
-        parent = db.query(Task).filter(Task.id == task_data.parent_task_id).first()
-        if not parent:
-            raise HTTPException(status_code=404, detail="Parent task not found")
-
-    # Verify dependencies exist
-    if task_data.dependencies:
-        deps = db.query(Task).filter(Task.id.in_(task_data.dependencies)).all()
-        if len(deps) != len(task_data.dependencies):
-            raise HTTPException(status_code=404, detail="Some dependent tasks not found")
+    # Verify parent task and dependencies exist (one round trip for both)
+    refs = {task_data.parent_task_id, *task_data.dependencies} - {None}
+    found = dict(db.query(Task.id, Task.status).filter(Task.id.in_(refs)).all()) if refs else {}
+    if task_data.parent_task_id and task_data.parent_task_id not in found:
+        raise HTTPException(status_code=404, detail="Parent task not found")
+    if not set(task_data.dependencies) <= found.keys():
+        raise HTTPException(status_code=404, detail="Some dependent tasks not found")
 
     new_task = Task(
         id=str(uuid4()),
@@ -52,28 +64,166 @@ async def create_task(
         status=TaskStatus.PENDING,
         priority=task_data.priority,
         dependencies=task_data.dependencies,
+        pending_dependencies=sum(1 for dep in set(task_data.dependencies) if found[dep] != TaskStatus.DONE),
         acceptance_criteria=task_data.acceptance_criteria,
         estimate_hours=task_data.estimate_hours,
     )
     db.add(new_task)
+    run_counters.record_tasks_created(db, run.id, 1, task_data.estimate_hours or 0.0)
+    run_versions.bump_run(run)
     db.commit()
     db.refresh(new_task)
+    publish_event(run.id, "task.created", task_id=new_task.id, title=new_task.title, status=new_task.status)
 
-    logger.info(f"✅ Created task: {task_data.title} (id={new_task.id})")
+    logger.info("✅ Created task: %s (id=%s)", task_data.title, new_task.id)
     return TaskResponse.model_validate(new_task)
 
 
+@router.post("/bulk", response_model=TaskBulkCreateResponse, status_code=201)
+def create_tasks_bulk(
+    plan: TaskBulkCreate,
+    db: Session = Depends(get_db),
+) -> TaskBulkCreateResponse:
+    """Create a whole task tree in one transaction (called by PM agent).
+
+    References between plan items use ``temp_id``; the dependency graph is
+    validated in memory and all rows go out in one multi-row INSERT.
+    """
+    run = db.query(ProjectRun).filter(ProjectRun.id == plan.project_run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Project run not found")
+
+    task_ids = {item.temp_id: str(uuid4()) for item in plan.tasks}
+    if len(task_ids) != len(plan.tasks):
+        raise HTTPException(status_code=400, detail="Duplicate temp_id in plan")
+
+    # References outside the plan must be existing tasks of the same run
+    external = {
+        ref
+        for item in plan.tasks
+        for ref in [item.parent_task_id, *item.dependencies]
+        if ref and ref not in task_ids
+    }
+    done_external = set()
+    if external:
+        found = {}
+        for task_id, task_status in db.query(Task.id, Task.status).filter(
+            Task.id.in_(external),
+            Task.project_run_id == plan.project_run_id,
+        ):
+            found[task_id] = task_status
+        done_external = {task_id for task_id, task_status in found.items() if task_status == TaskStatus.DONE}
+        if found.keys() != external:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Referenced tasks not found: {', '.join(sorted(external - found.keys()))}"
+            )
+
+    items = {item.temp_id: item for item in plan.tasks}
+    try:
+        # Dependencies only need to be acyclic (they are an array, not an FK);
+        # parent links decide insert order so the self-referencing FK holds.
+        # Kept apart, an epic may depend on its own subtasks.
+        topological_order({item.temp_id: item.dependencies for item in plan.tasks})
+        order = topological_order(
+            {item.temp_id: [item.parent_task_id] if item.parent_task_id else [] for item in plan.tasks},
+            kind="Parent",
+        )
+        task_types = {item.temp_id: TaskType[item.task_type.upper()] for item in plan.tasks}
+    except KeyError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid task_type. Choose from: {', '.join([t.value for t in TaskType])}"
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    def resolve(ref: Optional[str]) -> Optional[str]:
+        return task_ids.get(ref, ref)
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": task_ids[temp_id],
+            "project_run_id": plan.project_run_id,
+            "parent_task_id": resolve(items[temp_id].parent_task_id),
+            "title": items[temp_id].title,
+            "description": items[temp_id].description,
+            "task_type": task_types[temp_id],
+            "status": TaskStatus.PENDING,
+            "priority": items[temp_id].priority,
+            "dependencies": [resolve(dep) for dep in items[temp_id].dependencies],
+            "pending_dependencies": len(set(items[temp_id].dependencies) - done_external),
+            "acceptance_criteria": items[temp_id].acceptance_criteria,
+            "estimate_hours": items[temp_id].estimate_hours,
+            "created_at": now,
+        }
+        for temp_id in order
+    ]
+    # Parents precede children, so self-referencing FKs hold row by row
+    db.execute(insert(Task), rows)
+    run_counters.record_tasks_created(
+        db,
+        plan.project_run_id,
+        len(rows),
+        sum(item.estimate_hours or 0.0 for item in plan.tasks),
+    )
+    run_versions.bump(db, [plan.project_run_id])
+    db.commit()
+    publish_event(plan.project_run_id, "tasks.created", task_ids=list(task_ids.values()), count=len(rows))
+
+    logger.info("✅ Created %d tasks in run %s", len(rows), plan.project_run_id)
+    return TaskBulkCreateResponse(
+        project_run_id=plan.project_run_id,
+        task_ids=task_ids,
+        total=len(rows),
+    )
+
+
+@router.post("/claim", response_model=TaskClaimResponse)
+def claim_task(
+    claim: TaskClaimRequest,
+    db: Session = Depends(get_db),
+) -> TaskClaimResponse:
+    """Claim the highest-priority ready task of a run (called by workers).
+
+    A task is ready when it is PENDING, unassigned and all its dependencies
+    are DONE. Claims honor the run's ``team.max_parallel_tasks``.
+    """
+    run = db.query(ProjectRun).filter(ProjectRun.id == claim.project_run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Project run not found")
+
+    try:
+        task_types = [TaskType[t.upper()] for t in claim.task_types]
+    except KeyError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid task_type. Choose from: {', '.join([t.value for t in TaskType])}"
+        )
+
+    task, reason = scheduler.claim_task(db, run, claim.agent_id, task_types)
+    if task is None:
+        return TaskClaimResponse(task=None, reason=reason)
+    publish_event(run.id, "task.updated", task_id=task.id, status=task.status, assigned_agent_id=task.assigned_agent_id)
+
+    logger.info("✅ Task %s claimed by %s", task.id, claim.agent_id)
+    return TaskClaimResponse(task=TaskResponse.model_validate(task))
+
+
 @router.get("", response_model=TaskListResponse)
-async def list_tasks(
+def list_tasks(
     project_run_id: Optional[str] = Query(None, description="Filter by run"),
     status: Optional[str] = Query(None, description="Filter by status"),
     assigned_agent_id: Optional[str] = Query(None, description="Filter by assigned agent"),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matches (skip for cheap deep paging)"),
     db: Session = Depends(get_db),
-) -> TaskListResponse:
-    """List tasks with optional filtering."""
-    query = db.query(Task)
+) -> ORJSONResponse:
+    """List tasks with optional filtering (rows serialized directly, see app.utils.responses)."""
+    query = db.query(*TASK_COLUMNS)
 
     if project_run_id:
         query = query.filter(Task.project_run_id == project_run_id)
@@ -89,41 +239,48 @@ async def list_tasks(
     if assigned_agent_id:
         query = query.filter(Task.assigned_agent_id == assigned_agent_id)
 
-    total = query.count()
-    tasks = query.order_by(desc(Task.priority), Task.created_at).offset(skip).limit(limit).all()
+    total = query.count() if include_total else None
+    rows, next_cursor = paginate(query, TASK_SORT_KEY, limit, skip=skip, cursor=cursor)
 
-    return TaskListResponse(
-        tasks=[TaskResponse.model_validate(t) for t in tasks],
-        total=total,
-    )
+    return ORJSONResponse({"tasks": row_dicts(rows, TASK_COLUMNS), "total": total, "next_cursor": next_cursor})
 
 
 @router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(
+def get_task(
     task_id: str,
+    request: Request,
     db: Session = Depends(get_db),
-) -> TaskResponse:
-    """Get a specific task."""
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
+) -> Response:
+    """Get a specific task (ETag from its run's version; 304 on If-None-Match)."""
+    row = db.query(Task, ProjectRun.version, ProjectRun.updated_at).join(
+        ProjectRun, Task.project_run_id == ProjectRun.id
+    ).filter(Task.id == task_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Task not found")
-    return TaskResponse.model_validate(task)
+    task, version, updated_at = row
+    return versioned_response(
+        request, version, updated_at, lambda: TaskResponse.model_validate(task).model_dump(mode="json"),
+    )
 
 
 @router.patch("/{task_id}", response_model=TaskResponse)
-async def update_task(
+def update_task(
     task_id: str,
     update_data: TaskUpdate,
     db: Session = Depends(get_db),
 ) -> TaskResponse:
     """Update task status, assignment, priority, or actual hours."""
-    task = db.query(Task).filter(Task.id == task_id).first()
+    # Row lock keeps the run counters exact under concurrent status updates
+    task = db.query(Task).filter(Task.id == task_id).with_for_update().first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
     if update_data.status:
         try:
+            old_status = task.status
             task.status = TaskStatus[update_data.status.upper()]
+            run_counters.record_status_change(db, task.project_run_id, old_status, task.status)
+            scheduler.record_status_change(db, task, old_status, task.status)
             if update_data.status.upper() == "IN_PROGRESS" and not task.started_at:
                 task.started_at = datetime.utcnow()
             elif update_data.status.upper() in ["DONE", "FAILED"] and not task.completed_at:
@@ -141,27 +298,61 @@ async def update_task(
         task.priority = update_data.priority
 
     if update_data.actual_hours is not None:
+        run_counters.record_hours_change(
+            db, task.project_run_id, update_data.actual_hours - (task.actual_hours or 0.0)
+        )
         task.actual_hours = update_data.actual_hours
 
+    run_versions.bump(db, [task.project_run_id])
     db.commit()
     db.refresh(task)
+    publish_event(
+        task.project_run_id,
+        "task.updated",
+        task_id=task.id,
+        status=task.status,
+        assigned_agent_id=task.assigned_agent_id,
+    )
 
-    logger.info(f"✅ Updated task: {task.title}")
+    logger.info("✅ Updated task: %s", task.title)
     return TaskResponse.model_validate(task)
 
 
 @router.get("/{task_id}/subtasks", response_model=TaskListResponse)
-async def get_subtasks(
+def get_subtasks(
     task_id: str,
     db: Session = Depends(get_db),
-) -> TaskListResponse:
+) -> ORJSONResponse:
     """Get all subtasks of a parent task."""
-    parent = db.query(Task).filter(Task.id == task_id).first()
+    parent = db.query(Task.id).filter(Task.id == task_id).first()
     if not parent:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    subtasks = db.query(Task).filter(Task.parent_task_id == task_id).all()
-    return TaskListResponse(
-        tasks=[TaskResponse.model_validate(t) for t in subtasks],
-        total=len(subtasks),
-    )
+    rows = db.query(*TASK_COLUMNS).filter(Task.parent_task_id == task_id).all()
+    return ORJSONResponse({"tasks": row_dicts(rows, TASK_COLUMNS), "total": len(rows), "next_cursor": None})
+
+
+@router.get("/{task_id}/tree", response_model=TaskTreeResponse)
+def get_task_tree(
+    task_id: str,
+    max_depth: int = Query(10, ge=0, le=50, description="Levels below the root(s) to include"),
+    fields: Optional[str] = Query(None, description="Comma-separated task fields to include"),
+    stream: bool = Query(False, description="Stream flat nodes as NDJSON (parents first)"),
+    db: Session = Depends(get_db),
+):
+    """Get a task and all its descendants, loaded with one recursive query."""
+    if not db.query(Task.id).filter(Task.id == task_id).first():
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    try:
+        names = task_tree.parse_fields(fields)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    statement = task_tree.tree_statement(Task.id == task_id, names, max_depth)
+    rows = task_tree.stream_rows(db, statement)
+    if stream:
+        return StreamingResponse(task_tree.to_ndjson(rows), media_type="application/x-ndjson")
+
+    nodes = list(rows)
+    return TaskTreeResponse(tasks=task_tree.assemble_tree(nodes), total=len(nodes), max_depth=max_depth)
@@ -1,5 +1,6 @@
 """Project templates API endpoints."""
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional, List
 from uuid import uuid4
@@ -10,16 +11,28 @@ from app.core.schemas import (
     ProjectTemplateResponse,
     ProjectTemplateListResponse,
 )
+from app.services import template_cache
+from app.services.template_cache import TemplateCache, get_template_cache
+from app.utils.etag import conditional_response
+from app.utils.pagination import paginate
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/templates", tags=["Templates"])
 
+# Keyset sort key for list_templates: newest first
+TEMPLATE_SORT_KEY = [(ProjectTemplate.created_at, True), (ProjectTemplate.id, True)]
+
+# Templates never change, but lists and version sets grow: revalidate those
+IMMUTABLE_CACHE_CONTROL = "public, max-age=86400, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
 
 @router.post("", response_model=ProjectTemplateResponse, status_code=201)
-async def create_template(
+def create_template(
     template: ProjectTemplateCreate,
     db: Session = Depends(get_db),
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
 ) -> ProjectTemplateResponse:
     """Create a new project template.
     
@@ -49,59 +62,121 @@ async def create_template(
     db.add(new_template)
     db.commit()
     db.refresh(new_template)
+    if cache is not None:
+        cache.invalidate_name(new_template.name)
 
-    logger.info(f"✅ Created template: {template.name} v{template.version}")
-    return ProjectTemplateResponse.from_attributes(new_template)
+    logger.info("✅ Created template: %s v%s", template.name, template.version)
+    return ProjectTemplateResponse.model_validate(new_template)
 
 
 @router.get("", response_model=ProjectTemplateListResponse)
-async def list_templates(
+def list_templates(
+    request: Request,
+    response: Response,
     tag: Optional[str] = Query(None, description="Filter by tag"),
     is_system: Optional[bool] = Query(None, description="Filter by system templates"),
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page's next_cursor"),
+    include_total: bool = Query(True, description="Count all matches (skip for cheap deep paging)"),
     db: Session = Depends(get_db),
-) -> ProjectTemplateListResponse:
-    """List project templates with optional filtering."""
-    query = db.query(ProjectTemplate)
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
+):
+    """List project templates with optional filtering (rows serialized directly, see app.utils.responses)."""
+    def load():
+        query = db.query(*template_cache.TEMPLATE_COLUMNS)
 
-    if tag:
-        query = query.filter(ProjectTemplate.tags.contains([tag]))
-    if is_system is not None:
-        query = query.filter(ProjectTemplate.is_system == is_system)
+        if tag:
+            query = query.filter(ProjectTemplate.tags.contains([tag]))
+        if is_system is not None:
+            query = query.filter(ProjectTemplate.is_system == is_system)
 
-    total = query.count()
-    templates = query.order_by(ProjectTemplate.created_at.desc()).offset(skip).limit(limit).all()
+        total = query.count() if include_total else None
+        rows, next_cursor = paginate(query, TEMPLATE_SORT_KEY, limit, skip=skip, cursor=cursor)
+        return {
+            "templates": template_cache.serialize_template_rows(rows),
+            "total": total,
+            "next_cursor": next_cursor,
+        }
 
-    return ProjectTemplateListResponse(
-        templates=[ProjectTemplateResponse.from_attributes(t) for t in templates],
-        total=total,
+    key = template_cache.list_key(
+        tag=tag, is_system=is_system, skip=skip, limit=limit, cursor=cursor, include_total=include_total,
     )
+    entry = template_cache.read_through(cache, key, load)
+    return (
+        conditional_response(request, response, entry["etag"], REVALIDATE_CACHE_CONTROL)
+        or ORJSONResponse(entry["body"], headers=dict(response.headers))
+    )
+
+
+@router.get("/cache-stats")
+def get_template_cache_stats(
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
+):
+    """Template cache hit rates (per tier) and size."""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
 
 
 @router.get("/{template_id}", response_model=ProjectTemplateResponse)
-async def get_template(
+def get_template(
     template_id: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-) -> ProjectTemplateResponse:
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
+):
     """Get a specific project template."""
-    template = db.query(ProjectTemplate).filter(ProjectTemplate.id == template_id).first()
-    if not template:
+    def load():
+        template = db.query(ProjectTemplate).filter(ProjectTemplate.id == template_id).first()
+        return template_cache.serialize_template(template) if template else None
+
+    entry = template_cache.read_through(cache, template_cache.id_key(template_id), load)
+    if entry is None:
         raise HTTPException(status_code=404, detail="Template not found")
-    return ProjectTemplateResponse.from_attributes(template)
+    return conditional_response(request, response, entry["etag"], IMMUTABLE_CACHE_CONTROL) or entry["body"]
+
+
+@router.get("/by-name/{name}/{version}", response_model=ProjectTemplateResponse)
+def get_template_version(
+    name: str,
+    version: str,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
+):
+    """Get one version of a template by name."""
+    def load():
+        template = db.query(ProjectTemplate).filter(
+            ProjectTemplate.name == name,
+            ProjectTemplate.version == version,
+        ).first()
+        return template_cache.serialize_template(template) if template else None
+
+    entry = template_cache.read_through(cache, template_cache.version_key(name, version), load)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Template '{name}' version '{version}' not found")
+    return conditional_response(request, response, entry["etag"], IMMUTABLE_CACHE_CONTROL) or entry["body"]
 
 
 @router.get("/by-name/{name}", response_model=List[ProjectTemplateResponse])
-async def get_template_by_name(
+def get_template_by_name(
     name: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
-) -> List[ProjectTemplateResponse]:
+    cache: Optional[TemplateCache] = Depends(get_template_cache),
+):
     """Get all versions of a template by name (ordered by version descending)."""
-    templates = db.query(ProjectTemplate).filter(
-        ProjectTemplate.name == name
-    ).order_by(ProjectTemplate.version.desc()).all()
-    
-    if not templates:
+    def load():
+        templates = db.query(ProjectTemplate).filter(
+            ProjectTemplate.name == name
+        ).order_by(ProjectTemplate.version.desc()).all()
+        return [template_cache.serialize_template(t) for t in templates] or None
+
+    entry = template_cache.read_through(cache, template_cache.versions_key(name), load)
+    if entry is None:
         raise HTTPException(status_code=404, detail=f"No templates found with name '{name}'")
-    
-    return [ProjectTemplateResponse.from_attributes(t) for t in templates]
+    return conditional_response(request, response, entry["etag"], REVALIDATE_CACHE_CONTROL) or entry["body"]
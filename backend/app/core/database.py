@@ -1,21 +1,67 @@
 """Database engine and session management."""
-from sqlalchemy import create_engine, event
+from sqlalchemy import create_engine, event, text
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from contextlib import contextmanager
-from typing import Generator
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Optional
 from app.config import settings
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+def _async_url(url: str) -> str:
+    """Map a sync database URL onto its async driver."""
+    if url.startswith("postgresql://") or url.startswith("postgresql+psycopg2://"):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url.split("://", 1)[1]
+    return url
+
+
+def _engine_kwargs(
+    url: str,
+    is_async: bool = False,
+    pool_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build engine options for the configured (or given) pool mode."""
+    pool_mode = pool_mode or settings.db_pool_mode
+    # Keep bound parameters out of exception messages (and so out of logs) unless opted in
+    kwargs: Dict[str, Any] = {"echo": settings.debug, "hide_parameters": not settings.db_slow_query_log_params}
+
+    if "sqlite" in url:
+        kwargs["connect_args"] = {"check_same_thread": False}
+        return kwargs
+
+    if pool_mode == "null":
+        kwargs["poolclass"] = NullPool
+    else:
+        kwargs.update(
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=settings.db_pool_pre_ping,
+        )
+
+    if settings.db_statement_timeout_ms > 0 and url.startswith("postgresql"):
+        timeout = str(settings.db_statement_timeout_ms)
+        if is_async:
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+
+    return kwargs
+
+
 # Create engine
-engine = create_engine(
-    settings.database_url,
-    echo=settings.debug,
-    poolclass=NullPool if settings.database_url.startswith("postgresql") else None,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
-)
+engine = create_engine(settings.database_url, **_engine_kwargs(settings.database_url))
 
 # Session factory
 SessionLocal = sessionmaker(
@@ -25,6 +71,34 @@ SessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+# Async engine is created on first use so the async driver stays optional
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get (and lazily create) the async engine."""
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        url = settings.async_database_url or _async_url(settings.database_url)
+        _async_engine = create_async_engine(url, **_engine_kwargs(url, is_async=True))
+        if settings.metrics_enabled:
+            from app.services.metrics import instrument_queries
+
+            instrument_queries(_async_engine.sync_engine)
+        _async_session_factory = async_sessionmaker(
+            bind=_async_engine,
+            autoflush=False,
+            expire_on_commit=False,
+        )
+    return _async_engine
+
+
+def get_async_session_factory() -> async_sessionmaker:
+    """Get the async session factory."""
+    get_async_engine()
+    return _async_session_factory
+
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency for FastAPI to get DB session."""
@@ -35,6 +109,21 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+def get_session_factory() -> Callable[[], Session]:
+    """Dependency for handlers that open their own short sessions.
+
+    Streaming responses must not hold ``get_db``'s session: it stays open
+    (and its connection checked out) until the stream ends.
+    """
+    return SessionLocal
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Dependency for FastAPI to get an async DB session."""
+    async with get_async_session_factory()() as db:
+        yield db
+
+
 @contextmanager
 def get_db_context() -> Generator[Session, None, None]:
     """Context manager for DB session in non-FastAPI contexts."""
@@ -61,8 +150,27 @@ def init_db():
     logger.info("Database initialized")
 
 
+def check_database() -> bool:
+    """Whether a pooled connection can run ``SELECT 1``."""
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return True
+    except Exception as exc:
+        logger.warning("Database check failed: %s", exc)
+        return False
+
+
 def drop_db():
     """Drop all tables (for testing)."""
     from app.core.models import Base
     Base.metadata.drop_all(bind=engine)
     logger.info("Database dropped")
+
+
+async def dispose_engines():
+    """Release pooled connections (on shutdown)."""
+    engine.dispose()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    logger.info("Database engines disposed")
@@ -1,13 +1,16 @@
 """SQLAlchemy ORM models for AI Software Company Platform."""
 from sqlalchemy import (
-    Column, String, Text, Integer, Float, Boolean, DateTime, ForeignKey,
+    Column, String, Text, Integer, Float, Boolean, DateTime, ForeignKey, LargeBinary,
     Enum, JSONB, ARRAY, Index, UniqueConstraint, CheckConstraint, func
 )
+from sqlalchemy import DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 from datetime import datetime
 import enum
+import json
+import zlib
 
 Base = declarative_base()
 
@@ -90,6 +93,7 @@ class Project(Base):
     requirements_text = Column(Text, nullable=True)
     status = Column(Enum(ProjectStatus), nullable=False, default=ProjectStatus.DRAFT, index=True)
     template_id = Column(String(36), ForeignKey("project_templates.id"), nullable=True)
+    config_overrides = Column(JSONB, nullable=True)  # Partial ProjectConfig overlay
     active_run_id = Column(String(36), ForeignKey("project_runs.id"), nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -110,25 +114,62 @@ class ProjectRun(Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
     project_id = Column(String(36), ForeignKey("projects.id"), nullable=False, index=True)
     run_number = Column(Integer, nullable=False)
-    config_snapshot = Column(JSONB, nullable=False)  # Immutable ProjectConfig copy
+    # Immutable resolved ProjectConfig, shared by every run with the same config
+    config_snapshot_hash = Column(String(64), ForeignKey("content_blobs.hash"), nullable=True, index=True)
     status = Column(Enum(ProjectRunStatus), nullable=False, default=ProjectRunStatus.QUEUED, index=True)
     started_at = Column(DateTime, nullable=True)
     ended_at = Column(DateTime, nullable=True)
     budget_spent_input_tokens = Column(Integer, nullable=False, default=0)
     budget_spent_output_tokens = Column(Integer, nullable=False, default=0)
     budget_spent_usd_estimate = Column(Float, nullable=False, default=0.0)
-    final_report = Column(JSONB, nullable=True)
+    final_report_hash = Column(String(64), ForeignKey("content_blobs.hash"), nullable=True)
+    # Change counter for the run, its tasks and their comments (see app.services.run_versions)
+    version = Column(Integer, nullable=False, default=1)
+    # Advanced by usage writes only; run reads that show spend also key on it
+    usage_version = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
     project = relationship("Project", back_populates="runs", foreign_keys=[project_id])
     tasks = relationship("Task", back_populates="run")
+    # Blobs load (and decompress) only when the JSON property is read
+    snapshot_blob = relationship("ContentBlob", foreign_keys=[config_snapshot_hash])
+    final_report_blob = relationship("ContentBlob", foreign_keys=[final_report_hash])
 
     __table_args__ = (
         UniqueConstraint("project_id", "run_number", name="uq_project_run_number"),
         Index("idx_run_status_created", "status", "created_at"),
     )
 
+    @property
+    def config_snapshot(self) -> dict:
+        """The run's resolved ProjectConfig (empty for runs without a snapshot)."""
+        return self.snapshot_blob.value if self.snapshot_blob is not None else {}
+
+    @property
+    def final_report(self):
+        """The run's final report, if one was stored."""
+        return self.final_report_blob.value if self.final_report_blob is not None else None
+
+
+class ContentBlob(Base):
+    """Content-addressed, compressed JSON shared by every row that references it."""
+    __tablename__ = "content_blobs"
+
+    hash = Column(String(64), primary_key=True)  # sha256 of the canonical JSON
+    data = Column(LargeBinary, nullable=False)  # zlib-compressed canonical JSON
+    size_bytes = Column(Integer, nullable=False)  # uncompressed size
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    @property
+    def value(self):
+        """Decoded JSON content (decompressed on first access, read-only)."""
+        if "_value" not in self.__dict__:
+            self.__dict__["_value"] = json.loads(zlib.decompress(self.data))
+        return self.__dict__["_value"]
+
 
 class ProjectTemplate(Base):
     """Preset project configurations (immutable, versioned)."""
@@ -165,6 +206,7 @@ class Task(Base):
     priority = Column(Integer, nullable=False, default=5, index=True)  # 0-10
     assigned_agent_id = Column(String(100), nullable=True, index=True)  # e.g., "dev_agent_1"
     dependencies = Column(ARRAY(String(36)), nullable=False, default=[])  # task IDs
+    pending_dependencies = Column(Integer, nullable=False, default=0)  # dependencies not yet DONE
     acceptance_criteria = Column(JSONB, nullable=False, default=[])  # array of strings
     estimate_hours = Column(Float, nullable=True)
     actual_hours = Column(Float, nullable=True)
@@ -180,6 +222,46 @@ class Task(Base):
     __table_args__ = (
         Index("idx_task_status_assigned", "status", "assigned_agent_id"),
         Index("idx_task_run_priority", "project_run_id", "priority"),
+        Index("idx_task_ready", "project_run_id", "status", "pending_dependencies", "priority"),
+    )
+
+
+class RunTaskCounters(Base):
+    """Per-run task counters, updated in the same transaction as task writes."""
+    __tablename__ = "run_task_counters"
+
+    project_run_id = Column(String(36), ForeignKey("project_runs.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    # One column per TaskStatus (lower-cased value)
+    pending = Column(Integer, nullable=False, default=0)
+    in_progress = Column(Integer, nullable=False, default=0)
+    blocked = Column(Integer, nullable=False, default=0)
+    review = Column(Integer, nullable=False, default=0)
+    done = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    estimate_hours = Column(Float, nullable=False, default=0.0)
+    actual_hours = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UsageRecord(Base):
+    """One LLM call's token usage (append-only budget ledger)."""
+    __tablename__ = "usage_records"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    project_run_id = Column(String(36), ForeignKey("project_runs.id"), nullable=False)
+    task_id = Column(String(36), nullable=True)  # not an FK: one bad id must not fail a whole batch
+    agent_id = Column(String(100), nullable=True)
+    agent_role = Column(String(50), nullable=True)
+    model = Column(String(100), nullable=False)
+    input_tokens = Column(Integer, nullable=False)
+    output_tokens = Column(Integer, nullable=False)
+    cost_usd = Column(Float, nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("idx_usage_run_created", "project_run_id", "created_at"),
+        Index("idx_usage_task", "task_id"),
     )
 
 
@@ -221,6 +303,41 @@ class TaskComment(Base):
     __table_args__ = (
         Index("idx_comment_type_agent", "comment_type", "agent_id"),
         Index("idx_comment_task_created", "task_id", "created_at"),
+        # Containment lookups (files_created @> ARRAY[path])
+        Index("idx_comment_files_created", "files_created", postgresql_using="gin"),
+        Index("idx_comment_files_modified", "files_modified", postgresql_using="gin"),
+    )
+
+
+class CommentFileRef(Base):
+    """One file path a comment reports as created or modified (normalized from the arrays)."""
+    __tablename__ = "comment_file_refs"
+
+    comment_id = Column(String(36), ForeignKey("task_comments.id", ondelete="CASCADE"), primary_key=True)
+    path = Column(String(500), primary_key=True)
+    change = Column(String(10), primary_key=True)  # created | modified
+    task_id = Column(String(36), ForeignKey("tasks.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)  # copied from the comment
+
+    __table_args__ = (
+        # pattern_ops so "path LIKE 'dir/%'" is an index range scan under any collation
+        Index("idx_file_ref_path_task", "path", "task_id", postgresql_ops={"path": "varchar_pattern_ops"}),
+        Index("idx_file_ref_task", "task_id"),
+    )
+
+
+class CommentCommitRef(Base):
+    """One commit SHA a comment records (normalized from ``git_commits``)."""
+    __tablename__ = "comment_commit_refs"
+
+    comment_id = Column(String(36), ForeignKey("task_comments.id", ondelete="CASCADE"), primary_key=True)
+    sha = Column(String(40), primary_key=True)  # lowercase
+    task_id = Column(String(36), ForeignKey("tasks.id"), nullable=False)
+    created_at = Column(DateTime, nullable=False)  # copied from the comment
+
+    __table_args__ = (
+        # pattern_ops so abbreviated SHAs ("sha LIKE 'abc1234%'") are an index range scan
+        Index("idx_commit_ref_sha", "sha", postgresql_ops={"sha": "varchar_pattern_ops"}),
     )
 
 
@@ -259,3 +376,48 @@ class Artifact(Base):
     __table_args__ = (
         Index("idx_artifact_task_type", "task_id", "artifact_type"),
     )
+
+
+# ============================================================================
+# Comment full-text search on SQLite (DDL outside the ORM columns)
+# ============================================================================
+
+# Postgres gets its weighted tsvector column and trigram indexes from Alembic
+# revision 0010_comment_search, which also covers existing databases.
+
+# SQLite (tests, local runs): external-content FTS5 table synced by triggers
+_COMMENT_SEARCH_DDL_SQLITE = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS task_comments_fts USING fts5(
+        title, content, work_summary, content='task_comments', content_rowid='rowid'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_comments_fts_insert AFTER INSERT ON task_comments BEGIN
+        INSERT INTO task_comments_fts(rowid, title, content, work_summary)
+        VALUES (new.rowid, new.title, new.content, new.work_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_comments_fts_delete AFTER DELETE ON task_comments BEGIN
+        INSERT INTO task_comments_fts(task_comments_fts, rowid, title, content, work_summary)
+        VALUES ('delete', old.rowid, old.title, old.content, old.work_summary);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS task_comments_fts_update AFTER UPDATE ON task_comments BEGIN
+        INSERT INTO task_comments_fts(task_comments_fts, rowid, title, content, work_summary)
+        VALUES ('delete', old.rowid, old.title, old.content, old.work_summary);
+        INSERT INTO task_comments_fts(rowid, title, content, work_summary)
+        VALUES (new.rowid, new.title, new.content, new.work_summary);
+    END
+    """,
+]
+
+for _statement in _COMMENT_SEARCH_DDL_SQLITE:
+    event.listen(TaskComment.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    TaskComment.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS task_comments_fts").execute_if(dialect="sqlite"),
+)
@@ -1,6 +1,6 @@
 """Pydantic request/response schemas."""
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 from uuid import UUID
 from datetime import datetime
 from enum import Enum
@@ -40,11 +40,14 @@ class ProjectTemplateResponse(ProjectTemplateCreate):
     created_at: datetime
     updated_at: datetime
 
+    model_config = ConfigDict(from_attributes=True)
+
 
 class ProjectTemplateListResponse(BaseModel):
     """List of project templates."""
     templates: List[ProjectTemplateResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 # ============================================================================
@@ -126,6 +129,7 @@ class ProjectResponse(BaseModel):
     requirements_text: str
     status: str
     template_id: Optional[str]
+    config_overrides: Optional[Dict[str, Any]] = None
     active_run_id: Optional[str]
     created_at: datetime
     updated_at: datetime
@@ -136,7 +140,8 @@ class ProjectResponse(BaseModel):
 class ProjectListResponse(BaseModel):
     """List of projects."""
     projects: List[ProjectResponse]
-    total: int
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
 
 
 # ============================================================================
@@ -154,17 +159,119 @@ class ProjectRunResponse(BaseModel):
     project_id: str
     run_number: int
     status: str
+    config_snapshot_hash: Optional[str] = None
+    config_snapshot: Optional[Dict[str, Any]] = None  # only when requested
     started_at: Optional[datetime]
     ended_at: Optional[datetime]
     budget_spent_input_tokens: int
     budget_spent_output_tokens: int
     budget_spent_usd_estimate: float
-    final_report: Optional[Dict[str, Any]]
+    final_report_hash: Optional[str] = None
+    final_report: Optional[Dict[str, Any]] = None  # only when requested
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
 
 
+class UsageCreate(BaseModel):
+    """Token usage of one LLM call, reported by an agent."""
+    model: str = Field(..., min_length=1, max_length=100)
+    input_tokens: int = Field(..., ge=0)
+    output_tokens: int = Field(..., ge=0)
+    task_id: Optional[str] = None
+    agent_id: Optional[str] = Field(None, max_length=100)
+    agent_role: Optional[str] = Field(None, max_length=50)
+
+
+class BudgetStatus(BaseModel):
+    """A run's spend against its configured budget."""
+    spent_usd: float
+    max_usd: float
+    usd_remaining: float
+    usd_percent_used: float
+    spent_tokens: int
+    max_tokens: int
+    tokens_remaining: int
+    tokens_percent_used: float
+    is_exceeded: bool
+
+
+class UsageResponse(BaseModel):
+    """Cost of a recorded call and the run's budget status after it."""
+    model: str
+    input_tokens: int
+    output_tokens: int
+    total_tokens: int
+    cost_usd: float
+    budget: BudgetStatus
+
+
+class ModelDecisionRequest(BaseModel):
+    """An agent's next LLM call, described before it is made."""
+    role: str = Field(..., min_length=1, max_length=50)  # key in the config's models.model_by_role
+    # Prompt size: exact token count, else the prompt text, else its length (estimated)
+    prompt_tokens: Optional[int] = Field(None, ge=0)
+    prompt: Optional[str] = Field(None, max_length=2_000_000)
+    prompt_chars: Optional[int] = Field(None, ge=0)
+    max_output_tokens: int = Field(1000, ge=0)
+
+
+class ModelDecisionResponse(BaseModel):
+    """Which model to call (None when the run must stop) and why."""
+    action: str  # allow | degrade | stop
+    model: Optional[str]
+    requested_model: str
+    estimated_cost_usd: float
+    projected_usd: float
+    projected_ratio: float
+    burn_rate_usd_per_hour: float
+    reason: str
+
+
+class CostGroup(BaseModel):
+    """Usage and cost of one run, agent, role or model."""
+    key: str
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+
+
+class CostTotal(BaseModel):
+    calls: int
+    input_tokens: int
+    output_tokens: int
+    cost_usd: float
+
+
+class CostBucket(BaseModel):
+    """Spend in one time bucket, with the rolling burn rate ending there."""
+    start: datetime
+    cost_usd: float
+    tokens: int
+    burn_rate_usd_per_hour: float
+
+
+class CostProjection(BaseModel):
+    """Current burn rate and when the USD budget runs out at that rate."""
+    burn_rate_usd_per_hour: float
+    usd_remaining: float
+    hours_to_budget: Optional[float] = None
+    budget_exhausted_at: Optional[datetime] = None
+
+
+class CostBreakdownResponse(BaseModel):
+    """Token spend of a run or project, grouped and bucketed."""
+    total: CostTotal
+    bucket: str
+    by_model: List[CostGroup]
+    by_role: List[CostGroup]
+    by_agent: List[CostGroup]
+    by_run: Optional[List[CostGroup]] = None  # project rollups only
+    timeline: List[CostBucket]
+    projection: Optional[CostProjection] = None  # runs only
+
+
 # ============================================================================
 # Task Schemas
 # ============================================================================
@@ -182,6 +289,36 @@ class TaskCreate(BaseModel):
     estimate_hours: Optional[float] = Field(None, ge=0.5)
 
 
+class TaskBulkItem(BaseModel):
+    """One task in a bulk plan.
+
+    ``parent_task_id`` and ``dependencies`` may reference other items by
+    ``temp_id`` or existing tasks in the same run by ID.
+    """
+    temp_id: str = Field(..., min_length=1, max_length=64)
+    parent_task_id: Optional[str] = None
+    title: str = Field(..., min_length=5, max_length=255)
+    description: Optional[str] = Field(None, max_length=5000)
+    task_type: str = Field("FEATURE")
+    priority: int = Field(5, ge=0, le=10)
+    dependencies: List[str] = Field(default_factory=list)
+    acceptance_criteria: List[str] = Field(default_factory=list)
+    estimate_hours: Optional[float] = Field(None, ge=0.5)
+
+
+class TaskBulkCreate(BaseModel):
+    """Create a whole task tree in one request (PM decomposition)."""
+    project_run_id: str
+    tasks: List[TaskBulkItem] = Field(..., min_items=1, max_items=500)
+
+
+class TaskBulkCreateResponse(BaseModel):
+    """Result of a bulk task creation."""
+    project_run_id: str
+    task_ids: Dict[str, str]  # temp_id -> created task ID
+    total: int
+
+
 class TaskUpdate(BaseModel):
     """Update task status, assignment, priority."""
     status: Optional[str] = None
@@ -212,10 +349,31 @@ class TaskResponse(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class TaskClaimRequest(BaseModel):
+    """Claim the next ready task of a run."""
+    project_run_id: str
+    agent_id: str = Field(..., max_length=100)
+    task_types: List[str] = Field(default_factory=list)  # empty = any type
+
+
+class TaskClaimResponse(BaseModel):
+    """Claimed task, or why nothing could be claimed."""
+    task: Optional[TaskResponse] = None
+    reason: Optional[str] = None
+
+
 class TaskListResponse(BaseModel):
     """List of tasks."""
     tasks: List[TaskResponse]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class TaskTreeResponse(BaseModel):
+    """Task hierarchy; each node carries the projected fields plus ``subtasks``."""
+    tasks: List[Dict[str, Any]]
     total: int
+    max_depth: int
 
 
 # ============================================================================
@@ -255,8 +413,92 @@ class TaskCommentResponse(TaskCommentCreate):
     created_at: datetime
     updated_at: datetime
 
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TaskCommentSummary(BaseModel):
+    """Slim task comment for list views; extra requested fields pass through."""
+    id: str
+    task_id: str
+    agent_id: str
+    agent_role: str
+    comment_type: str
+    title: str
+    needs_review: bool
+    created_at: datetime
+
+    model_config = ConfigDict(extra="allow")
+
 
 class TaskCommentListResponse(BaseModel):
-    """List of task comments."""
-    comments: List[TaskCommentResponse]
+    """List of task comments (full rows, or summaries for ``view=summary``)."""
+    # Summary first: it passes any projection through unchanged (full rows serialize the same)
+    comments: List[Union[TaskCommentSummary, TaskCommentResponse]]
+    total: Optional[int] = None
+    next_cursor: Optional[str] = None
+
+
+class CommentSearchHit(BaseModel):
+    """A comment matching a search, with its rank and a highlighted excerpt."""
+    id: str
+    task_id: str
+    agent_id: str
+    agent_role: str
+    comment_type: str
+    title: str
+    created_at: datetime
+    rank: Optional[float] = None  # text mode only; higher is better
+    highlight: Optional[str] = None  # matched terms wrapped in <mark>
+
+
+class CommentSearchResponse(BaseModel):
+    """One page of comment search hits."""
+    hits: List[CommentSearchHit]
+    mode: str
+    next_cursor: Optional[str] = None
+
+
+class FileTaskTouch(BaseModel):
+    """A task whose comments created or modified a matching file."""
+    task_id: str
+    project_run_id: str
+    title: str
+    status: str
+    paths_matched: int
+    comment_count: int
+    last_touched_at: datetime
+
+
+class FileTasksResponse(BaseModel):
+    """Tasks that touched a file path (or any path under a prefix)."""
+    path: str
+    prefix: bool
+    tasks: List[FileTaskTouch]
+
+
+class CommitCommentsResponse(BaseModel):
+    """Comments that record a git commit."""
+    sha: str
+    comments: List[TaskCommentSummary]
+
+
+class TaskCommentBatchItem(TaskCommentCreate):
+    """A comment in a batch; batches may span tasks."""
+    task_id: str
+
+
+class TaskCommentBatchCreate(BaseModel):
+    """Create many comments in one request.
+
+    ``durability``: ``commit`` acks once the rows are committed; ``enqueue``
+    acks as soon as the write-behind buffer accepted them.
+    """
+    comments: List[TaskCommentBatchItem] = Field(..., min_items=1, max_items=1000)
+    durability: str = Field("commit", pattern="^(commit|enqueue)$")
+
+
+class TaskCommentBatchResponse(BaseModel):
+    """Result of a batch comment creation."""
+    comment_ids: List[str]
     total: int
+    durability: str  # guarantee actually given
@@ -2,17 +2,32 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from anyio import to_thread
+from prometheus_client import CONTENT_TYPE_LATEST
+import asyncio
 import logging
 import logging.config
+from datetime import datetime
 from app.config import settings
-from app.core.database import init_db
-from app.api import templates, projects, runs, tasks, comments
+from app.core.database import check_database, dispose_engines, engine, init_db
+from app.api import templates, projects, runs, tasks, comments, events, lookups
+from app.services import metrics
+from app.services.budget_ledger import start_budget_ledger, stop_budget_ledger
+from app.services.comment_buffer import start_comment_buffer, stop_comment_buffer
+from app.services.event_hub import close_event_hub
+from app.services.events import get_async_redis
+from app.services.response_cache import start_response_cache, stop_response_cache
+from app.services.template_cache import start_template_cache, stop_template_cache
+from app.utils.logger import RequestIdMiddleware, setup_logging, stop_logging
 
 # Configure logging
-logging.basicConfig(
-    level=settings.log_level,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+setup_logging(
+    settings.log_level,
+    json_format=settings.log_format == "json",
+    queue_size=settings.log_queue_size,
+    sample_rate=settings.log_sample_rate,
+    sampled_loggers=settings.log_sampled_loggers.split(","),
 )
 logger = logging.getLogger(__name__)
 
@@ -22,13 +37,30 @@ async def lifespan(app: FastAPI):
     """Manage app startup and shutdown."""
     # Startup
     logger.info("🚀 AI Software Company Platform starting...")
+    # Route handlers use sync sessions and run in the threadpool; size it to the
+    # connection pool so excess requests queue here instead of on pool checkout.
+    threadpool_size = settings.api_threadpool_size or (
+        settings.db_pool_size + settings.db_max_overflow
+    )
+    to_thread.current_default_thread_limiter().total_tokens = threadpool_size
     init_db()
     logger.info("✅ Database initialized")
+    start_comment_buffer()
+    start_template_cache()
+    start_response_cache()
+    start_budget_ledger()
     
     yield
     
     # Shutdown
     logger.info("🛑 AI Software Company Platform shutting down...")
+    stop_comment_buffer()
+    stop_budget_ledger()
+    stop_template_cache()
+    stop_response_cache()
+    await close_event_hub()
+    await dispose_engines()
+    stop_logging()
 
 
 # Create FastAPI app
@@ -37,6 +69,7 @@ app = FastAPI(
     version=settings.api_version,
     description="Multi-agent AI platform for autonomous software company simulation",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # CORS middleware
@@ -48,6 +81,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Metrics middleware (so latency includes CORS handling)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+    metrics.instrument_engine(engine)
+
+# Request ids, outermost so every log record of a request carries one
+app.add_middleware(RequestIdMiddleware)
+
 
 # ============================================================================
 # Global Exception Handlers
@@ -65,7 +106,7 @@ async def value_error_handler(request: Request, exc: ValueError):
 @app.exception_handler(Exception)
 async def generic_exception_handler(request: Request, exc: Exception):
     """Handle generic exceptions."""
-    logger.error(f"Unhandled exception: {exc}", exc_info=True)
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={"detail": "Internal server error", "error_type": type(exc).__name__}
@@ -87,17 +128,45 @@ async def health_check():
     }
 
 
+async def check_redis() -> bool:
+    """Whether Redis answers a PING."""
+    try:
+        return bool(await get_async_redis().ping())
+    except Exception as exc:
+        logger.warning("Redis check failed: %s", exc)
+        return False
+
+
 @app.get("/status", tags=["Health"])
 async def status():
-    """Detailed status endpoint."""
-    return {
-        "status": "operational",
-        "service": "AI Software Company Platform",
-        "version": settings.api_version,
-        "database": "connected",
-        "redis": "configured",
-        "timestamp": __import__("datetime").datetime.utcnow().isoformat(),
-    }
+    """Detailed status endpoint: checks the database and Redis (503 if either is down)."""
+    timeout = settings.status_check_timeout
+    try:
+        database = await asyncio.wait_for(to_thread.run_sync(check_database, cancellable=True), timeout)
+    except asyncio.TimeoutError:
+        database = False
+    try:
+        redis = await asyncio.wait_for(check_redis(), timeout)
+    except asyncio.TimeoutError:
+        redis = False
+    return JSONResponse(
+        status_code=200 if database and redis else 503,
+        content={
+            "status": "operational" if database and redis else "degraded",
+            "service": "AI Software Company Platform",
+            "version": settings.api_version,
+            "database": "connected" if database else "unavailable",
+            "redis": "connected" if redis else "unavailable",
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+    )
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", tags=["Health"], include_in_schema=False)
+    async def metrics_endpoint():
+        """Prometheus metrics."""
+        return Response(metrics.render(), media_type=CONTENT_TYPE_LATEST)
 
 
 # ============================================================================
@@ -109,6 +178,9 @@ app.include_router(projects.router)
 app.include_router(runs.router)
 app.include_router(tasks.router)
 app.include_router(comments.router)
+app.include_router(comments.batch_router)
+app.include_router(events.router)
+app.include_router(lookups.router)
 
 
 # ============================================================================
@@ -129,7 +201,11 @@ async def root():
             "runs": "/api/runs",
             "tasks": "/api/tasks",
             "comments": "/api/comments",
+            "events": "/ws/runs/{run_id}",
+            "files": "/api/files/tasks",
+            "commits": "/api/commits/{sha}/comments",
             "health": "/health",
+            "metrics": "/metrics",
         }
     }
 
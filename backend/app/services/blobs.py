@@ -0,0 +1,75 @@
+"""Content-addressed storage for large, repetitive JSON documents.
+
+Documents are keyed by the sha256 of their canonical JSON and stored once,
+zlib-compressed, in ``content_blobs``. Referencing rows hold the hash and
+bump ``refcount``; blobs nobody references are removed by
+``purge_unreferenced``.
+"""
+from typing import Any, Optional, Tuple
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.models import ContentBlob
+import hashlib
+import json
+import zlib
+
+COMPRESSION_LEVEL = 6
+
+
+def canonical_json(value: Any) -> str:
+    """Deterministic JSON (sorted keys, no whitespace) used for hashing."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def content_hash(value: Any) -> Tuple[str, bytes]:
+    """Hash and canonical bytes of a JSON document."""
+    raw = canonical_json(value).encode()
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def _add_reference(db: Session, digest: str, delta: int) -> int:
+    return db.execute(
+        update(ContentBlob)
+        .where(ContentBlob.hash == digest)
+        .values(refcount=ContentBlob.refcount + delta)
+    ).rowcount
+
+
+def put_blob(db: Session, value: Any) -> str:
+    """Store ``value`` (if new) and take a reference to it; returns its hash (caller commits)."""
+    digest, raw = content_hash(value)
+    if _add_reference(db, digest, 1):
+        return digest
+    try:
+        with db.begin_nested():
+            db.add(ContentBlob(
+                hash=digest,
+                data=zlib.compress(raw, COMPRESSION_LEVEL),
+                size_bytes=len(raw),
+                refcount=1,
+            ))
+    except IntegrityError:
+        # Another request stored the same content first
+        _add_reference(db, digest, 1)
+    return digest
+
+
+def release_blob(db: Session, digest: Optional[str]) -> None:
+    """Drop one reference to a blob (caller commits)."""
+    if digest:
+        _add_reference(db, digest, -1)
+
+
+def replace_blob(db: Session, old_digest: Optional[str], value: Any) -> Optional[str]:
+    """Point a reference at new content: store ``value``, release the old blob."""
+    new_digest = put_blob(db, value) if value is not None else None
+    release_blob(db, old_digest)
+    return new_digest
+
+
+def purge_unreferenced(db: Session) -> int:
+    """Delete blobs with no references left; returns how many were removed."""
+    result = db.execute(delete(ContentBlob).where(ContentBlob.refcount <= 0))
+    db.commit()
+    return result.rowcount
@@ -0,0 +1,138 @@
+"""Predictive budget guard: pick each call's model before the budget runs out.
+
+For every LLM call an agent asks the guard which model to use. The guard
+projects the run's spend as
+
+    spent + estimated cost of this call + burn rate * horizon
+
+and compares it with the run's budget (USD and tokens, whichever is
+closer to its limit). Below ``degrade_at`` the role's configured model is
+used; from ``degrade_at`` the template's ``fallback_model``; from
+``critical_at`` the cheapest priced model (a tier is skipped unless it is
+cheaper than the role's model). With ``on_exceed=stop`` the
+guard never degrades and answers ``stop`` once the projection reaches the
+limit.
+
+The burn rate is an exponentially decayed rate (USD/second) kept as one
+immutable tuple, replaced on each recorded call. Decisions only read it
+and the tracker totals, so they take no lock and do a fixed amount of work.
+"""
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from app.config import settings
+from app.utils.budget import BudgetTracker, token_cost
+from app.utils.pricing import get_pricing
+import math
+import time
+
+
+def unit_price(model: str) -> float:
+    return get_pricing().price(model).unit_price
+
+
+class ModelDecision(NamedTuple):
+    action: str  # allow | degrade | stop
+    model: Optional[str]
+    requested_model: str
+    estimated_cost_usd: float
+    projected_usd: float
+    projected_ratio: float
+    reason: str
+
+
+class BudgetGuard:
+    """Model selection for one run, driven by its tracker and recent burn rate."""
+
+    def __init__(
+        self,
+        tracker: BudgetTracker,
+        models: Optional[Dict[str, Any]] = None,
+        on_exceed: str = "degrade_models",
+        horizon: float = 600.0,
+        half_life: float = 300.0,
+        degrade_at: float = 0.8,
+        critical_at: float = 0.95,
+    ):
+        models = models or {}
+        self.tracker = tracker
+        self.on_exceed = on_exceed
+        self.horizon = horizon
+        self.tau = half_life / math.log(2)
+        self.degrade_at = degrade_at
+        self.critical_at = critical_at
+        self.fallback_model = models.get("fallback_model") or get_pricing().table.default_model
+        self.model_by_role = {role.lower(): model for role, model in (models.get("model_by_role") or {}).items()}
+        self._burn: Tuple[float, float] = (0.0, time.monotonic())  # (USD/s, as of)
+
+    def seed_burn_rate(self, usd_per_second: float):
+        """Start from a rate measured elsewhere (e.g. the ledger's recent history)."""
+        self._burn = (usd_per_second, time.monotonic())
+
+    def observe(self, cost_usd: float, now: Optional[float] = None):
+        """Fold one recorded call into the burn rate (single writer: the ledger)."""
+        now = time.monotonic() if now is None else now
+        rate, as_of = self._burn
+        decay = math.exp(-max(0.0, now - as_of) / self.tau)
+        self._burn = (rate * decay + cost_usd / self.tau, now)
+
+    def burn_rate(self, now: Optional[float] = None) -> float:
+        """Current burn rate in USD/second."""
+        now = time.monotonic() if now is None else now
+        rate, as_of = self._burn
+        return rate * math.exp(-max(0.0, now - as_of) / self.tau)
+
+    def role_model(self, role: Optional[str]) -> str:
+        return self.model_by_role.get((role or "").lower(), self.fallback_model)
+
+    def decide(
+        self,
+        role: Optional[str],
+        prompt_tokens: int,
+        max_output_tokens: int,
+        now: Optional[float] = None,
+    ) -> ModelDecision:
+        """Which model the next call should use, and why."""
+        requested = self.role_model(role)
+        tracker = self.tracker
+        cost = sum(token_cost(requested, prompt_tokens, max_output_tokens))
+        burn = self.burn_rate(now) * self.horizon
+        projected_usd = tracker.spent_usd + cost + burn
+        # Tokens burn in proportion to USD at the run's average price so far
+        tokens_per_usd = tracker.total_tokens / tracker.spent_usd if tracker.spent_usd > 0 else 0.0
+        projected_tokens = tracker.total_tokens + prompt_tokens + max_output_tokens + burn * tokens_per_usd
+        ratio = max(
+            projected_usd / tracker.max_usd if tracker.max_usd > 0 else 0.0,
+            projected_tokens / tracker.max_tokens if tracker.max_tokens > 0 else 0.0,
+        )
+
+        def decision(action: str, model: Optional[str], reason: str) -> ModelDecision:
+            estimated = sum(token_cost(model, prompt_tokens, max_output_tokens)) if model else 0.0
+            return ModelDecision(
+                action, model, requested, round(estimated, 6), round(projected_usd, 6), round(ratio, 4), reason,
+            )
+
+        if self.on_exceed == "stop":
+            if ratio >= 1.0:
+                return decision("stop", None, "projected spend reaches the budget")
+            return decision("allow", requested, "within budget")
+        # Only ever switch to a strictly cheaper model
+        cheapest = get_pricing().table.cheapest
+        if ratio >= self.critical_at and unit_price(cheapest) < unit_price(requested):
+            return decision("degrade", cheapest, f"projected spend at {ratio:.0%} of budget")
+        if ratio >= self.degrade_at and unit_price(self.fallback_model) < unit_price(requested):
+            return decision("degrade", self.fallback_model, f"projected spend at {ratio:.0%} of budget")
+        return decision("allow", requested, "within budget")
+
+
+def run_guard(tracker: BudgetTracker, config: Dict[str, Any], burn_usd_per_second: float = 0.0) -> BudgetGuard:
+    """A guard for a run's resolved config, with the settings' thresholds."""
+    guard = BudgetGuard(
+        tracker,
+        models=config.get("models"),
+        on_exceed=(config.get("budget") or {}).get("on_exceed", "degrade_models"),
+        horizon=settings.budget_guard_horizon,
+        half_life=settings.budget_guard_half_life,
+        degrade_at=settings.budget_guard_degrade_at,
+        critical_at=settings.budget_guard_critical_at,
+    )
+    guard.seed_burn_rate(burn_usd_per_second)
+    return guard
@@ -0,0 +1,374 @@
+"""Per-run token/cost accounting.
+
+Usage is appended to ``usage_records`` and added to the run's
+``budget_spent_*`` columns with ``SET x = x + :delta``, so concurrent
+writers (threads or processes) never lose an update. The process-wide
+``BudgetLedger`` aggregates usage in memory and writes it in batches:
+one multi-row INSERT plus one UPDATE per run per flush. While a run is in
+use its ``BudgetTracker`` is kept in memory holding the persisted totals
+plus this process's unflushed usage, so budget checks never touch the
+database. The tracker lives in the run's ``BudgetGuard``, which every recorded call
+also feeds with its cost (for the burn rate).
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.database import SessionLocal
+from app.core.models import ProjectRun, UsageRecord
+from app.services import run_versions
+from app.services.budget_guard import BudgetGuard, run_guard
+from app.services.config_resolver import DEFAULT_CONFIG
+from app.services.metrics import record_usage
+from app.utils.budget import BudgetTracker
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+TOTAL_COLUMNS = {
+    "input_tokens": "budget_spent_input_tokens",
+    "output_tokens": "budget_spent_output_tokens",
+    "cost_usd": "budget_spent_usd_estimate",
+}
+
+
+def run_tracker(run: ProjectRun) -> BudgetTracker:
+    """A tracker with the run's configured limits and persisted totals."""
+    budget = run.config_snapshot.get("budget") or DEFAULT_CONFIG["budget"]
+    tracker = BudgetTracker(budget["max_usd"], budget["max_total_tokens"])
+    tracker.set_spent(
+        run.budget_spent_usd_estimate, run.budget_spent_input_tokens, run.budget_spent_output_tokens,
+    )
+    return tracker
+
+
+def load_guard(db: Session, run: ProjectRun) -> BudgetGuard:
+    """A guard for ``run``, its burn rate seeded from the last ``half_life`` of usage."""
+    window = settings.budget_guard_half_life
+    recent = db.query(func.coalesce(func.sum(UsageRecord.cost_usd), 0.0)).filter(
+        UsageRecord.project_run_id == run.id,
+        UsageRecord.created_at >= datetime.utcnow() - timedelta(seconds=window),
+    ).scalar()
+    return run_guard(run_tracker(run), run.config_snapshot, burn_usd_per_second=recent / window)
+
+
+def usage_row(
+    run_id: str,
+    usage: Dict[str, Any],
+    task_id: Optional[str] = None,
+    agent_id: Optional[str] = None,
+    agent_role: Optional[str] = None,
+) -> Dict[str, Any]:
+    """A usage_records row from a ``BudgetTracker.add_usage`` result."""
+    return {
+        "id": str(uuid4()),
+        "project_run_id": run_id,
+        "task_id": task_id,
+        "agent_id": agent_id,
+        "agent_role": agent_role,
+        "model": usage["model"],
+        "input_tokens": usage["input_tokens"],
+        "output_tokens": usage["output_tokens"],
+        "cost_usd": usage["cost_usd"],
+        "created_at": datetime.utcnow(),
+    }
+
+
+def apply_usage(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Append usage rows and add them to their runs' totals atomically (caller commits)."""
+    if not rows:
+        return
+    db.execute(insert(UsageRecord), rows)
+    for run_id, deltas in _sum_by_run(rows).items():
+        db.execute(
+            update(ProjectRun)
+            .where(ProjectRun.id == run_id)
+            .values({
+                **{column: getattr(ProjectRun, column) + deltas[field] for field, column in TOTAL_COLUMNS.items()},
+                **run_versions.bump_usage_values(),
+            })
+        )
+
+
+def _sum_by_run(rows: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    totals: Dict[str, Dict[str, float]] = {}
+    for row in rows:
+        run_totals = totals.setdefault(row["project_run_id"], dict.fromkeys(TOTAL_COLUMNS, 0))
+        for field in TOTAL_COLUMNS:
+            run_totals[field] += row[field]
+    return totals
+
+
+class LedgerFullError(RuntimeError):
+    """Raised when the ledger is at capacity (caller should back off)."""
+
+
+class BudgetLedger:
+    """In-memory usage aggregation with periodic batched flushes.
+
+    ``add_usage`` prices the call, updates the run's cached tracker and
+    guard, and queues the record; a background thread writes queued records every
+    ``flush_interval`` seconds (sooner once ``max_batch`` are queued).
+    Each flush then re-reads the persisted totals of every cached run, so
+    usage recorded by other processes shows up within one interval.
+
+    A flush that fails because the database is unreachable puts its records
+    back in the queue; once ``max_pending`` records are queued or in flight,
+    ``add_usage`` raises ``LedgerFullError``. A batch rejected for its data
+    is split in halves until the offending records are isolated, which are
+    logged and dropped. Guards unused for ``guard_ttl`` seconds (or expired
+    when their run ends) are evicted once they have nothing queued.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        flush_interval: float = 1.0,
+        max_batch: int = 1000,
+        max_pending: int = 100000,
+        guard_ttl: float = 900.0,
+    ):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.guard_ttl = guard_ttl
+        self._guards: Dict[str, BudgetGuard] = {}
+        self._last_used: Dict[str, float] = {}
+        self._pending: List[Dict[str, Any]] = []
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.flushed_records = 0
+        self.flushed_batches = 0
+        self.dropped_records = 0
+
+    def start(self):
+        """Start the flush thread."""
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="budget-ledger", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the flush thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def guard(self, run_id: str) -> Optional[BudgetGuard]:
+        """The run's cached guard, loaded on first use (None if the run does not exist)."""
+        guard = self._guards.get(run_id)
+        if guard is not None:
+            self._last_used[run_id] = time.monotonic()
+            return guard
+        with self.session_factory() as db:
+            run = db.get(ProjectRun, run_id)
+            if run is None:
+                return None
+            loaded = load_guard(db, run)
+        with self._cond:
+            self._last_used[run_id] = time.monotonic()
+            # Usage queued meanwhile was recorded against a guard that won the race
+            return self._guards.setdefault(run_id, loaded)
+
+    def guards(self) -> Dict[str, BudgetGuard]:
+        """Snapshot of the cached guards by run id."""
+        with self._cond:
+            return dict(self._guards)
+
+    def expire(self, run_id: str):
+        """Evict the run's guard at the next flush that leaves it nothing queued (its run ended)."""
+        with self._cond:
+            if run_id in self._last_used:
+                self._last_used[run_id] = float("-inf")
+
+    def tracker(self, run_id: str) -> Optional[BudgetTracker]:
+        """The run's cached tracker (None if the run does not exist)."""
+        guard = self.guard(run_id)
+        return guard.tracker if guard is not None else None
+
+    def add_usage(
+        self,
+        run_id: str,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        task_id: Optional[str] = None,
+        agent_id: Optional[str] = None,
+        agent_role: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Record one call's usage; returns its cost breakdown (None if the run does not exist).
+
+        Raises:
+            LedgerFullError: If ``max_pending`` records are already queued or being written
+        """
+        guard = self.guard(run_id)
+        if guard is None:
+            return None
+        with self._cond:
+            if len(self._pending) + self._in_flight >= self.max_pending:
+                raise LedgerFullError("Budget ledger is full")
+            # Re-register a guard evicted since it was looked up
+            guard = self._guards.setdefault(run_id, guard)
+            self._last_used[run_id] = time.monotonic()
+            usage = guard.tracker.add_usage(model, input_tokens, output_tokens)
+            guard.observe(usage["cost_usd"])
+            self._pending.append(usage_row(run_id, usage, task_id, agent_id, agent_role))
+            if len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        record_usage(usage)
+        return usage
+
+    def is_budget_exceeded(self, run_id: str) -> bool:
+        """O(1) check against the cached totals."""
+        tracker = self.tracker(run_id)
+        return tracker is not None and tracker.is_budget_exceeded
+
+    @property
+    def pending(self) -> int:
+        """Records queued but not yet written."""
+        return len(self._pending)
+
+    def flush(self) -> int:
+        """Write everything queued now and refresh the cached totals; returns how many records were written."""
+        with self._write_lock:
+            with self._cond:
+                batch, self._pending = self._pending, []
+                self._in_flight = len(batch)
+            written, unwritten = 0, batch
+            try:
+                written, unwritten = self._write(batch)
+            finally:
+                with self._cond:
+                    self._pending[:0] = unwritten
+                    self._in_flight = 0
+            if not unwritten:
+                self._refresh()
+            if written:
+                self.flushed_records += written
+                self.flushed_batches += 1
+            return written
+
+    def _write(self, batch: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Write ``batch``, isolating and dropping records the database rejects.
+
+        Returns:
+            Records written, and the records left unwritten because the
+            database could not be reached (to be queued again)
+        """
+        written = 0
+        parts = [batch] if batch else []
+        while parts:
+            part = parts.pop()
+            try:
+                with self.session_factory() as db:
+                    apply_usage(db, part)
+                    db.commit()
+            except OperationalError as exc:
+                unwritten = [row for rest in parts for row in rest] + part
+                logger.error("Budget ledger flush of %d records failed: %s", len(unwritten), exc, exc_info=True)
+                return written, unwritten
+            except Exception as exc:
+                if len(part) > 1:
+                    middle = len(part) // 2
+                    parts.extend([part[middle:], part[:middle]])
+                    continue
+                logger.error("💸 Dropping usage record for run %s: %s", part[0]["project_run_id"], exc)
+                self.dropped_records += 1
+            else:
+                written += len(part)
+        return written, []
+
+    def _refresh(self):
+        """Re-read the persisted totals of every cached run and evict idle guards."""
+        with self._cond:
+            run_ids = list(self._guards)
+        if not run_ids:
+            return
+        try:
+            with self.session_factory() as db:
+                totals = db.query(
+                    ProjectRun.id,
+                    ProjectRun.budget_spent_usd_estimate,
+                    ProjectRun.budget_spent_input_tokens,
+                    ProjectRun.budget_spent_output_tokens,
+                ).filter(ProjectRun.id.in_(run_ids)).all()
+        except Exception as exc:
+            logger.error("Budget ledger refresh of %d runs failed: %s", len(run_ids), exc, exc_info=True)
+            return
+
+        with self._cond:
+            # Persisted totals include everything written; re-add what is still queued
+            unflushed = _sum_by_run(self._pending)
+            for run_id, spent_usd, spent_input, spent_output in totals:
+                guard = self._guards.get(run_id)
+                if guard is None:
+                    continue
+                extra = unflushed.get(run_id, dict.fromkeys(TOTAL_COLUMNS, 0))
+                guard.tracker.set_spent(
+                    spent_usd + extra["cost_usd"],
+                    spent_input + extra["input_tokens"],
+                    spent_output + extra["output_tokens"],
+                )
+            idle_since = time.monotonic() - self.guard_ttl
+            for run_id in list(self._guards):
+                if run_id not in unflushed and self._last_used.get(run_id, float("-inf")) < idle_since:
+                    del self._guards[run_id]
+                    self._last_used.pop(run_id, None)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._stopped:
+                    self._cond.wait_for(
+                        lambda: len(self._pending) >= self.max_batch or self._stopped,
+                        timeout=self.flush_interval,
+                    )
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+
+_ledger: Optional[BudgetLedger] = None
+
+
+def get_budget_ledger() -> Optional[BudgetLedger]:
+    """Dependency: the process-wide ledger, or None when disabled."""
+    return _ledger
+
+
+def start_budget_ledger():
+    """Create and start the process-wide ledger if enabled in settings."""
+    global _ledger
+    if not settings.budget_ledger_enabled or _ledger is not None:
+        return
+    _ledger = BudgetLedger(
+        SessionLocal,
+        flush_interval=settings.budget_ledger_flush_ms / 1000,
+        max_batch=settings.budget_ledger_max_batch,
+        max_pending=settings.budget_ledger_max_pending,
+        guard_ttl=settings.budget_ledger_guard_ttl,
+    )
+    _ledger.start()
+    logger.info("Budget ledger started")
+
+
+def stop_budget_ledger():
+    """Flush and stop the process-wide ledger."""
+    global _ledger
+    if _ledger is not None:
+        _ledger.stop()
+        _ledger = None
+        logger.info("Budget ledger stopped")
@@ -0,0 +1,168 @@
+"""Write-behind buffer that coalesces comments into multi-row inserts."""
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.core.database import SessionLocal
+from app.services.comments import insert_comments
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BufferFullError(RuntimeError):
+    """Raised when the buffer is at capacity (caller should back off)."""
+
+
+class CommentWriteBuffer:
+    """Queue comment rows in memory and flush them in batches.
+
+    A background thread writes up to ``max_batch`` rows per INSERT, as soon
+    as a full batch is queued or ``flush_interval`` seconds after the first
+    queued row, whichever comes first. Each row gets a Future that resolves
+    to its ID once committed, so callers choose their durability: wait on
+    the futures (ack after flush) or return immediately (ack on enqueue).
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_batch: int = 500,
+        flush_interval: float = 0.05,
+        max_pending: int = 10000,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[Tuple[Dict[str, Any], Future]] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+
+    def start(self):
+        """Start the flush thread."""
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="comment-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Flush everything still queued and stop the flush thread."""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, rows: List[Dict[str, Any]]) -> List[Future]:
+        """Queue comment rows; returns one Future per row.
+
+        Raises:
+            BufferFullError: If queueing would exceed ``max_pending``
+        """
+        futures = [Future() for _ in rows]
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Comment buffer is stopped")
+            if len(self._pending) + len(rows) > self.max_pending:
+                raise BufferFullError("Comment buffer is full")
+            self._pending.extend(zip(rows, futures))
+            self._cond.notify()
+        return futures
+
+    @property
+    def pending(self) -> int:
+        """Rows queued but not yet written."""
+        return len(self._pending)
+
+    def _next_batch(self) -> List[Tuple[Dict[str, Any], Future]]:
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if not self._stopped:
+                # Give concurrent writers a moment to fill the batch
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.max_batch or self._stopped,
+                    timeout=self.flush_interval,
+                )
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # stopped and drained
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], Future]]):
+        """Write ``batch``, failing only the futures of rows the database rejects.
+
+        A rejected INSERT is retried in halves until the offending rows are
+        isolated; any other error fails every row not yet written.
+        """
+        parts = [batch]
+        while parts:
+            part = parts.pop()
+            rows = [row for row, _ in part]
+            try:
+                with self.session_factory() as db:
+                    insert_comments(db, rows)
+                    db.commit()
+            except (IntegrityError, DataError) as exc:
+                if len(part) > 1:
+                    middle = len(part) // 2
+                    parts.extend([part[middle:], part[:middle]])
+                    continue
+                logger.error("Comment buffer rejected comment %s: %s", rows[0]["id"], exc)
+                part[0][1].set_exception(exc)
+                continue
+            except Exception as exc:
+                unwritten = [entry for rest in parts for entry in rest] + part
+                logger.error("Comment buffer flush of %d rows failed: %s", len(unwritten), exc, exc_info=True)
+                for _, future in unwritten:
+                    future.set_exception(exc)
+                return
+
+            self.flushed_rows += len(rows)
+            self.flushed_batches += 1
+            for row, future in part:
+                future.set_result(row["id"])
+
+
+_buffer: Optional[CommentWriteBuffer] = None
+
+
+def get_comment_buffer() -> Optional[CommentWriteBuffer]:
+    """Dependency: the process-wide buffer, or None when disabled."""
+    return _buffer
+
+
+def start_comment_buffer():
+    """Create and start the process-wide buffer if enabled in settings."""
+    global _buffer
+    if not settings.comment_buffer_enabled or _buffer is not None:
+        return
+    _buffer = CommentWriteBuffer(
+        SessionLocal,
+        max_batch=settings.comment_buffer_max_batch,
+        flush_interval=settings.comment_buffer_flush_ms / 1000,
+        max_pending=settings.comment_buffer_max_pending,
+    )
+    _buffer.start()
+    logger.info("Comment write-behind buffer started")
+
+
+def stop_comment_buffer():
+    """Drain and stop the process-wide buffer."""
+    global _buffer
+    if _buffer is not None:
+        _buffer.stop()
+        _buffer = None
+        logger.info("Comment write-behind buffer stopped")
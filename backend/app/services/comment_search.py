@@ -0,0 +1,154 @@
+"""Search over a run's comment audit trail.
+
+``mode=text`` is ranked full-text search: Postgres uses the weighted
+``search_vector`` column (title > content > work_summary) with
+``websearch_to_tsquery``; SQLite uses the ``task_comments_fts`` FTS5 table
+with bm25 using the same weights. ``mode=substring`` is a case-insensitive
+substring match (trigram-indexed on Postgres) for identifiers such as file
+paths that the text parsers split apart.
+
+A page is fetched in two steps: a keyset-paged query that returns only ids,
+ranks and timestamps, then one query that loads the summary columns and
+highlights for just those rows.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Float, cast, column, func, literal_column, table
+from sqlalchemy.orm import Session
+from app.core.models import Task, TaskComment
+from app.utils.pagination import paginate
+import re
+
+SEARCH_MODES = ["text", "substring"]
+MIN_SUBSTRING_LENGTH = 3
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<mark>", "</mark>"
+SUMMARY_COLUMNS = [
+    TaskComment.id,
+    TaskComment.task_id,
+    TaskComment.agent_id,
+    TaskComment.agent_role,
+    TaskComment.comment_type,
+    TaskComment.title,
+    TaskComment.created_at,
+]
+
+_TS_CONFIG = literal_column("'english'::regconfig")
+_POSTGRES_HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, MaxFragments=2, MaxWords=20, MinWords=5"
+)
+# bm25 column weights, matching the tsvector setweight() classes A/B/C
+_FTS5_WEIGHTS = (10.0, 4.0, 1.0)
+_fts = literal_column("task_comments_fts")
+_fts_table = table("task_comments_fts", column("rowid"))
+_fts_join = _fts_table.c.rowid == literal_column("task_comments.rowid")
+
+
+def fts5_query(q: str) -> str:
+    """Quote each term so user input is never parsed as FTS5 syntax (terms are ANDed)."""
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        raise ValueError("Search query has no searchable terms")
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _run_comments(db: Session, run_id: str, *columns):
+    return db.query(*columns).join(Task, Task.id == TaskComment.task_id).filter(Task.project_run_id == run_id)
+
+
+def _text_matches(db: Session, run_id: str, q: str):
+    """Matching comment ids with their rank (higher is better)."""
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = func.websearch_to_tsquery(_TS_CONFIG, q)
+        vector = literal_column("task_comments.search_vector")
+        # float8, so the rank in a cursor round-trips exactly (ts_rank_cd is float4)
+        rank = cast(func.ts_rank_cd(vector, tsquery, 32), Float)
+        return _run_comments(
+            db, run_id, TaskComment.id, TaskComment.created_at, rank.label("rank"),
+        ).filter(vector.op("@@")(tsquery))
+
+    rank = -func.bm25(_fts, *_FTS5_WEIGHTS, type_=Float)
+    return _run_comments(
+        db, run_id, TaskComment.id, TaskComment.created_at, rank.label("rank"),
+    ).join(_fts_table, _fts_join).filter(_fts.op("MATCH")(fts5_query(q)))
+
+
+def _text_highlights(db: Session, ids: List[str], q: str) -> Dict[str, str]:
+    if db.get_bind().dialect.name == "postgresql":
+        headline = func.ts_headline(
+            _TS_CONFIG, TaskComment.content, func.websearch_to_tsquery(_TS_CONFIG, q), _POSTGRES_HEADLINE_OPTIONS,
+        )
+        rows = db.query(TaskComment.id, headline).filter(TaskComment.id.in_(ids))
+    else:
+        # snippet() only works in a MATCH query; column 1 is content
+        snippet = func.snippet(_fts, 1, HIGHLIGHT_START, HIGHLIGHT_STOP, "…", 16)
+        rows = db.query(TaskComment.id, snippet).join(_fts_table, _fts_join).filter(
+            _fts.op("MATCH")(fts5_query(q)), TaskComment.id.in_(ids),
+        )
+    return dict(rows.all())
+
+
+def highlight_substring(text: Optional[str], needle: str, context: int = 60) -> Optional[str]:
+    """Excerpt around the first case-insensitive occurrence of ``needle``, marked up."""
+    if not text:
+        return None
+    start = text.lower().find(needle.lower())
+    if start < 0:
+        return None
+    end = start + len(needle)
+    prefix = "…" if start > context else ""
+    suffix = "…" if end + context < len(text) else ""
+    return (
+        f"{prefix}{text[max(0, start - context):start]}"
+        f"{HIGHLIGHT_START}{text[start:end]}{HIGHLIGHT_STOP}"
+        f"{text[end:end + context]}{suffix}"
+    )
+
+
+def search_comments(
+    db: Session,
+    run_id: str,
+    q: str,
+    mode: str = "text",
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of search hits (best first) and the cursor for the next page.
+
+    Raises:
+        ValueError: On an unknown mode, an unusable query or a bad cursor
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Invalid mode. Choose from: {', '.join(SEARCH_MODES)}")
+
+    if mode == "text":
+        matches = _text_matches(db, run_id, q).subquery()
+        sort_key = [(matches.c.rank, True), (matches.c.created_at, True), (matches.c.id, True)]
+    else:
+        if len(q) < MIN_SUBSTRING_LENGTH:
+            raise ValueError(f"Substring search needs at least {MIN_SUBSTRING_LENGTH} characters")
+        pattern = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        matches = _run_comments(db, run_id, TaskComment.id, TaskComment.created_at).filter(
+            TaskComment.title.ilike(pattern, escape="\\") | TaskComment.content.ilike(pattern, escape="\\")
+        ).subquery()
+        sort_key = [(matches.c.created_at, True), (matches.c.id, True)]
+
+    page, next_cursor = paginate(db.query(matches), sort_key, limit, cursor=cursor)
+    if not page:
+        return [], None
+
+    ids = [row.id for row in page]
+    columns = SUMMARY_COLUMNS if mode == "text" else SUMMARY_COLUMNS + [TaskComment.content]
+    details = {row.id: row for row in db.query(*columns).filter(TaskComment.id.in_(ids))}
+    highlights = _text_highlights(db, ids, q) if mode == "text" else {
+        row.id: highlight_substring(row.content, q) or highlight_substring(row.title, q)
+        for row in details.values()
+    }
+
+    hits = []
+    for row in page:
+        detail = details[row.id]
+        hits.append({
+            **{column.key: getattr(detail, column.key) for column in SUMMARY_COLUMNS},
+            "rank": getattr(row, "rank", None),
+            "highlight": highlights.get(row.id),
+        })
+    return hits, next_cursor
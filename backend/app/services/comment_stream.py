@@ -0,0 +1,105 @@
+"""Server-Sent Events tail of a run's comment audit trail.
+
+The stream replays committed comments after the client's ``Last-Event-ID``
+in ``(created_at, id)`` order, then switches to live ``comment.created``
+events from the run's pub/sub channel. The hub subscription is opened
+before the replay query, so nothing committed in between is lost; live
+events already covered by the replay are skipped.
+
+Each replay page uses its own short session, so a long-lived stream holds
+no pooled connection while it waits for live events.
+"""
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.core.models import Task, TaskComment
+from app.services.event_hub import RunEventHub
+from app.services.events import comment_event_data, encode_event
+from app.utils.pagination import decode_cursor, encode_cursor, paginate
+import asyncio
+import json
+
+# Oldest first, so the last event ID sent is always the resume point
+STREAM_SORT_KEY = [(TaskComment.created_at, False), (TaskComment.id, False)]
+REPLAY_PAGE_SIZE = 500
+# Replayed comments this close to the subscribe time may also arrive live
+LIVE_OVERLAP = timedelta(seconds=60)
+RETRY_MS = 2000
+
+
+def parse_last_event_id(last_event_id: Optional[str]) -> Optional[str]:
+    """Validate a resume token (an encoded ``(created_at, id)`` cursor).
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    if last_event_id:
+        decode_cursor(last_event_id, STREAM_SORT_KEY)
+    return last_event_id or None
+
+
+def _format(event_id: Optional[str], data: str, event: str = "comment") -> str:
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.insert(0, f"id: {event_id}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _replay_page(
+    session_factory: Callable[[], Session], run_id: str, cursor: Optional[str],
+) -> Tuple[List, Optional[str]]:
+    with session_factory() as db:
+        query = db.query(
+            TaskComment.id,
+            TaskComment.task_id,
+            TaskComment.agent_id,
+            TaskComment.comment_type,
+            TaskComment.title,
+            TaskComment.created_at,
+        ).join(Task, Task.id == TaskComment.task_id).filter(Task.project_run_id == run_id)
+        rows, _ = paginate(query, STREAM_SORT_KEY, REPLAY_PAGE_SIZE, cursor=cursor)
+    return rows, encode_cursor([rows[-1].created_at, rows[-1].id]) if rows else cursor
+
+
+async def stream_comments(
+    session_factory: Callable[[], Session],
+    hub: RunEventHub,
+    run_id: str,
+    last_event_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """Yield SSE frames: replay after ``last_event_id``, then live comments."""
+    subscription = await hub.subscribe(run_id)
+    subscribed_at = datetime.utcnow()
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+
+        cursor = last_event_id
+        recent_ids: Set[str] = set()
+        while True:
+            rows, next_cursor = await run_in_threadpool(_replay_page, session_factory, run_id, cursor)
+            for row in rows:
+                if row.created_at >= subscribed_at - LIVE_OVERLAP:
+                    recent_ids.add(row.id)
+                data = encode_event(run_id, "comment.created", comment_event_data(row._mapping))
+                yield _format(encode_cursor([row.created_at, row.id]), data)
+            cursor = next_cursor
+            if len(rows) < REPLAY_PAGE_SIZE:
+                break
+
+        while not subscription.dropped:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), settings.events_ws_heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            event = json.loads(message)
+            if event["type"] != "comment.created" or event["comment_id"] in recent_ids:
+                continue
+            created_at = datetime.fromisoformat(event["created_at"])
+            yield _format(encode_cursor([created_at, event["comment_id"]]), message)
+        # Dropped as a slow consumer: end the stream; the client resumes from its last ID
+    finally:
+        await hub.unsubscribe(subscription)
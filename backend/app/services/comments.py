@@ -0,0 +1,76 @@
+"""Comment write path shared by the API and the write-behind buffer, and list projections."""
+from sqlalchemy import insert
+from sqlalchemy.orm import Query, Session, load_only
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+from datetime import datetime
+from app.core.models import TaskComment, CommentType
+from app.core.schemas import TaskCommentCreate, TaskCommentResponse, TaskCommentSummary
+from app.services import run_versions
+from app.services.file_refs import insert_file_refs, normalize_sha
+
+COMMENT_VIEWS = ["summary", "full"]
+COMMENT_FIELDS = list(TaskCommentResponse.model_fields)
+SUMMARY_FIELDS = list(TaskCommentSummary.model_fields)
+
+
+def comment_values(task_id: str, comment_data: TaskCommentCreate) -> Dict[str, Any]:
+    """Build a task_comments row from a create payload.
+
+    Raises:
+        ValueError: If comment_type is not a CommentType
+    """
+    values = comment_data.model_dump()
+    values["git_commits"] = [normalize_sha(sha) for sha in values["git_commits"]]
+    try:
+        values["comment_type"] = CommentType[comment_data.comment_type.upper()]
+    except KeyError:
+        raise ValueError(
+            f"Invalid comment_type. Choose from: {', '.join([c.value for c in CommentType])}"
+        )
+
+    now = datetime.utcnow()
+    values.update(id=str(uuid4()), task_id=task_id, created_at=now, updated_at=now)
+    return values
+
+
+def insert_comments(db: Session, rows: List[Dict[str, Any]]) -> None:
+    """Insert comment rows and their file/commit refs with multi-row INSERTs (caller commits).
+
+    Also advances the owning runs' versions. Commit SHAs are stored lowercase.
+    """
+    for row in rows:
+        row["git_commits"] = [normalize_sha(sha) for sha in row.get("git_commits") or ()]
+    if rows:
+        db.execute(insert(TaskComment), rows)
+        insert_file_refs(db, rows)
+        run_versions.bump_for_tasks(db, {row["task_id"] for row in rows})
+
+
+def comment_projection(view: str, fields: Optional[str]) -> Optional[List[str]]:
+    """Columns to load for a list request; None means the full row.
+
+    ``fields`` adds columns on top of the summary view (and implies it).
+
+    Raises:
+        ValueError: On an unknown view or field name
+    """
+    if view not in COMMENT_VIEWS:
+        raise ValueError(f"Invalid view. Choose from: {', '.join(COMMENT_VIEWS)}")
+    extra = [name.strip() for name in (fields or "").split(",") if name.strip()]
+    unknown = sorted(set(extra) - set(COMMENT_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(COMMENT_FIELDS)}")
+    if view == "full" and not extra:
+        return None
+    return SUMMARY_FIELDS + [name for name in extra if name not in SUMMARY_FIELDS]
+
+
+def project_comments(query: Query, columns: List[str]) -> Query:
+    """Restrict a TaskComment query to ``columns``; the rest stay unloaded."""
+    return query.options(load_only(*[getattr(TaskComment, name) for name in columns], raiseload=True))
+
+
+def comment_summary(comment: TaskComment, columns: List[str]) -> TaskCommentSummary:
+    """Serialize only the loaded ``columns`` of a projected comment."""
+    return TaskCommentSummary.model_validate({name: getattr(comment, name) for name in columns})
@@ -0,0 +1,95 @@
+"""Run configuration resolution.
+
+A run's config is the ``ProjectConfig`` defaults, overlaid with the
+template's ``config_patch``, the project's overrides and the run's
+overrides (later layers win; nested dicts merge key by key). Resolution
+is memoized by the content of the layers, and each distinct result is
+stored once as a content blob and referenced by hash from its runs.
+"""
+from functools import lru_cache
+from typing import Any, Dict, NamedTuple, Optional
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from app.core.models import ProjectTemplate
+from app.core.schemas import (
+    ProjectConfig,
+    ProjectConfigBudget,
+    ProjectConfigPlanning,
+    ProjectConfigProcess,
+    ProjectConfigQuality,
+    ProjectConfigTeam,
+)
+from app.services import blobs, template_cache
+from app.services.blobs import canonical_json
+from app.services.template_cache import TemplateCache
+import copy
+import json
+
+DEFAULT_CONFIG: Dict[str, Any] = ProjectConfig(
+    team=ProjectConfigTeam(),
+    planning=ProjectConfigPlanning(),
+    process=ProjectConfigProcess(),
+    quality=ProjectConfigQuality(),
+    budget=ProjectConfigBudget(),
+).model_dump()
+
+
+class ResolvedConfig(NamedTuple):
+    hash: str
+    config: Dict[str, Any]
+
+
+def deep_merge(base: Dict[str, Any], patch: Dict[str, Any]) -> Dict[str, Any]:
+    """Return ``base`` overlaid with ``patch``; nested dicts merge, anything else replaces."""
+    merged = dict(base)
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+@lru_cache(maxsize=512)
+def _resolve(layers_json: str) -> ResolvedConfig:
+    config = DEFAULT_CONFIG
+    for layer in json.loads(layers_json):
+        config = deep_merge(config, layer)
+    try:
+        validated = ProjectConfig.model_validate(config).model_dump()
+    except ValidationError as exc:
+        raise ValueError(f"Invalid config: {exc}") from None
+    return ResolvedConfig(blobs.content_hash(validated)[0], validated)
+
+
+def resolve_config(*layers: Optional[Dict[str, Any]]) -> ResolvedConfig:
+    """Merge and validate config layers over the defaults.
+
+    Raises:
+        ValueError: If the merged config does not validate as ``ProjectConfig``
+    """
+    resolved = _resolve(canonical_json([layer for layer in layers if layer]))
+    # Callers get their own copy; the memoized one must stay untouched
+    return ResolvedConfig(resolved.hash, copy.deepcopy(resolved.config))
+
+
+def store_snapshot(db: Session, resolved: ResolvedConfig) -> str:
+    """Store (or reference) the snapshot blob for ``resolved``; returns its hash (caller commits)."""
+    return blobs.put_blob(db, resolved.config)
+
+
+def template_patch(
+    db: Session,
+    cache: Optional[TemplateCache],
+    template_id: Optional[str],
+) -> Optional[Dict[str, Any]]:
+    """A template's ``config_patch`` via the template cache (None if no/unknown template)."""
+    if not template_id:
+        return None
+
+    def load():
+        template = db.get(ProjectTemplate, template_id)
+        return template_cache.serialize_template(template) if template else None
+
+    entry = template_cache.read_through(cache, template_cache.id_key(template_id), load)
+    return entry["body"]["config_patch"] if entry else None
@@ -0,0 +1,125 @@
+"""In-process fan-out of run events to WebSocket clients.
+
+One Redis subscription per run per process, shared by every socket
+watching that run. Each socket gets a bounded queue; a socket that lets
+its queue fill up is dropped rather than slowing the others down.
+"""
+from typing import Callable, Dict, Optional, Set
+from app.config import settings
+from app.services.events import get_async_redis, run_channel
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One consumer's view of a run's event stream."""
+
+    def __init__(self, run_id: str, max_queue: int):
+        self.run_id = run_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = False
+
+    def offer(self, message: str) -> bool:
+        """Queue a message; returns False (and marks dropped) if the queue is full."""
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped = True
+            return False
+
+
+class RunEventHub:
+    """Multiplex per-run Redis subscriptions across local subscribers."""
+
+    def __init__(self, redis_factory: Callable = get_async_redis, max_queue: int = 256):
+        self.redis_factory = redis_factory
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+        self._readers: Dict[str, asyncio.Task] = {}
+        self._lock = asyncio.Lock()
+        self.dropped_total = 0
+
+    async def subscribe(self, run_id: str) -> Subscription:
+        """Register a consumer; the Redis subscription is live when this returns."""
+        subscription = Subscription(run_id, self.max_queue)
+        async with self._lock:
+            if run_id not in self._readers:
+                pubsub = self.redis_factory().pubsub()
+                await pubsub.subscribe(run_channel(run_id))
+                self._subscribers[run_id] = set()
+                self._readers[run_id] = asyncio.create_task(self._read(run_id, pubsub))
+            self._subscribers[run_id].add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        """Remove a consumer; the last one out closes the Redis subscription."""
+        async with self._lock:
+            subscribers = self._subscribers.get(subscription.run_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.run_id]
+                self._readers.pop(subscription.run_id).cancel()
+
+    async def close(self):
+        """Cancel all Redis subscriptions (on shutdown)."""
+        async with self._lock:
+            for reader in self._readers.values():
+                reader.cancel()
+            self._readers.clear()
+            self._subscribers.clear()
+
+    def subscriber_count(self, run_id: Optional[str] = None) -> int:
+        """Local subscribers for one run, or for all runs."""
+        if run_id is not None:
+            return len(self._subscribers.get(run_id, ()))
+        return sum(len(s) for s in self._subscribers.values())
+
+    async def _read(self, run_id: str, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                for subscription in list(self._subscribers.get(run_id, ())):
+                    if not subscription.offer(message["data"]):
+                        # Slow consumer: stop feeding it; its socket closes itself
+                        self._subscribers[run_id].discard(subscription)
+                        self.dropped_total += 1
+                        logger.warning("Dropped slow event consumer for run %s", run_id)
+        except asyncio.CancelledError:
+            pass
+        except Exception as exc:
+            logger.error("Event reader for run %s failed: %s", run_id, exc, exc_info=True)
+            # Drop everyone so clients reconnect and get a fresh subscription
+            for subscription in self._subscribers.pop(run_id, ()):
+                subscription.dropped = True
+            self._readers.pop(run_id, None)
+        finally:
+            try:
+                await pubsub.unsubscribe(run_channel(run_id))
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+_hub: Optional[RunEventHub] = None
+
+
+def get_event_hub() -> RunEventHub:
+    """Dependency: the process-wide event hub."""
+    global _hub
+    if _hub is None:
+        _hub = RunEventHub(max_queue=settings.events_ws_queue_size)
+    return _hub
+
+
+async def close_event_hub():
+    """Close the process-wide hub (on shutdown)."""
+    global _hub
+    if _hub is not None:
+        await _hub.close()
+        _hub = None
@@ -0,0 +1,102 @@
+"""Run event publishing over Redis pub/sub.
+
+Mutations publish compact JSON events on one channel per run
+(``runs:{run_id}:events``). Publishing is best effort: a Redis outage is
+logged and never fails the request that triggered the event.
+"""
+from typing import Any, Dict, Mapping, Optional, Union
+from datetime import datetime
+from app.config import settings
+import json
+import logging
+import redis
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+_redis: Optional[redis.Redis] = None
+_async_redis: Optional[aioredis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Get the process-wide sync Redis client (used for publishing and caches).
+
+    Calls on it run on request threads, so a hung Redis fails them after
+    ``REDIS_SOCKET_TIMEOUT`` rather than the TCP timeout.
+    """
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_connect_timeout,
+        )
+    return _redis
+
+
+def get_async_redis() -> aioredis.Redis:
+    """Get the process-wide async Redis client (used for subscriptions).
+
+    No read timeout: subscriptions block on reads between events.
+    """
+    global _async_redis
+    if _async_redis is None:
+        _async_redis = aioredis.Redis.from_url(
+            settings.redis_url,
+            decode_responses=True,
+            socket_connect_timeout=settings.redis_connect_timeout,
+        )
+    return _async_redis
+
+
+def set_redis_clients(sync_client: Optional[redis.Redis], async_client: Optional[aioredis.Redis]):
+    """Replace the Redis clients (tests use fakeredis)."""
+    global _redis, _async_redis
+    _redis, _async_redis = sync_client, async_client
+
+
+def run_channel(run_id: str) -> str:
+    """Pub/sub channel carrying a run's events."""
+    return f"runs:{run_id}:events"
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "value"):  # enums
+        return value.value
+    return str(value)
+
+
+def encode_event(run_id: str, event_type: str, data: Dict[str, Any]) -> str:
+    """Serialize an event to its compact wire form."""
+    event = {"type": event_type, "run_id": run_id, "ts": datetime.utcnow().isoformat(), **data}
+    return json.dumps(event, separators=(",", ":"), default=_json_default)
+
+
+def publish_event(run_id: str, event_type: str, **data: Any) -> None:
+    """Publish an event on the run's channel (best effort)."""
+    if not settings.events_enabled:
+        return
+    try:
+        get_redis().publish(run_channel(run_id), encode_event(run_id, event_type, data))
+    except redis.RedisError as exc:
+        logger.warning("Could not publish %s for run %s: %s", event_type, run_id, exc)
+
+
+def comment_event_data(comment: Union[Mapping[str, Any], Any]) -> Dict[str, Any]:
+    """Compact comment fields for events (accepts an ORM row or a values dict)."""
+    if isinstance(comment, Mapping):
+        get = comment.get
+    else:
+        def get(key):
+            return getattr(comment, key)
+    return {
+        "comment_id": get("id"),
+        "task_id": get("task_id"),
+        "agent_id": get("agent_id"),
+        "comment_type": get("comment_type"),
+        "title": get("title"),
+        "created_at": get("created_at"),
+    }
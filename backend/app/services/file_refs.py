@@ -0,0 +1,141 @@
+"""File and commit lookups over the comment audit trail.
+
+``comment_file_refs`` holds one row per (comment, path, change) taken from
+``files_created`` / ``files_modified`` when a comment is inserted, so
+"which tasks touched this path or directory" is a btree lookup or prefix
+range scan instead of a scan over every comment's arrays.
+``comment_commit_refs`` does the same for ``git_commits`` (lowercased), so an
+abbreviated SHA resolves with a prefix range scan.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from app.core.models import CommentCommitRef, CommentFileRef, Task, TaskComment
+import re
+
+SHA_PATTERN = re.compile(r"^[0-9a-f]{7,40}$")
+
+
+def normalize_path(path: str) -> str:
+    """Canonical repo-relative form used for storage and lookups."""
+    path = path.strip().replace("\\", "/")
+    while path.startswith("./"):
+        path = path[2:]
+    return path.lstrip("/")
+
+
+def normalize_sha(sha: str) -> str:
+    """Canonical (lowercase) form of a commit SHA used for storage and lookups."""
+    return sha.strip().lower()
+
+
+def file_ref_rows(comments: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Side-table rows for comment value dicts (duplicates within a comment collapse)."""
+    rows = {}
+    for comment in comments:
+        for change, paths in (("created", comment.get("files_created")), ("modified", comment.get("files_modified"))):
+            for path in paths or ():
+                path = normalize_path(path)
+                if path:
+                    rows[(comment["id"], path, change)] = {
+                        "comment_id": comment["id"],
+                        "path": path,
+                        "change": change,
+                        "task_id": comment["task_id"],
+                        "created_at": comment["created_at"],
+                    }
+    return list(rows.values())
+
+
+def commit_ref_rows(comments: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Side-table rows for the commits of comment value dicts (duplicates within a comment collapse)."""
+    rows = {}
+    for comment in comments:
+        for sha in comment.get("git_commits") or ():
+            sha = normalize_sha(sha)
+            if sha:
+                rows[(comment["id"], sha)] = {
+                    "comment_id": comment["id"],
+                    "sha": sha,
+                    "task_id": comment["task_id"],
+                    "created_at": comment["created_at"],
+                }
+    return list(rows.values())
+
+
+def insert_file_refs(db: Session, comments: Iterable[Dict[str, Any]]) -> None:
+    """Index the paths and commits of newly inserted comments (caller commits)."""
+    comments = list(comments)
+    rows = file_ref_rows(comments)
+    if rows:
+        db.execute(insert(CommentFileRef), rows)
+    rows = commit_ref_rows(comments)
+    if rows:
+        db.execute(insert(CommentCommitRef), rows)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def tasks_touching(
+    db: Session,
+    path: str,
+    prefix: bool = False,
+    project_run_id: Optional[str] = None,
+    limit: int = 100,
+) -> List[Dict[str, Any]]:
+    """Tasks whose comments created or modified ``path`` (or anything under it), latest first.
+
+    Raises:
+        ValueError: If the path is empty
+    """
+    path = normalize_path(path)
+    if not path:
+        raise ValueError("Path must not be empty")
+
+    match = (
+        CommentFileRef.path.like(_escape_like(path) + "%", escape="\\")
+        if prefix else CommentFileRef.path == path
+    )
+    last_touched = func.max(CommentFileRef.created_at).label("last_touched_at")
+    query = db.query(
+        Task.id.label("task_id"),
+        Task.project_run_id,
+        Task.title,
+        Task.status,
+        func.count(func.distinct(CommentFileRef.path)).label("paths_matched"),
+        func.count(func.distinct(CommentFileRef.comment_id)).label("comment_count"),
+        last_touched,
+    ).join(Task, Task.id == CommentFileRef.task_id).filter(match)
+    if project_run_id:
+        query = query.filter(Task.project_run_id == project_run_id)
+
+    rows = query.group_by(Task.id, Task.project_run_id, Task.title, Task.status).order_by(
+        last_touched.desc(), Task.id,
+    ).limit(limit)
+    return [dict(row._mapping) for row in rows]
+
+
+def comments_for_commit_query(db: Session, sha: str, project_run_id: Optional[str] = None):
+    """Comments that record a commit starting with ``sha``, newest first.
+
+    An abbreviated SHA matches every recorded commit it is a prefix of (as
+    ``git rev-parse`` would, without the ambiguity error); a full SHA
+    matches exactly.
+
+    Raises:
+        ValueError: If ``sha`` is not 7-40 hex characters
+    """
+    sha = normalize_sha(sha)
+    if not SHA_PATTERN.match(sha):
+        raise ValueError("Invalid commit SHA: expected 7-40 hex characters")
+
+    # Hex digits need no LIKE escaping
+    match = CommentCommitRef.sha == sha if len(sha) == 40 else CommentCommitRef.sha.like(sha + "%")
+    query = db.query(TaskComment).filter(
+        TaskComment.id.in_(db.query(CommentCommitRef.comment_id).filter(match))
+    )
+    if project_run_id:
+        query = query.join(Task, Task.id == TaskComment.task_id).filter(Task.project_run_id == project_run_id)
+    return query.order_by(TaskComment.created_at.desc(), TaskComment.id.desc())
@@ -0,0 +1,317 @@
+"""Prometheus metrics for the request hot path, the database and budgets.
+
+``MetricsMiddleware`` is a plain ASGI middleware: it times each request and
+labels it with the matched route template (``/api/runs/{run_id}``, not the
+raw path), so label cardinality stays bounded. Cursor events registered
+on the instrumented engine (``instrument_engine``, only when metrics are
+enabled) count and time every statement; statements run while a request is in
+flight are also added to that request's totals (carried in a contextvar,
+which the threadpool running sync handlers inherits). Pool checkout wait
+is timed around the pool's internal ``_do_get``.
+
+Budget gauges are read from the ledger's cached trackers at scrape time,
+so scraping never queries the database.
+
+The same listeners back the query budget: statements slower than
+``DB_SLOW_QUERY_MS`` are logged with their route (and bound parameters
+only with ``DB_SLOW_QUERY_LOG_PARAMS``), and with
+``DB_QUERY_BUDGET`` set, a request that runs more statements than that is
+logged with its most repeated statement (the usual N+1 signature).
+``capture_queries`` records the statements of a block for tests.
+"""
+from collections import Counter as Tally
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    PlatformCollector,
+    ProcessCollector,
+    generate_latest,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from app.config import settings
+from app.utils.pricing import get_pricing
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+PlatformCollector(registry=REGISTRY)
+
+UNMATCHED = "unmatched"
+MAX_LOGGED_CHARS = 500
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)  # seconds
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+REQUESTS = Counter(
+    "http_requests", "HTTP requests by route template and status",
+    ["method", "route", "status"], registry=REGISTRY,
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency",
+    ["method", "route"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served", registry=REGISTRY)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database statements per HTTP request",
+    ["route"], buckets=QUERY_COUNT_BUCKETS, registry=REGISTRY,
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in database statements per HTTP request",
+    ["route"], buckets=LATENCY_BUCKETS, registry=REGISTRY,
+)
+QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "Database statement latency",
+    ["operation"], buckets=QUERY_BUCKETS, registry=REGISTRY,
+)
+POOL_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection",
+    buckets=QUERY_BUCKETS, registry=REGISTRY,
+)
+LLM_TOKENS = Counter(
+    "llm_tokens", "LLM tokens recorded against run budgets",
+    ["model", "direction"], registry=REGISTRY,
+)
+LLM_COST = Counter("llm_cost_usd", "Estimated LLM spend recorded", ["model"], registry=REGISTRY)
+
+
+# Resolved label children: ``labels()`` takes a lock and builds a key per call
+_QUERY_LATENCY = {operation: QUERY_LATENCY.labels(operation) for operation in OPERATIONS | {"OTHER"}}
+
+
+class QueryStats:
+    """Statements run on behalf of one request (texts only tallied when budgeted)."""
+    __slots__ = ("count", "seconds", "scope", "statements")
+
+    def __init__(self, scope=None, tally: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.scope = scope
+        self.statements: Optional[Tally] = Tally() if tally else None
+
+
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+
+_templates: Dict[Any, str] = {}
+
+
+def route_template(scope) -> str:
+    """The matched route's path template (``unmatched`` before or without a match)."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED
+    template = _templates.get(endpoint)
+    if template is None:
+        routes = scope["app"].routes
+        template = next((r.path for r in routes if getattr(r, "endpoint", None) is endpoint), UNMATCHED)
+        _templates[endpoint] = template
+    return template
+
+
+def _clip(value: Any) -> str:
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= MAX_LOGGED_CHARS else text[:MAX_LOGGED_CHARS] + "..."
+
+
+def redact_params(parameters: Any) -> str:
+    """Bound parameters for a log line: ``<redacted>`` unless ``DB_SLOW_QUERY_LOG_PARAMS`` is set."""
+    return _clip(parameters) if settings.db_slow_query_log_params else "<redacted>"
+
+
+def _operation(statement: str) -> str:
+    verb = statement[:16].lstrip()[:6].upper()
+    return verb if verb in OPERATIONS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements on one connection never nest, so one slot is enough
+    conn.info["query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"]
+    _QUERY_LATENCY[_operation(statement)].observe(elapsed)
+    stats = _request_queries.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        if stats.statements is not None:
+            stats.statements[statement] += 1
+    if 0 < settings.db_slow_query_ms <= elapsed * 1000:
+        where = f"{stats.scope['method']} {route_template(stats.scope)}" if stats and stats.scope else "-"
+        logger.warning(
+            "🐢 Slow query (%.1fms) in %s: %s params=%s",
+            elapsed * 1000, where, _clip(statement), redact_params(parameters),
+        )
+
+
+@contextmanager
+def capture_queries(engine: Engine) -> Iterator[List[str]]:
+    """Statements executed on ``engine`` inside the block, in order."""
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+
+
+def instrument_pool(pool) -> None:
+    """Time connection checkouts of a queue pool (no-op for other pool classes)."""
+    if not isinstance(pool, QueuePool) or getattr(pool, "_metrics_instrumented", False):
+        return
+    do_get = pool._do_get
+
+    def timed_do_get():
+        started = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            POOL_WAIT.observe(time.perf_counter() - started)
+
+    pool._do_get = timed_do_get
+    pool._metrics_instrumented = True
+
+
+class EngineCollector:
+    """Pool occupancy of an engine, read at scrape time."""
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        pool = self.engine.pool
+        if not isinstance(pool, QueuePool):
+            return
+        yield GaugeMetricFamily("db_pool_size", "Configured pool size", value=pool.size())
+        yield GaugeMetricFamily("db_pool_checked_out", "Connections in use", value=pool.checkedout())
+        yield GaugeMetricFamily("db_pool_overflow", "Connections over pool_size", value=max(0, pool.overflow()))
+
+
+class BudgetCollector:
+    """Per-run spend, limits and burn rate from the ledger's cached trackers."""
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        from app.services.budget_ledger import get_budget_ledger
+
+        ledger = get_budget_ledger()
+        guards = ledger.guards() if ledger is not None else {}
+        spent = GaugeMetricFamily("budget_spent_usd", "Estimated spend of the run", labels=["run_id"])
+        limit = GaugeMetricFamily("budget_limit_usd", "USD budget of the run", labels=["run_id"])
+        tokens = GaugeMetricFamily("budget_spent_tokens", "Tokens used by the run", labels=["run_id", "direction"])
+        token_limit = GaugeMetricFamily("budget_limit_tokens", "Token budget of the run", labels=["run_id"])
+        burn = GaugeMetricFamily("budget_burn_rate_usd_per_hour", "Recent spend rate of the run", labels=["run_id"])
+        for run_id, guard in guards.items():
+            tracker = guard.tracker
+            spent.add_metric([run_id], tracker.spent_usd)
+            limit.add_metric([run_id], tracker.max_usd)
+            tokens.add_metric([run_id, "input"], tracker.spent_tokens_input)
+            tokens.add_metric([run_id, "output"], tracker.spent_tokens_output)
+            token_limit.add_metric([run_id], tracker.max_tokens)
+            burn.add_metric([run_id], guard.burn_rate() * 3600)
+        yield from (spent, limit, tokens, token_limit, burn)
+
+
+REGISTRY.register(BudgetCollector())
+
+
+def instrument_queries(engine: Engine) -> None:
+    """Count and time the statements of ``engine`` (and feed the query budget); idempotent."""
+    if event.contains(engine, "after_cursor_execute", _after_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time an engine's statements and export its pool occupancy and checkout wait."""
+    instrument_queries(engine)
+    instrument_pool(engine.pool)
+    REGISTRY.register(EngineCollector(engine))
+
+
+def record_usage(usage: Dict[str, Any]) -> None:
+    """Count one ``BudgetTracker.add_usage`` result (unlisted models share one label)."""
+    price, listed = get_pricing().table.lookup(usage["model"])
+    model = price.model if listed else "other"
+    LLM_TOKENS.labels(model, "input").inc(usage["input_tokens"])
+    LLM_TOKENS.labels(model, "output").inc(usage["output_tokens"])
+    LLM_COST.labels(model).inc(usage["cost_usd"])
+
+
+def render() -> bytes:
+    """The registry in Prometheus text format."""
+    return generate_latest(REGISTRY)
+
+
+class MetricsMiddleware:
+    """Request count, latency, in-flight and per-request DB totals by route template."""
+
+    def __init__(self, app):
+        self.app = app
+        self._children: Dict[Tuple[str, str, int], Tuple[Any, ...]] = {}
+
+    def _metrics(self, method: str, route: str, status: int) -> Tuple[Any, ...]:
+        key = (method, route, status)
+        children = self._children.get(key)
+        if children is None:
+            children = self._children[key] = (
+                REQUESTS.labels(method, route, str(status)),
+                REQUEST_LATENCY.labels(method, route),
+                REQUEST_QUERIES.labels(route),
+                REQUEST_DB_TIME.labels(route),
+            )
+        return children
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        budget = settings.db_query_budget
+        stats = QueryStats(scope, tally=budget > 0)
+        token = _request_queries.set(stats)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        IN_FLIGHT.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            IN_FLIGHT.dec()
+            _request_queries.reset(token)
+            route = route_template(scope)
+            requests, latency, queries, db_time = self._metrics(scope["method"], route, status)
+            requests.inc()
+            latency.observe(elapsed)
+            queries.observe(stats.count)
+            db_time.observe(stats.seconds)
+            if 0 < budget < stats.count:
+                statement, repeats = stats.statements.most_common(1)[0]
+                logger.warning(
+                    "⚠️ %s %s ran %d queries (budget %d); most repeated (%dx): %s",
+                    scope["method"], route, stats.count, budget, repeats, _clip(statement),
+                )
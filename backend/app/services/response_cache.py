@@ -0,0 +1,111 @@
+"""Conditional GETs and a shared response cache for run reads.
+
+Run, task and comment reads derive a weak ETag from the request's path,
+query parameters and the run's version (see app.services.run_versions).
+A matching ``If-None-Match`` gets a 304 before the body is loaded or
+serialized.
+
+The optional tier is a short-TTL Redis cache of rendered bodies, keyed by
+that same ETag. Any write to the run bumps its version, which changes
+every key for the run, so entries never need deleting; old ones expire.
+"""
+from datetime import datetime
+from typing import Any, Callable, Optional, Union
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from app.config import settings
+from app.services.events import get_redis
+from app.utils.etag import etag_matches, http_date, version_etag
+import logging
+import threading
+import redis
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "responses:"
+CACHE_CONTROL = "no-cache"  # store, but revalidate every time
+
+
+class ResponseCache:
+    """Rendered JSON bodies in Redis, with hit counters."""
+
+    def __init__(self, redis_factory: Callable[[], redis.Redis], ttl: int = 10):
+        self.redis_factory = redis_factory
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get(self, etag: str) -> Optional[Any]:
+        """The body cached under ``etag`` (str or bytes), or None."""
+        try:
+            body = self.redis_factory().get(REDIS_PREFIX + etag)
+        except redis.RedisError as exc:
+            logger.warning("Response cache Redis read failed: %s", exc)
+            self._count("errors")
+            return None
+        self._count("misses" if body is None else "hits")
+        return body
+
+    def set(self, etag: str, body: bytes):
+        try:
+            self.redis_factory().set(REDIS_PREFIX + etag, body, ex=self.ttl)
+        except redis.RedisError as exc:
+            logger.warning("Response cache Redis write failed: %s", exc)
+            self._count("errors")
+
+
+def versioned_response(
+    request: Request,
+    version: Union[int, str],
+    updated_at: datetime,
+    build: Callable[[], Any],
+    cache: Optional[ResponseCache] = None,
+) -> Response:
+    """Answer a GET whose body only changes with the run's ``version``.
+
+    ``build`` returns the JSON-ready body; it is called only when the client
+    is not current and ``cache`` (if given) has no copy. Only If-None-Match
+    is honoured: ``Last-Modified`` has one-second resolution, so two writes
+    within a second would look the same to If-Modified-Since.
+    """
+    etag = version_etag(request, version)
+    headers = {"ETag": etag, "Last-Modified": http_date(updated_at), "Cache-Control": CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if cache is not None:
+        body = cache.get(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers=headers)
+
+    response = ORJSONResponse(build(), headers=headers)
+    if cache is not None:
+        cache.set(etag, response.body)
+    return response
+
+
+_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Dependency: the process-wide cache, or None when disabled."""
+    return _cache
+
+
+def start_response_cache():
+    """Create the process-wide cache if enabled."""
+    global _cache
+    if not settings.response_cache_enabled or _cache is not None:
+        return
+    _cache = ResponseCache(get_redis, ttl=settings.response_cache_ttl)
+    logger.info("Response cache started")
+
+
+def stop_response_cache():
+    """Drop the process-wide cache."""
+    global _cache
+    _cache = None
@@ -0,0 +1,127 @@
+"""Per-run task counters and aggregate run summaries."""
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Optional
+from app.core.models import RunTaskCounters, Task, TaskStatus
+
+STATUS_COLUMNS = [status.value.lower() for status in TaskStatus]
+
+
+def _bump(db: Session, run_id: str, **deltas) -> None:
+    """Atomically add ``deltas`` to a run's counters row."""
+    deltas = {column: delta for column, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    db.execute(
+        update(RunTaskCounters)
+        .where(RunTaskCounters.project_run_id == run_id)
+        .values({
+            column: getattr(RunTaskCounters, column) + delta
+            for column, delta in deltas.items()
+        })
+    )
+
+
+def create_counters(db: Session, run_id: str) -> None:
+    """Add an empty counters row for a new run (caller commits)."""
+    db.add(RunTaskCounters(project_run_id=run_id))
+
+
+def record_tasks_created(db: Session, run_id: str, count: int, estimate_hours: float = 0.0) -> None:
+    """Count newly created PENDING tasks."""
+    _bump(db, run_id, total=count, pending=count, estimate_hours=estimate_hours)
+
+
+def record_status_change(db: Session, run_id: str, old: TaskStatus, new: TaskStatus) -> None:
+    """Move one task between status counters."""
+    if old != new:
+        _bump(db, run_id, **{old.value.lower(): -1, new.value.lower(): 1})
+
+
+def record_hours_change(db: Session, run_id: str, actual_hours_delta: float) -> None:
+    """Adjust the run's actual hours total."""
+    _bump(db, run_id, actual_hours=actual_hours_delta)
+
+
+def aggregate_run_tasks(db: Session, run_id: str) -> Dict[str, Any]:
+    """Summarize a run's tasks with one GROUP BY over (status, type, agent)."""
+    rows = db.query(
+        Task.status,
+        Task.task_type,
+        Task.assigned_agent_id,
+        func.count(Task.id),
+        func.coalesce(func.sum(Task.estimate_hours), 0.0),
+        func.coalesce(func.sum(Task.actual_hours), 0.0),
+    ).filter(
+        Task.project_run_id == run_id
+    ).group_by(Task.status, Task.task_type, Task.assigned_agent_id).all()
+
+    by_status = {column: 0 for column in STATUS_COLUMNS}
+    by_type: Dict[str, int] = {}
+    by_agent: Dict[str, int] = {}
+    estimate_hours = actual_hours = 0.0
+    for status, task_type, agent_id, count, estimate, actual in rows:
+        by_status[status.value.lower()] += count
+        by_type[task_type.value] = by_type.get(task_type.value, 0) + count
+        agent_key = agent_id or "unassigned"
+        by_agent[agent_key] = by_agent.get(agent_key, 0) + count
+        estimate_hours += estimate
+        actual_hours += actual
+
+    return {
+        "by_status": by_status,
+        "by_type": by_type,
+        "by_agent": by_agent,
+        "estimate_hours": estimate_hours,
+        "actual_hours": actual_hours,
+    }
+
+
+def _counter_values(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Counters row values from an ``aggregate_run_tasks`` summary."""
+    return dict(
+        total=sum(summary["by_status"].values()),
+        estimate_hours=summary["estimate_hours"],
+        actual_hours=summary["actual_hours"],
+        **summary["by_status"],
+    )
+
+
+def get_counters(db: Session, run_id: str) -> RunTaskCounters:
+    """Get a run's counters row, or (if it is missing) counters computed from its tasks.
+
+    Read-only: a computed row is not stored. Writers create missing rows
+    (``rebuild_counters``), and migration 0006 backfills existing runs.
+    """
+    counters = db.get(RunTaskCounters, run_id, populate_existing=True)
+    if counters is not None:
+        return counters
+    return RunTaskCounters(project_run_id=run_id, **_counter_values(aggregate_run_tasks(db, run_id)))
+
+
+def rebuild_counters(db: Session, run_id: str) -> RunTaskCounters:
+    """Recompute a run's counters from its tasks and store them."""
+    values = _counter_values(aggregate_run_tasks(db, run_id))
+
+    counters: Optional[RunTaskCounters] = db.get(RunTaskCounters, run_id)
+    if counters is None:
+        try:
+            with db.begin_nested():
+                counters = RunTaskCounters(project_run_id=run_id, **values)
+                db.add(counters)
+        except IntegrityError:
+            # Another request created the row first; overwrite it below
+            counters = db.get(RunTaskCounters, run_id, populate_existing=True)
+
+    for column, value in values.items():
+        setattr(counters, column, value)
+    db.commit()
+    return counters
+
+
+def counters_to_dict(counters: RunTaskCounters) -> Dict[str, Any]:
+    """Status counts in the run summary's ``task_counts`` shape."""
+    task_counts = {"total": counters.total}
+    task_counts.update({column: getattr(counters, column) for column in STATUS_COLUMNS})
+    return task_counts
@@ -0,0 +1,66 @@
+"""Per-run change counters behind conditional GETs and the response cache.
+
+Every write to a run, its tasks or their comments bumps
+``project_runs.version`` (and ``updated_at``) in the same transaction, so
+a reader that sees a version also sees every change it covers. Reads of
+those resources look the version up first and derive their ETag from it,
+which answers a revalidation without loading or serializing the body.
+
+Recorded usage (a ledger flush about once a second while a run is busy)
+only advances ``usage_version``: task and comment reads never show spend,
+so their ETags and cached bodies survive it. Run detail and summary, which
+do show spend, use ``spend_version``.
+"""
+from datetime import datetime
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Optional
+from app.core.models import ProjectRun, Task
+
+
+def bump_values() -> Dict[str, Any]:
+    """UPDATE values that advance a run's version (for statements that already write the run row)."""
+    return {"version": ProjectRun.version + 1, "updated_at": datetime.utcnow()}
+
+
+def bump_usage_values() -> Dict[str, Any]:
+    """UPDATE values that advance a run's usage version (for the statement that adds to its spend)."""
+    return {"usage_version": ProjectRun.usage_version + 1}
+
+
+def spend_version(run: ProjectRun) -> str:
+    """Version of reads that include the run's spend (changes with either counter)."""
+    return f"{run.version}.{run.usage_version}"
+
+
+def bump_run(run: ProjectRun) -> None:
+    """Advance a loaded run's version with its next flush."""
+    run.version = ProjectRun.version + 1
+    run.updated_at = datetime.utcnow()
+
+
+def bump(db: Session, run_ids: Iterable[str]) -> None:
+    """Advance the versions of ``run_ids`` (caller commits)."""
+    run_ids = set(run_ids)
+    if run_ids:
+        db.execute(update(ProjectRun).where(ProjectRun.id.in_(run_ids)).values(bump_values()))
+
+
+def bump_for_tasks(db: Session, task_ids: Iterable[str]) -> None:
+    """Advance the versions of the runs owning ``task_ids`` (caller commits)."""
+    task_ids = set(task_ids)
+    if task_ids:
+        runs = select(Task.project_run_id).where(Task.id.in_(task_ids))
+        db.execute(
+            update(ProjectRun)
+            .where(ProjectRun.id.in_(runs))
+            .values(bump_values())
+            .execution_options(synchronize_session=False)
+        )
+
+
+def task_run_version(db: Session, task_id: str) -> Optional[Any]:
+    """``(version, updated_at)`` of a task's run, or None if the task is missing."""
+    return db.query(ProjectRun.version, ProjectRun.updated_at).select_from(Task).join(
+        ProjectRun, Task.project_run_id == ProjectRun.id
+    ).filter(Task.id == task_id).first()
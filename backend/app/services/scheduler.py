@@ -0,0 +1,133 @@
+"""Dependency-aware ready queue for a run's tasks.
+
+Each task stores ``pending_dependencies``, the number of its dependencies
+not yet DONE. It is set when the task is created and adjusted for the
+dependents of a task whenever that task enters or leaves DONE, so "ready"
+is an indexed lookup (``idx_task_ready``) instead of a graph walk.
+"""
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from app.core.models import (
+    ProjectRun,
+    ProjectRunStatus,
+    RunTaskCounters,
+    Task,
+    TaskStatus,
+    TaskType,
+)
+from app.core.schemas import ProjectConfigTeam
+from app.services import run_counters, run_versions
+
+CLOSED_RUN_STATUSES = {
+    ProjectRunStatus.COMPLETED,
+    ProjectRunStatus.FAILED,
+    ProjectRunStatus.STOPPED_BUDGET,
+    ProjectRunStatus.STOPPED_MANUAL,
+}
+
+
+def count_open_dependencies(db: Session, dependency_ids: Iterable[str]) -> int:
+    """Count dependencies that are not DONE yet."""
+    dependency_ids = list(dependency_ids)
+    if not dependency_ids:
+        return 0
+    return db.query(func.count(Task.id)).filter(
+        Task.id.in_(dependency_ids),
+        Task.status != TaskStatus.DONE,
+    ).scalar()
+
+
+def record_status_change(db: Session, task: Task, old: TaskStatus, new: TaskStatus) -> None:
+    """Update the dependents' open-dependency counts when DONE-ness changes."""
+    if (old == TaskStatus.DONE) == (new == TaskStatus.DONE):
+        return
+    delta = -1 if new == TaskStatus.DONE else 1
+    db.execute(
+        update(Task)
+        .where(
+            Task.project_run_id == task.project_run_id,
+            Task.dependencies.contains([task.id]),
+        )
+        .values(pending_dependencies=Task.pending_dependencies + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def ready_tasks_query(db: Session, run_id: str):
+    """PENDING, unassigned tasks of a run whose dependencies are all DONE."""
+    return db.query(Task).filter(
+        Task.project_run_id == run_id,
+        Task.status == TaskStatus.PENDING,
+        Task.pending_dependencies == 0,
+        Task.assigned_agent_id.is_(None),
+    ).order_by(Task.priority.desc(), Task.created_at, Task.id)
+
+
+# Snapshot blobs are immutable, so their limit is read (and decompressed) once per hash
+_parallel_limits: Dict[str, int] = {}
+_PARALLEL_LIMITS_MAX = 1024
+
+
+def max_parallel_tasks(run: ProjectRun) -> int:
+    """The run's ProjectConfigTeam.max_parallel_tasks (or its default)."""
+    snapshot_hash = run.config_snapshot_hash
+    limit = _parallel_limits.get(snapshot_hash) if snapshot_hash else None
+    if limit is None:
+        team = (run.config_snapshot or {}).get("team", {})
+        limit = team.get("max_parallel_tasks", ProjectConfigTeam().max_parallel_tasks)
+        if snapshot_hash:
+            if len(_parallel_limits) >= _PARALLEL_LIMITS_MAX:
+                _parallel_limits.clear()
+            _parallel_limits[snapshot_hash] = limit
+    return limit
+
+
+def claim_task(
+    db: Session,
+    run: ProjectRun,
+    agent_id: str,
+    task_types: Optional[List[TaskType]] = None,
+) -> Tuple[Optional[Task], Optional[str]]:
+    """Atomically hand the highest-priority ready task to ``agent_id``.
+
+    Claims for one run serialize on the run's counters row, which keeps the
+    ``max_parallel_tasks`` check exact; the task itself is picked with
+    ``FOR UPDATE SKIP LOCKED`` so it never waits on rows other writers hold.
+
+    Returns:
+        (task, None) on success, (None, reason) when nothing can be claimed
+    """
+    if run.status in CLOSED_RUN_STATUSES:
+        return None, f"Run is {run.status.value}"
+
+    limit = max_parallel_tasks(run)
+    counters = db.query(RunTaskCounters).filter(
+        RunTaskCounters.project_run_id == run.id
+    ).with_for_update().first()
+    if counters is None:
+        run_counters.rebuild_counters(db, run.id)
+        counters = db.query(RunTaskCounters).filter(
+            RunTaskCounters.project_run_id == run.id
+        ).with_for_update().first()
+
+    if counters.in_progress >= limit:
+        db.rollback()
+        return None, f"max_parallel_tasks ({limit}) reached"
+
+    query = ready_tasks_query(db, run.id)
+    if task_types:
+        query = query.filter(Task.task_type.in_(task_types))
+    task = query.with_for_update(skip_locked=True).first()
+    if task is None:
+        db.rollback()
+        return None, "No ready tasks"
+
+    task.status = TaskStatus.IN_PROGRESS
+    task.assigned_agent_id = agent_id
+    task.started_at = task.started_at or datetime.utcnow()
+    run_counters.record_status_change(db, run.id, TaskStatus.PENDING, TaskStatus.IN_PROGRESS)
+    run_versions.bump(db, [run.id])
+    db.commit()
+    return task, None
@@ -0,0 +1,93 @@
+"""Task dependency graph helpers."""
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+
+def topological_order(edges: Dict[str, Iterable[str]], kind: str = "Dependency") -> List[str]:
+    """Order nodes so every node comes after the nodes it depends on.
+
+    Args:
+        edges: Node -> nodes it depends on. Targets outside ``edges`` are ignored
+            (they already exist and impose no ordering).
+        kind: What the edges are, for the error message
+
+    Returns:
+        Nodes in dependency order, stable with respect to ``edges`` order
+
+    Raises:
+        ValueError: If the graph has a cycle (naming only the nodes on cycles)
+    """
+    in_degree = {node: 0 for node in edges}
+    dependents: Dict[str, List[str]] = {node: [] for node in edges}
+    for node, targets in edges.items():
+        for target in set(targets):
+            if target in in_degree:
+                in_degree[node] += 1
+                dependents[target].append(node)
+
+    ready = deque(node for node, degree in in_degree.items() if degree == 0)
+    order = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for dependent in dependents[node]:
+            in_degree[dependent] -= 1
+            if in_degree[dependent] == 0:
+                ready.append(dependent)
+
+    if len(order) != len(in_degree):
+        # Unordered nodes include ones that merely depend on a cycle
+        cyclic = nodes_on_cycles(dependents, {node for node, degree in in_degree.items() if degree > 0})
+        raise ValueError(f"{kind} cycle between: {', '.join(cyclic)}")
+    return order
+
+
+def nodes_on_cycles(successors: Dict[str, List[str]], nodes: Set[str]) -> List[str]:
+    """Nodes of ``nodes`` that lie on a cycle, sorted (iterative Tarjan SCC).
+
+    A node is on a cycle when its strongly connected component has two or
+    more members, or it has an edge to itself.
+    """
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack: Set[str] = set()
+    cyclic: List[str] = []
+
+    def visit(node: str):
+        index[node] = low[node] = len(index)
+        stack.append(node)
+        on_stack.add(node)
+        work.append((node, iter(successors[node])))
+
+    for root in sorted(nodes):
+        if root in index:
+            continue
+        work = []
+        visit(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in nodes:
+                    continue
+                if child not in index:
+                    visit(child)
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in successors[node]:
+                        cyclic.extend(component)
+    return sorted(cyclic)
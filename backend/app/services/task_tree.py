@@ -0,0 +1,79 @@
+"""Task hierarchy loading with a single recursive CTE."""
+from sqlalchemy import literal_column, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+from datetime import datetime
+from enum import Enum
+from app.core.models import Task
+from app.core.schemas import TaskResponse
+import json
+
+TREE_FIELDS = list(TaskResponse.model_fields)
+DEFAULT_TREE_FIELDS = ["title", "task_type", "status", "priority", "assigned_agent_id"]
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma-separated field projection.
+
+    Raises:
+        ValueError: On unknown field names
+    """
+    if not fields:
+        return DEFAULT_TREE_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = sorted(set(names) - set(TREE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(TREE_FIELDS)}")
+    return names
+
+
+def tree_statement(root_filter, fields: Sequence[str], max_depth: int):
+    """Recursive CTE selecting the roots and their descendants down to ``max_depth``."""
+    names = ["id", "parent_task_id", *[f for f in fields if f not in ("id", "parent_task_id")]]
+
+    roots = select(*[getattr(Task, n) for n in names], literal_column("0").label("depth")).where(root_filter)
+    tree = roots.cte("task_tree", recursive=True)
+    children = select(
+        *[getattr(Task, n) for n in names],
+        (tree.c.depth + 1).label("depth"),
+    ).join(tree, Task.parent_task_id == tree.c.id).where(tree.c.depth < max_depth)
+    tree = tree.union_all(children)
+
+    order_by = [tree.c.depth]
+    if "priority" in names:
+        order_by.append(tree.c.priority.desc())
+    order_by.append(tree.c.id)
+    return select(tree).order_by(*order_by)
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def stream_rows(db: Session, statement) -> Iterator[Dict[str, Any]]:
+    """Yield flat tree nodes (parents before children) straight off the cursor."""
+    for row in db.execute(statement, execution_options={"yield_per": 500}).mappings():
+        yield {key: _plain(value) for key, value in row.items()}
+
+
+def assemble_tree(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Nest flat nodes under their parents in one pass (rows arrive parents first)."""
+    nodes: Dict[str, Dict[str, Any]] = {}
+    roots = []
+    for node in rows:
+        node["subtasks"] = []
+        nodes[node["id"]] = node
+        parent = nodes.get(node["parent_task_id"]) if node["depth"] > 0 else None
+        if parent is None:
+            roots.append(node)
+        else:
+            parent["subtasks"].append(node)
+    return roots
+
+
+def to_ndjson(rows: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """Encode flat nodes as newline-delimited JSON."""
+    for node in rows:
+        yield json.dumps(node, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v)) + "\n"
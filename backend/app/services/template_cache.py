@@ -0,0 +1,325 @@
+"""Read-through cache for project templates.
+
+Templates are immutable once created, so entries keyed by id or by
+(name, version) never go stale. Only derived views -- all versions of a
+name, and list pages -- change, when a new version is created; those are
+invalidated through a ``templates:invalidate`` pub/sub message so every
+API process drops its copy. A derived view loaded while an invalidation
+was in flight is returned but not cached: each process counts its
+invalidations, Redis keeps a shared counter, and a load only stores its
+result if neither moved in the meantime.
+
+Tier 1 is an in-process LRU with a TTL; tier 2 is an optional shared Redis
+cache so a cold process does not go to Postgres for every template.
+Entries hold the serialized response body and its ETag.
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.config import settings
+from app.core.models import ProjectTemplate
+from app.core.schemas import ProjectTemplateResponse
+from app.services.events import get_redis
+from app.utils.etag import compute_etag
+from app.utils.responses import row_dicts, schema_columns
+import json
+import logging
+import threading
+import time
+import orjson
+import redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "templates:invalidate"
+REDIS_PREFIX = "templates:"
+GENERATION_KEY = REDIS_PREFIX + "generation"
+# Views that new versions change (everything else is immutable)
+DERIVED_PREFIXES = ("versions:", "list:")
+LISTENER_BACKOFF_MIN = 0.5
+LISTENER_BACKOFF_MAX = 30.0
+TEMPLATE_COLUMNS = schema_columns(ProjectTemplate, ProjectTemplateResponse)
+
+
+class TTLCache:
+    """Thread-safe LRU map whose entries expire ``ttl`` seconds after insert."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TemplateCache:
+    """Two-tier template cache with per-tier hit counters."""
+
+    def __init__(
+        self,
+        local: TTLCache,
+        redis_factory: Optional[Callable[[], redis.Redis]] = None,
+        redis_ttl: int = 3600,
+    ):
+        self.local = local
+        self.redis_factory = redis_factory
+        self.redis_ttl = redis_ttl
+        self.stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0}
+        self._stats_lock = threading.Lock()
+        # Serializes derived-view stores with invalidations (see _generation)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._listener: Optional[threading.Thread] = None
+        self._listener_stop = threading.Event()
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def get_or_load(self, key: str, loader: Callable[[], Any]) -> Optional[Dict[str, Any]]:
+        """Return ``{"etag", "body"}`` for ``key``, calling ``loader`` on a miss.
+
+        ``loader`` returns the JSON-ready body, or None for "not found"
+        (which is not cached).
+        """
+        entry = self.local.get(key)
+        if entry is not None:
+            self._count("local_hits")
+            return entry
+
+        derived = key.startswith(DERIVED_PREFIXES)
+        generation = self._generation
+        redis_generation = None
+        if self.redis_factory is not None:
+            try:
+                raw, redis_generation = self.redis_factory().mget(REDIS_PREFIX + key, GENERATION_KEY)
+            except redis.RedisError as exc:
+                logger.warning("Template cache Redis read failed: %s", exc)
+                raw = None
+            if raw is not None:
+                entry = json.loads(raw)
+                self._store_local(key, entry, derived, generation)
+                self._count("redis_hits")
+                return entry
+
+        self._count("misses")
+        body = loader()
+        if body is None:
+            return None
+        entry = {"etag": compute_etag(body), "body": body}
+        if self._store_local(key, entry, derived, generation) and self.redis_factory is not None:
+            try:
+                self._store_redis(key, entry, derived, redis_generation)
+            except redis.RedisError as exc:
+                logger.warning("Template cache Redis write failed: %s", exc)
+        return entry
+
+    def _store_local(self, key: str, entry: Dict[str, Any], derived: bool, generation: int) -> bool:
+        """Cache ``entry`` unless it is a derived view and an invalidation ran since ``generation``."""
+        with self._lock:
+            if derived and generation != self._generation:
+                return False
+            self.local.set(key, entry)
+            return True
+
+    def _store_redis(self, key: str, entry: Dict[str, Any], derived: bool, generation: Optional[str]):
+        value = json.dumps(entry)
+        client = self.redis_factory()
+        if not derived:
+            client.set(REDIS_PREFIX + key, value, ex=self.redis_ttl)
+            return
+        # Another process may have invalidated after we read; only store if the counter held
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(GENERATION_KEY)
+                if pipe.get(GENERATION_KEY) != generation:
+                    return
+                pipe.multi()
+                pipe.set(REDIS_PREFIX + key, value, ex=self.redis_ttl)
+                pipe.execute()
+            except redis.WatchError:
+                pass
+
+    def invalidate_name(self, name: str):
+        """Drop views that a new version of ``name`` changes, in every process."""
+        self._drop(name)
+        if self.redis_factory is not None:
+            try:
+                client = self.redis_factory()
+                client.incr(GENERATION_KEY)
+                keys = [REDIS_PREFIX + versions_key(name), *client.scan_iter(f"{REDIS_PREFIX}list:*")]
+                client.delete(*keys)
+            except redis.RedisError as exc:
+                logger.warning("Template cache Redis invalidation failed: %s", exc)
+        try:
+            get_redis().publish(INVALIDATION_CHANNEL, json.dumps({"name": name}))
+        except redis.RedisError as exc:
+            logger.warning("Could not publish template invalidation for %s: %s", name, exc)
+
+    def _drop(self, name: Optional[str]):
+        """Drop the derived views of ``name`` (or of every name)."""
+        with self._lock:
+            self._generation += 1
+            if name is None:
+                self.local.delete_prefix("versions:")
+            else:
+                self.local.delete(versions_key(name))
+            self.local.delete_prefix("list:")
+        self._count("invalidations")
+
+    def _on_invalidation(self, message: Dict[str, Any]):
+        try:
+            self._drop(json.loads(message["data"])["name"])
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Ignoring malformed template invalidation: %r", message.get("data"))
+
+    def listen(self):
+        """Apply invalidations published by other processes (background thread)."""
+        self._listener_stop.clear()
+        self._listener = threading.Thread(target=self._listen, name="template-invalidations", daemon=True)
+        self._listener.start()
+
+    def _listen(self):
+        backoff = LISTENER_BACKOFF_MIN
+        while not self._listener_stop.is_set():
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_invalidation})
+                backoff = LISTENER_BACKOFF_MIN
+                while not self._listener_stop.is_set():
+                    pubsub.get_message(timeout=1.0)
+            except Exception as exc:
+                logger.error("Template invalidation listener failed, reconnecting in %.1fs: %s", backoff, exc)
+                # Invalidations published while disconnected are lost; drop every derived view
+                self._drop(None)
+                self._listener_stop.wait(backoff)
+                backoff = min(backoff * 2, LISTENER_BACKOFF_MAX)
+            finally:
+                if pubsub is not None:
+                    try:
+                        pubsub.close()
+                    except redis.RedisError:
+                        pass
+
+    def close(self):
+        if self._listener is not None:
+            self._listener_stop.set()
+            self._listener.join(timeout=5.0)
+            self._listener = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Hit/miss counters and hit rate for the metrics endpoint."""
+        lookups = self.stats["local_hits"] + self.stats["redis_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "local_entries": len(self.local),
+            "local_evictions": self.local.evictions,
+            "redis_enabled": self.redis_factory is not None,
+        }
+
+
+def serialize_template(template: ProjectTemplate) -> Dict[str, Any]:
+    """The cached (JSON-ready) form of a template."""
+    return ProjectTemplateResponse.model_validate(template).model_dump(mode="json")
+
+
+def serialize_template_rows(rows: Sequence[Any]) -> List[Dict[str, Any]]:
+    """The cached form of ``TEMPLATE_COLUMNS`` rows, without a model per row."""
+    return orjson.loads(orjson.dumps(row_dicts(rows, TEMPLATE_COLUMNS)))
+
+
+def read_through(
+    cache: Optional[TemplateCache],
+    key: str,
+    loader: Callable[[], Any],
+) -> Optional[Dict[str, Any]]:
+    """``cache.get_or_load``, or a direct load when caching is disabled."""
+    if cache is not None:
+        return cache.get_or_load(key, loader)
+    body = loader()
+    return None if body is None else {"etag": compute_etag(body), "body": body}
+
+
+def id_key(template_id: str) -> str:
+    return f"id:{template_id}"
+
+
+def version_key(name: str, version: str) -> str:
+    return f"version:{name}:{version}"
+
+
+def versions_key(name: str) -> str:
+    return f"versions:{name}"
+
+
+def list_key(**params: Any) -> str:
+    return "list:" + json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+
+_cache: Optional[TemplateCache] = None
+
+
+def get_template_cache() -> Optional[TemplateCache]:
+    """Dependency: the process-wide cache, or None when disabled."""
+    return _cache
+
+
+def start_template_cache():
+    """Create the process-wide cache and its invalidation listener if enabled."""
+    global _cache
+    if not settings.template_cache_enabled or _cache is not None:
+        return
+    _cache = TemplateCache(
+        TTLCache(settings.template_cache_size, settings.template_cache_ttl),
+        redis_factory=get_redis if settings.template_cache_redis else None,
+        redis_ttl=settings.template_cache_redis_ttl,
+    )
+    _cache.listen()
+    logger.info("Template cache started")
+
+
+def stop_template_cache():
+    """Stop the invalidation listener and drop the process-wide cache."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+        _cache = None
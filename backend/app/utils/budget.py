@@ -1,19 +1,24 @@
 """Budget tracking and enforcement utilities."""
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+from app.utils.pricing import get_pricing
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
-# Token pricing (as of Jan 2024)
-TOKEN_PRICES = {
-    "gpt-4o": {"input": 5e-6, "output": 1.5e-5},  # per token
-    "gpt-4o-mini": {"input": 1.5e-7, "output": 6e-7},
-    "o3": {"input": 2e-5, "output": 8e-5},
-}
+
+def token_cost(model: str, input_tokens: int, output_tokens: int) -> Tuple[float, float]:
+    """Input and output cost in USD from the current pricing table."""
+    price = get_pricing().price(model)
+    return input_tokens * price.input, output_tokens * price.output
 
 
 class BudgetTracker:
-    """Track token usage and costs across a run."""
+    """Track token usage and costs across a run.
+
+    Safe to share between threads: ``add_usage`` and ``set_spent`` update
+    the totals under a lock, and the budget checks read the cached totals.
+    """
 
     def __init__(self, max_usd: float, max_tokens: int):
         self.max_usd = max_usd
@@ -21,6 +26,7 @@ class BudgetTracker:
         self.spent_usd = 0.0
         self.spent_tokens_input = 0
         self.spent_tokens_output = 0
+        self._lock = threading.Lock()
 
     @property
     def total_tokens(self) -> int:
@@ -53,15 +59,13 @@ class BudgetTracker:
         Returns:
             Dictionary with cost breakdown
         """
-        prices = TOKEN_PRICES.get(model, TOKEN_PRICES["gpt-4o-mini"])
-
-        cost_input = input_tokens * prices["input"]
-        cost_output = output_tokens * prices["output"]
+        cost_input, cost_output = token_cost(model, input_tokens, output_tokens)
         cost_total = cost_input + cost_output
 
-        self.spent_tokens_input += input_tokens
-        self.spent_tokens_output += output_tokens
-        self.spent_usd += cost_total
+        with self._lock:
+            self.spent_tokens_input += input_tokens
+            self.spent_tokens_output += output_tokens
+            self.spent_usd += cost_total
 
         result = {
             "model": model,
@@ -75,9 +79,16 @@ class BudgetTracker:
             },
         }
 
-        logger.info(f"💰 Token usage: {result['total_tokens']} tokens (${result['cost_usd']:.6f})")
+        logger.debug("💰 Token usage: %d tokens ($%.6f)", result["total_tokens"], result["cost_usd"])
         return result
 
+    def set_spent(self, spent_usd: float, tokens_input: int, tokens_output: int):
+        """Replace the totals (e.g. with the persisted totals plus unflushed usage)."""
+        with self._lock:
+            self.spent_usd = spent_usd
+            self.spent_tokens_input = tokens_input
+            self.spent_tokens_output = tokens_output
+
     def get_status(self) -> Dict:
         """Get current budget status."""
         return {
@@ -0,0 +1,57 @@
+"""Entity tags and conditional GET helpers."""
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Optional, Union
+from fastapi import Request, Response
+import hashlib
+import json
+
+
+def compute_etag(body: Any) -> str:
+    """Strong ETag over the canonical JSON form of a response body."""
+    raw = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str).encode()
+    return f'"{hashlib.sha1(raw).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names ``etag``."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def version_etag(request: Request, version: Union[int, str]) -> str:
+    """Weak ETag for the request's path and query parameters at ``version``.
+
+    Known before the body is loaded; weak because it names the resource
+    state rather than the exact bytes.
+    """
+    params = sorted(request.query_params.multi_items())
+    raw = json.dumps([request.url.path, params], separators=(",", ":")).encode()
+    return f'W/"{version}-{hashlib.sha1(raw).hexdigest()[:16]}"'
+
+
+def http_date(value: datetime) -> str:
+    """A naive UTC datetime as an HTTP date (Last-Modified)."""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: Optional[str] = None,
+) -> Optional[Response]:
+    """Set validators on ``response``; return a 304 if the client is current."""
+    headers = {"ETag": etag}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
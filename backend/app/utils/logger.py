@@ -1,8 +1,36 @@
-"""JSON structured logging configuration."""
-import logging
-import json
+"""Structured logging: JSON records written off the request path.
+
+Loggers hand records to a ``QueueHandler``; a ``QueueListener`` thread
+formats them and writes them out, so a log call in a handler costs a
+queue put rather than JSON encoding and a blocking stdout write. Messages
+with immutable ``%`` arguments (str, numbers, None) are formatted on the
+listener thread too; any other message is formatted before it is queued,
+so it shows its arguments as they were at the call.
+
+Each record carries the current request's id, set from ``X-Request-ID``
+(or generated) by ``RequestIdMiddleware`` and kept in a contextvar that
+the threadpool running sync handlers inherits. INFO and DEBUG records of
+chatty loggers can be sampled; WARNING and above are always kept.
+"""
+from contextvars import ContextVar
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, Mapping, Optional
+from uuid import uuid4
 from pythonjsonlogger import jsonlogger
+import logging
+import queue
+import random
+import re
+import sys
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Safe to format later on the listener thread
+IMMUTABLE_ARGS = (str, int, float, bytes, type(None))
 
 
 class CustomJsonFormatter(jsonlogger.JsonFormatter):
@@ -13,7 +41,8 @@ class CustomJsonFormatter(jsonlogger.JsonFormatter):
         super(CustomJsonFormatter, self).add_fields(
             log_record, record, message_dict
         )
-        log_record['timestamp'] = datetime.utcnow().isoformat()
+        # The time the record was made, not when the listener got to it
+        log_record['timestamp'] = datetime.utcfromtimestamp(record.created).isoformat()
         log_record['level'] = record.levelname
         log_record['logger'] = record.name
         log_record['module'] = record.module
@@ -21,17 +50,160 @@ class CustomJsonFormatter(jsonlogger.JsonFormatter):
         log_record['line'] = record.lineno
 
 
-def setup_logging(level: str = "INFO"):
-    """Setup structured JSON logging."""
-    logger = logging.getLogger()
-    logger.setLevel(level)
+_base_record_factory = logging.getLogRecordFactory()
+
+
+def _record_factory(*args, **kwargs) -> logging.LogRecord:
+    """Stamp every record with the request id (on the calling thread, for every handler)."""
+    record = _base_record_factory(*args, **kwargs)
+    record.request_id = request_id.get()
+    return record
+
+
+class SamplingFilter(logging.Filter):
+    """Keep ``rate`` of the INFO/DEBUG records of ``loggers`` (and their children).
+
+    Kept records get ``sample_rate`` so counts can be scaled back up;
+    ``extra={"sample": False}`` exempts a record.
+    """
+
+    def __init__(self, rate: float, loggers: Iterable[str]):
+        super().__init__()
+        self.rate = rate
+        self.prefixes = tuple(name for name in loggers if name)
+        self.sampled = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (
+            self.rate >= 1.0
+            or record.levelno > logging.INFO
+            or not record.name.startswith(self.prefixes)
+            or not getattr(record, "sample", True)
+        ):
+            return True
+        if random.random() < self.rate:
+            record.sample_rate = self.rate
+            return True
+        self.sampled += 1
+        return False
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueue records as they are; drop (and count) them past ``max_size`` queued.
+
+    The base class formats each record before enqueueing it, which would put
+    the formatting cost back on the caller; here only records whose message
+    or arguments could change before the listener formats them are
+    formatted up front. The queue is a ``SimpleQueue`` (a lock-free put,
+    unlike ``queue.Queue``), so the bound is checked here.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args.values() if isinstance(record.args, Mapping) else record.args or ()
+        if not isinstance(record.msg, str) or not all(isinstance(arg, IMMUTABLE_ARGS) for arg in args):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+            return
+        self.queue.put_nowait(record)
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    json_format: bool = True,
+    queue_size: int = 10000,
+    sample_rate: float = 1.0,
+    sampled_loggers: Iterable[str] = (),
+) -> DroppingQueueHandler:
+    """Route the root logger through a queue to a background writer.
+
+    Replaces the root logger's handlers; calling it again restarts the
+    pipeline with the new options.
+    """
+    global _listener, _handler
+    stop_logging()
+
+    output = logging.StreamHandler(sys.stdout)
+    if json_format:
+        output.setFormatter(CustomJsonFormatter(
+            '%(timestamp)s %(level)s %(name)s %(message)s',
+            json_ensure_ascii=False,
+        ))
+    else:
+        output.setFormatter(logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+        ))
+
+    logging.setLogRecordFactory(_record_factory)
+    logging.logMultiprocessing = False  # processName is never output; skip its lookup per record
+    handler = DroppingQueueHandler(queue_size)
+    handler.addFilter(SamplingFilter(sample_rate, sampled_loggers))
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    _handler = handler
+    return handler
+
+
+def stop_logging():
+    """Write out queued records and stop the writer thread.
+
+    Later records are written directly by the same output handler.
+    """
+    global _listener, _handler
+    if _listener is None:
+        return
+    root = logging.getLogger()
+    root.removeHandler(_handler)
+    _listener.stop()
+    for output in _listener.handlers:
+        for log_filter in _handler.filters:
+            output.addFilter(log_filter)
+        root.addHandler(output)
+    _listener = _handler = None
+
+
+class RequestIdMiddleware:
+    """Bind a request id for the request's log records and echo it in ``X-Request-ID``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = scope["headers"]
+        incoming = next((value for name, value in headers if name == REQUEST_ID_HEADER), b"").decode("latin-1")
+        rid = incoming if _VALID_REQUEST_ID.fullmatch(incoming) else uuid4().hex
+        token = request_id.set(rid)
 
-    # Console handler with JSON formatter
-    handler = logging.StreamHandler()
-    formatter = CustomJsonFormatter(
-        '%(timestamp)s %(level)s %(name)s %(message)s'
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (REQUEST_ID_HEADER, rid.encode())]
+            await send(message)
 
-    return logger
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -0,0 +1,95 @@
+"""Keyset (cursor) pagination helpers for list endpoints."""
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.orm import Query
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import datetime
+import base64
+import json
+
+# (column, descending) pairs; the last column must be unique (usually the id)
+SortKey = Sequence[Tuple[Any, bool]]
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort-key values into an opaque URL-safe cursor."""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: SortKey) -> List[Any]:
+    """Decode a cursor back into typed sort-key values.
+
+    Raises:
+        ValueError: If the cursor is malformed or does not match the sort key
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+    if not isinstance(payload, list) or len(payload) != len(sort_key):
+        raise ValueError("Invalid cursor")
+
+    values = []
+    for (column, _), value in zip(sort_key, payload):
+        python_type = column.type.python_type
+        try:
+            if python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, python_type):
+                raise TypeError
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor")
+        values.append(value)
+    return values
+
+
+def keyset_filter(sort_key: SortKey, values: Sequence[Any]):
+    """Build the "rows after this key" predicate for a sort key."""
+    directions = {descending for _, descending in sort_key}
+    if len(directions) == 1:
+        # Uniform direction: a row-value comparison lets the index drive the scan
+        columns = tuple_(*[column for column, _ in sort_key])
+        bound = tuple_(*values)
+        return columns < bound if directions.pop() else columns > bound
+
+    clause = None
+    for (column, descending), value in reversed(list(zip(sort_key, values))):
+        beyond = column < value if descending else column > value
+        clause = beyond if clause is None else or_(beyond, and_(column == value, clause))
+    return clause
+
+
+def paginate(
+    query: Query,
+    sort_key: SortKey,
+    limit: int,
+    skip: int = 0,
+    cursor: Optional[str] = None,
+) -> Tuple[list, Optional[str]]:
+    """Order, page and fetch a query.
+
+    Uses keyset paging when a cursor is given, offset paging otherwise.
+    A next cursor is returned whenever the page is full, so offset clients
+    can switch to cursors at any point.
+
+    Returns:
+        (rows, next_cursor)
+    """
+    if cursor:
+        if skip:
+            raise ValueError("skip cannot be combined with cursor")
+        query = query.filter(keyset_filter(sort_key, decode_cursor(cursor, sort_key)))
+    elif skip:
+        query = query.offset(skip)
+
+    order_by = [column.desc() if descending else column.asc() for column, descending in sort_key]
+    rows = query.order_by(*order_by).limit(limit).all()
+
+    next_cursor = None
+    if len(rows) == limit:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column, _ in sort_key])
+    return rows, next_cursor
@@ -0,0 +1,195 @@
+"""Model price registry, loaded from a versioned JSON file and hot-reloaded.
+
+The file (``PRICING_FILE``, default ``app/data/pricing.json``) maps model
+names to per-token input/output prices and a tokenizer family. Dated or
+suffixed model names (``gpt-4o-2024-08-06``) resolve to the longest listed
+prefix. Models that match nothing are priced as ``default_model`` with a
+warning, once per name.
+
+The registry re-stats the file at most every ``PRICING_RELOAD_INTERVAL``
+seconds and swaps in a new table when it changed; a file that fails to
+load is logged and the previous table stays in use.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+from app.config import settings
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Model names come from clients; cap what is remembered about arbitrary ones
+MAX_REMEMBERED_MODELS = 1024
+
+# Used when the pricing file cannot be read at startup (as of Jan 2024)
+BUILTIN_PRICING = {
+    "version": "built-in",
+    "default_model": "gpt-4o-mini",
+    "models": {
+        "gpt-4o": {"input": 5e-6, "output": 1.5e-5},  # per token
+        "gpt-4o-mini": {"input": 1.5e-7, "output": 6e-7},
+        "o3": {"input": 2e-5, "output": 8e-5},
+    },
+}
+
+
+@dataclass(frozen=True)
+class ModelPrice:
+    model: str
+    input: float  # USD per token
+    output: float
+    tokenizer: str
+    chars_per_token: float
+
+    @property
+    def unit_price(self) -> float:
+        """Input + output price per token, for ranking models by cost."""
+        return self.input + self.output
+
+
+@dataclass
+class PriceTable:
+    """One immutable version of the pricing file."""
+    version: str
+    default_model: str
+    models: Dict[str, ModelPrice]
+    source: Optional[str] = None
+    _by_prefix: List[str] = field(default_factory=list, repr=False)
+    _resolved: Dict[str, Tuple[ModelPrice, bool]] = field(default_factory=dict, repr=False)
+    cheapest: str = field(init=False)
+
+    def __post_init__(self):
+        if self.default_model not in self.models:
+            raise ValueError(f"default_model {self.default_model!r} is not priced")
+        self._by_prefix = sorted(self.models, key=len, reverse=True)
+        self.cheapest = min(self.models.values(), key=lambda price: price.unit_price).model
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], source: Optional[str] = None) -> "PriceTable":
+        """Build and validate a table.
+
+        Raises:
+            ValueError: On a missing field, unknown tokenizer or negative price
+        """
+        try:
+            tokenizers = data.get("tokenizers", {})
+            models = {}
+            for name, entry in data["models"].items():
+                tokenizer = entry.get("tokenizer", "default")
+                if tokenizer != "default" and tokenizer not in tokenizers:
+                    raise ValueError(f"Unknown tokenizer {tokenizer!r} for {name}")
+                chars_per_token = float(tokenizers.get(tokenizer, {}).get("chars_per_token", 4.0))
+                price = ModelPrice(name, float(entry["input"]), float(entry["output"]), tokenizer, chars_per_token)
+                if price.input < 0 or price.output < 0 or chars_per_token <= 0:
+                    raise ValueError(f"Invalid pricing for {name}")
+                models[name] = price
+            return cls(str(data["version"]), data["default_model"], models, source)
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"Invalid pricing table: {exc!r}") from None
+
+    def lookup(self, model: str) -> Tuple[ModelPrice, bool]:
+        """The price for ``model`` and whether it was actually listed (vs. the default)."""
+        hit = self._resolved.get(model)
+        if hit is None:
+            match = next((name for name in self._by_prefix if model.startswith(name)), None)
+            hit = (self.models[match], True) if match else (self.models[self.default_model], False)
+            if len(self._resolved) < MAX_REMEMBERED_MODELS:
+                self._resolved[model] = hit  # racing writers store the same value
+        return hit
+
+
+class PricingRegistry:
+    """The current PriceTable, reloaded when its file changes."""
+
+    def __init__(self, path: Optional[str], check_interval: float = 5.0, fallback: Optional[Dict[str, Any]] = None):
+        self.path = path
+        self.check_interval = check_interval
+        self.fallback = fallback
+        self.unknown_models: Set[str] = set()
+        self.reloads = 0
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._next_check = 0.0
+        self._table = self._load_initial()
+
+    def _load_initial(self) -> PriceTable:
+        try:
+            return self._read()
+        except (OSError, ValueError) as exc:
+            if self.fallback is None:
+                raise
+            logger.warning("Pricing file %s unavailable (%s); using built-in prices", self.path, exc)
+            return PriceTable.from_dict(self.fallback, source="built-in")
+
+    def _read(self) -> PriceTable:
+        if not self.path:
+            raise OSError("no pricing file configured")
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path) as f:
+            table = PriceTable.from_dict(json.load(f), source=self.path)
+        self._mtime = mtime
+        return table
+
+    @property
+    def table(self) -> PriceTable:
+        """The current table (re-stats the file at most every ``check_interval``)."""
+        if time.monotonic() >= self._next_check:
+            self.maybe_reload()
+        return self._table
+
+    def maybe_reload(self, force: bool = False) -> bool:
+        """Reload if the file changed; returns whether a new table was swapped in."""
+        # Callers that lose the race keep using the current table
+        if not self._lock.acquire(blocking=force):
+            return False
+        try:
+            self._next_check = time.monotonic() + self.check_interval
+            if not self.path:
+                return False
+            try:
+                if not force and os.stat(self.path).st_mtime == self._mtime:
+                    return False
+                table = self._read()
+            except (OSError, ValueError) as exc:
+                logger.error("Pricing reload from %s failed, keeping version %s: %s", self.path, self._table.version, exc)
+                return False
+            self._table = table
+            self.reloads += 1
+            logger.info("💲 Pricing table version %s loaded from %s", table.version, self.path)
+            return True
+        finally:
+            self._lock.release()
+
+    def price(self, model: str) -> ModelPrice:
+        price, listed = self.table.lookup(model)
+        if not listed and model not in self.unknown_models and len(self.unknown_models) < MAX_REMEMBERED_MODELS:
+            self.unknown_models.add(model)
+            logger.warning("No price for model %r; pricing it as %s", model, price.model)
+        return price
+
+
+_registry: Optional[PricingRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_pricing() -> PricingRegistry:
+    """The process-wide registry (created on first use)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = PricingRegistry(
+                    settings.pricing_file,
+                    check_interval=settings.pricing_reload_interval,
+                    fallback=BUILTIN_PRICING,
+                )
+    return _registry
+
+
+def set_pricing(registry: Optional[PricingRegistry]):
+    """Replace the process-wide registry (tests, or a custom source)."""
+    global _registry
+    _registry = registry
@@ -0,0 +1,28 @@
+"""Fast JSON responses for list endpoints: rows straight to orjson.
+
+A list endpoint selects its response schema's fields as plain columns and
+returns the rows as dicts in an ``ORJSONResponse`` (the app's default
+response class). That skips building ORM objects, a ``model_validate`` per
+row, and FastAPI's second pass through ``response_model`` (returned Response
+objects are not re-validated). The ``response_model`` still documents the
+shape, and ``schema_columns`` keeps the projection in step with the schema.
+Enums serialize as their values and naive datetimes in ISO format, matching
+the validated output.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Type
+from pydantic import BaseModel
+
+
+def schema_columns(entity: Any, schema: Type[BaseModel], fields: Optional[Iterable[str]] = None) -> List[Any]:
+    """The entity's columns for ``fields`` (default: every field of ``schema``), in order.
+
+    Raises:
+        AttributeError: If a field has no column (the fast path cannot serve the schema)
+    """
+    return [getattr(entity, name) for name in (fields if fields is not None else schema.model_fields)]
+
+
+def row_dicts(rows: Sequence[Any], columns: Sequence[Any]) -> List[Dict[str, Any]]:
+    """Rows of a column query as dicts keyed by column name."""
+    keys = [column.key for column in columns]
+    return [dict(zip(keys, row)) for row in rows]
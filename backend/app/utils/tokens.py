@@ -0,0 +1,63 @@
+"""Fast local token-count estimates for pre-checking budgets.
+
+No tokenizer is loaded: a prompt's count is the larger of its number of
+words/symbol runs (each is at least one token) and its non-space length
+divided by the model's tokenizer family ``chars_per_token`` (from the
+pricing table). That tracks BPE tokenizers closely enough for budgeting
+at a small fraction of the cost.
+
+Text is counted in fixed-size chunks cut at whitespace, and each chunk's
+count is memoized in an LRU. Agent prompts share long identical prefixes
+(system prompt, task context), so a step only counts its new tail.
+"""
+from functools import lru_cache
+from typing import Optional
+from app.config import settings
+from app.utils.pricing import get_pricing
+import math
+import re
+
+CHUNK_SIZE = 2048  # characters
+_PIECES = re.compile(r"\w+|[^\w\s]+")
+_SPACE = re.compile(r"\s")
+
+
+@lru_cache(maxsize=settings.token_estimate_cache_size)
+def _chunk_tokens(chunk: str, chars_per_token: float) -> int:
+    pieces = len(_PIECES.findall(chunk))
+    visible = len(chunk) - len(_SPACE.findall(chunk))
+    return max(pieces, math.ceil(visible / chars_per_token))
+
+
+def count_chunks(text: str, chars_per_token: float) -> int:
+    """Sum of memoized chunk estimates over ``text``."""
+    total = 0
+    start, length = 0, len(text)
+    while start < length:
+        end = start + CHUNK_SIZE
+        if end < length:
+            # Cut after whitespace so words are not split between chunks
+            cut = max(text.rfind(" ", start, end), text.rfind("\n", start, end))
+            end = cut + 1 if cut > start else end
+        total += _chunk_tokens(text[start:end], chars_per_token)
+        start = end
+    return total
+
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """Estimated token count of ``text`` for ``model``'s tokenizer family."""
+    if not text:
+        return 0
+    price = get_pricing().price(model or get_pricing().table.default_model)
+    return count_chunks(text, price.chars_per_token)
+
+
+def estimate_tokens_from_length(length: int, model: Optional[str] = None) -> int:
+    """Estimate from a character count alone (when the text is not at hand)."""
+    price = get_pricing().price(model or get_pricing().table.default_model)
+    return math.ceil(length / price.chars_per_token)
+
+
+def cache_info():
+    """Hit/miss counters of the chunk LRU."""
+    return _chunk_tokens.cache_info()
@@ -0,0 +1,65 @@
+"""Comment file refs and GIN indexes for file/commit lookups
+
+Revision ID: 0001_comment_file_refs
+Revises:
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001_comment_file_refs'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+GIN_INDEXES = {
+    "idx_comment_git_commits": "git_commits",
+    "idx_comment_files_created": "files_created",
+    "idx_comment_files_modified": "files_modified",
+}
+
+# Same normalization as app.services.file_refs.normalize_path
+_NORMALIZED = r"ltrim(regexp_replace(replace(btrim(f.path), '\', '/'), '^(\./)+', ''), '/')"
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # init_db() may already have created the table on a fresh database
+    if not inspector.has_table("comment_file_refs"):
+        op.create_table(
+            "comment_file_refs",
+            sa.Column("comment_id", sa.String(36), sa.ForeignKey("task_comments.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("path", sa.String(500), primary_key=True),
+            sa.Column("change", sa.String(10), primary_key=True),
+            sa.Column("task_id", sa.String(36), sa.ForeignKey("tasks.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index(
+            "idx_file_ref_path_task", "comment_file_refs", ["path", "task_id"],
+            postgresql_ops={"path": "varchar_pattern_ops"},
+        )
+        op.create_index("idx_file_ref_task", "comment_file_refs", ["task_id"])
+
+    existing = {index["name"] for index in inspector.get_indexes("task_comments")}
+    for name, column in GIN_INDEXES.items():
+        if name not in existing:
+            op.create_index(name, "task_comments", [column], postgresql_using="gin")
+
+    for change, column in (("created", "files_created"), ("modified", "files_modified")):
+        op.execute(f"""
+            INSERT INTO comment_file_refs (comment_id, path, change, task_id, created_at)
+            SELECT DISTINCT c.id, {_NORMALIZED}, '{change}', c.task_id, c.created_at
+            FROM task_comments c, unnest(c.{column}) AS f(path)
+            WHERE {_NORMALIZED} <> ''
+            ON CONFLICT DO NOTHING
+        """)
+
+
+def downgrade() -> None:
+    for name in GIN_INDEXES:
+        op.drop_index(name, table_name="task_comments")
+    op.drop_index("idx_file_ref_task", table_name="comment_file_refs")
+    op.drop_index("idx_file_ref_path_task", table_name="comment_file_refs")
+    op.drop_table("comment_file_refs")
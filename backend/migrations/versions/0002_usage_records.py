@@ -0,0 +1,39 @@
+"""Usage records (budget ledger)
+
+Revision ID: 0002_usage_records
+Revises: 0001_comment_file_refs
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_usage_records'
+down_revision = '0001_comment_file_refs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("usage_records"):
+        return
+    op.create_table(
+        "usage_records",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("project_run_id", sa.String(36), sa.ForeignKey("project_runs.id"), nullable=False),
+        sa.Column("task_id", sa.String(36), nullable=True),
+        sa.Column("agent_id", sa.String(100), nullable=True),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("input_tokens", sa.Integer(), nullable=False),
+        sa.Column("output_tokens", sa.Integer(), nullable=False),
+        sa.Column("cost_usd", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("idx_usage_run_created", "usage_records", ["project_run_id", "created_at"])
+    op.create_index("idx_usage_task", "usage_records", ["task_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("idx_usage_task", table_name="usage_records")
+    op.drop_index("idx_usage_run_created", table_name="usage_records")
+    op.drop_table("usage_records")
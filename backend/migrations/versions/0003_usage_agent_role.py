@@ -0,0 +1,24 @@
+"""Agent role on usage records (cost attribution by role)
+
+Revision ID: 0003_usage_agent_role
+Revises: 0002_usage_records
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003_usage_agent_role'
+down_revision = '0002_usage_records'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("usage_records")}
+    if "agent_role" not in columns:
+        op.add_column("usage_records", sa.Column("agent_role", sa.String(50), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("usage_records", "agent_role")
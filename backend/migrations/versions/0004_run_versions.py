@@ -0,0 +1,30 @@
+"""Run change counter (ETags and response cache keys)
+
+Revision ID: 0004_run_versions
+Revises: 0003_usage_agent_role
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_run_versions'
+down_revision = '0003_usage_agent_role'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("project_runs")}
+    if "version" not in columns:
+        op.add_column("project_runs", sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+    if "updated_at" not in columns:
+        op.add_column(
+            "project_runs",
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+
+def downgrade() -> None:
+    op.drop_column("project_runs", "updated_at")
+    op.drop_column("project_runs", "version")
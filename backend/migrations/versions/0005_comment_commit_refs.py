@@ -0,0 +1,60 @@
+"""Comment commit refs (abbreviated SHA lookups); lowercase stored SHAs
+
+Revision ID: 0005_comment_commit_refs
+Revises: 0004_run_versions
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_comment_commit_refs'
+down_revision = '0004_run_versions'
+branch_labels = None
+depends_on = None
+
+# Same normalization as app.services.file_refs.normalize_sha
+_NORMALIZED = "lower(btrim(s.sha))"
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    # Older rows kept whatever case the agent sent
+    op.execute(f"""
+        UPDATE task_comments
+        SET git_commits = ARRAY(SELECT {_NORMALIZED} FROM unnest(git_commits) AS s(sha))
+        WHERE git_commits::text <> lower(git_commits::text)
+    """)
+
+    # init_db() may already have created the table on a fresh database
+    if not inspector.has_table("comment_commit_refs"):
+        op.create_table(
+            "comment_commit_refs",
+            sa.Column("comment_id", sa.String(36), sa.ForeignKey("task_comments.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("sha", sa.String(40), primary_key=True),
+            sa.Column("task_id", sa.String(36), sa.ForeignKey("tasks.id"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index(
+            "idx_commit_ref_sha", "comment_commit_refs", ["sha"],
+            postgresql_ops={"sha": "varchar_pattern_ops"},
+        )
+
+    op.execute(f"""
+        INSERT INTO comment_commit_refs (comment_id, sha, task_id, created_at)
+        SELECT DISTINCT c.id, {_NORMALIZED}, c.task_id, c.created_at
+        FROM task_comments c, unnest(c.git_commits) AS s(sha)
+        WHERE {_NORMALIZED} <> ''
+        ON CONFLICT DO NOTHING
+    """)
+
+    # Commit lookups go through comment_commit_refs now
+    if "idx_comment_git_commits" in {index["name"] for index in inspector.get_indexes("task_comments")}:
+        op.drop_index("idx_comment_git_commits", table_name="task_comments")
+
+
+def downgrade() -> None:
+    op.create_index("idx_comment_git_commits", "task_comments", ["git_commits"], postgresql_using="gin")
+    op.drop_index("idx_commit_ref_sha", table_name="comment_commit_refs")
+    op.drop_table("comment_commit_refs")
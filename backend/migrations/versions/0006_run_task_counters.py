@@ -0,0 +1,50 @@
+"""Per-run task counters, backfilled from existing tasks
+
+Revision ID: 0006_run_task_counters
+Revises: 0005_comment_commit_refs
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_run_task_counters'
+down_revision = '0005_comment_commit_refs'
+branch_labels = None
+depends_on = None
+
+STATUSES = ["PENDING", "IN_PROGRESS", "BLOCKED", "REVIEW", "DONE", "FAILED"]
+
+
+def upgrade() -> None:
+    # init_db() may already have created the (empty) table
+    if not sa.inspect(op.get_bind()).has_table("run_task_counters"):
+        op.create_table(
+            "run_task_counters",
+            sa.Column("project_run_id", sa.String(36), sa.ForeignKey("project_runs.id"), primary_key=True),
+            sa.Column("total", sa.Integer(), nullable=False, server_default="0"),
+            *[
+                sa.Column(status.lower(), sa.Integer(), nullable=False, server_default="0")
+                for status in STATUSES
+            ],
+            sa.Column("estimate_hours", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("actual_hours", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    status_columns = ", ".join(status.lower() for status in STATUSES)
+    status_counts = ", ".join(f"count(t.id) FILTER (WHERE t.status = '{status}')" for status in STATUSES)
+    op.execute(f"""
+        INSERT INTO run_task_counters
+            (project_run_id, total, {status_columns}, estimate_hours, actual_hours, updated_at)
+        SELECT r.id, count(t.id), {status_counts},
+               coalesce(sum(t.estimate_hours), 0), coalesce(sum(t.actual_hours), 0), now()
+        FROM project_runs r
+        LEFT JOIN tasks t ON t.project_run_id = r.id
+        GROUP BY r.id
+        ON CONFLICT (project_run_id) DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("run_task_counters")
@@ -0,0 +1,44 @@
+"""Open-dependency counts on tasks (ready queue), backfilled
+
+Revision ID: 0007_task_pending_dependencies
+Revises: 0006_run_task_counters
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_task_pending_dependencies'
+down_revision = '0006_run_task_counters'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("tasks")}
+    if "pending_dependencies" not in columns:
+        op.add_column(
+            "tasks",
+            sa.Column("pending_dependencies", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Without this every PENDING task with unfinished dependencies would look ready
+    op.execute("""
+        UPDATE tasks t
+        SET pending_dependencies = (
+            SELECT count(*) FROM tasks d
+            WHERE d.id = ANY(t.dependencies) AND d.status <> 'DONE'
+        )
+        WHERE cardinality(t.dependencies) > 0
+    """)
+
+    if "idx_task_ready" not in {index["name"] for index in inspector.get_indexes("tasks")}:
+        op.create_index(
+            "idx_task_ready", "tasks", ["project_run_id", "status", "pending_dependencies", "priority"],
+        )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_task_ready", table_name="tasks")
+    op.drop_column("tasks", "pending_dependencies")
@@ -0,0 +1,109 @@
+"""Run config snapshots as content-addressed blobs; project config overrides
+
+Revision ID: 0008_run_config_blobs
+Revises: 0007_task_pending_dependencies
+Create Date: 2026-10-16 00:00:00.000000
+
+Moves each run's inline ``config_snapshot`` JSON into ``content_blobs``
+(one row per distinct config, refcounted by the runs using it) and points
+the run at it through ``config_snapshot_hash``, then drops the column.
+"""
+from collections import defaultdict
+from alembic import op
+from sqlalchemy.dialects import postgresql
+import sqlalchemy as sa
+import hashlib
+import json
+import zlib
+
+revision = '0008_run_config_blobs'
+down_revision = '0007_task_pending_dependencies'
+branch_labels = None
+depends_on = None
+
+
+# Same encoding as app.services.blobs (canonical JSON, sha256, zlib level 6)
+def _blob(value):
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def _store_blobs(bind, column: str):
+    """Move ``project_runs.<column>`` JSON into content_blobs; set ``<column>_hash``."""
+    refs = defaultdict(list)
+    raws = {}
+    for run_id, value in bind.execute(sa.text(f"SELECT id, {column} FROM project_runs WHERE {column} IS NOT NULL")):
+        digest, raw = _blob(value)
+        refs[digest].append(run_id)
+        raws[digest] = raw
+    if not refs:
+        return
+    bind.execute(
+        sa.text("""
+            INSERT INTO content_blobs (hash, data, size_bytes, refcount, created_at)
+            VALUES (:hash, :data, :size_bytes, :refcount, now())
+            ON CONFLICT (hash) DO UPDATE SET refcount = content_blobs.refcount + excluded.refcount
+        """),
+        [
+            {"hash": digest, "data": zlib.compress(raws[digest], 6), "size_bytes": len(raws[digest]),
+             "refcount": len(run_ids)}
+            for digest, run_ids in refs.items()
+        ],
+    )
+    bind.execute(
+        sa.text(f"UPDATE project_runs SET {column}_hash = :hash WHERE id = :id"),
+        [{"hash": digest, "id": run_id} for digest, run_ids in refs.items() for run_id in run_ids],
+    )
+
+
+def _restore_blobs(bind, column: str):
+    """Copy blob content back into ``project_runs.<column>`` (downgrade)."""
+    rows = bind.execute(sa.text(f"""
+        SELECT r.id, b.data FROM project_runs r JOIN content_blobs b ON b.hash = r.{column}_hash
+    """)).fetchall()
+    bind.execute(
+        sa.text(f"UPDATE project_runs SET {column} = CAST(:value AS JSONB) WHERE id = :id"),
+        [{"id": run_id, "value": zlib.decompress(data).decode()} for run_id, data in rows],
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if "config_overrides" not in {column["name"] for column in inspector.get_columns("projects")}:
+        op.add_column("projects", sa.Column("config_overrides", postgresql.JSONB(), nullable=True))
+
+    # init_db() may already have created the table on a fresh database
+    if not inspector.has_table("content_blobs"):
+        op.create_table(
+            "content_blobs",
+            sa.Column("hash", sa.String(64), primary_key=True),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("size_bytes", sa.Integer(), nullable=False),
+            sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    run_columns = {column["name"] for column in inspector.get_columns("project_runs")}
+    if "config_snapshot_hash" not in run_columns:
+        op.add_column(
+            "project_runs",
+            sa.Column("config_snapshot_hash", sa.String(64), sa.ForeignKey("content_blobs.hash"), nullable=True),
+        )
+        op.create_index("ix_project_runs_config_snapshot_hash", "project_runs", ["config_snapshot_hash"])
+    if "config_snapshot" in run_columns:
+        _store_blobs(bind, "config_snapshot")
+        op.drop_column("project_runs", "config_snapshot")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    op.add_column("project_runs", sa.Column("config_snapshot", postgresql.JSONB(), nullable=True))
+    _restore_blobs(bind, "config_snapshot")
+    op.execute("UPDATE project_runs SET config_snapshot = '{}'::jsonb WHERE config_snapshot IS NULL")
+    op.alter_column("project_runs", "config_snapshot", nullable=False)
+    op.drop_index("ix_project_runs_config_snapshot_hash", table_name="project_runs")
+    op.drop_column("project_runs", "config_snapshot_hash")
+    op.drop_table("content_blobs")
+    op.drop_column("projects", "config_overrides")
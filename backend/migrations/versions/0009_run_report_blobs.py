@@ -0,0 +1,107 @@
+"""Run final reports as content-addressed blobs
+
+Revision ID: 0009_run_report_blobs
+Revises: 0008_run_config_blobs
+Create Date: 2026-10-16 00:00:00.000000
+
+Moves each run's inline ``final_report`` JSON into ``content_blobs``
+(refcounted by the runs using it) behind ``final_report_hash``, then drops
+the column.
+"""
+from collections import defaultdict
+from alembic import op
+from sqlalchemy.dialects import postgresql
+import sqlalchemy as sa
+import hashlib
+import json
+import zlib
+
+revision = '0009_run_report_blobs'
+down_revision = '0008_run_config_blobs'
+branch_labels = None
+depends_on = None
+
+
+# Same encoding as app.services.blobs (canonical JSON, sha256, zlib level 6)
+def _blob(value):
+    raw = json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(raw).hexdigest(), raw
+
+
+def _store_blobs(bind, column: str):
+    """Move ``project_runs.<column>`` JSON into content_blobs; set ``<column>_hash``."""
+    refs = defaultdict(list)
+    raws = {}
+    for run_id, value in bind.execute(sa.text(f"SELECT id, {column} FROM project_runs WHERE {column} IS NOT NULL")):
+        digest, raw = _blob(value)
+        refs[digest].append(run_id)
+        raws[digest] = raw
+    if not refs:
+        return
+    bind.execute(
+        sa.text("""
+            INSERT INTO content_blobs (hash, data, size_bytes, refcount, created_at)
+            VALUES (:hash, :data, :size_bytes, :refcount, now())
+            ON CONFLICT (hash) DO UPDATE SET refcount = content_blobs.refcount + excluded.refcount
+        """),
+        [
+            {"hash": digest, "data": zlib.compress(raws[digest], 6), "size_bytes": len(raws[digest]),
+             "refcount": len(run_ids)}
+            for digest, run_ids in refs.items()
+        ],
+    )
+    bind.execute(
+        sa.text(f"UPDATE project_runs SET {column}_hash = :hash WHERE id = :id"),
+        [{"hash": digest, "id": run_id} for digest, run_ids in refs.items() for run_id in run_ids],
+    )
+
+
+def _restore_blobs(bind, column: str):
+    """Copy blob content back into ``project_runs.<column>`` and release the refs (downgrade)."""
+    rows = bind.execute(sa.text(f"""
+        SELECT r.id, r.{column}_hash, b.data FROM project_runs r JOIN content_blobs b ON b.hash = r.{column}_hash
+    """)).fetchall()
+    if not rows:
+        return
+    bind.execute(
+        sa.text(f"UPDATE project_runs SET {column} = CAST(:value AS JSONB) WHERE id = :id"),
+        [{"id": run_id, "value": zlib.decompress(data).decode()} for run_id, _, data in rows],
+    )
+    bind.execute(
+        sa.text("UPDATE content_blobs SET refcount = refcount - 1 WHERE hash = :hash"),
+        [{"hash": digest} for _, digest, _ in rows],
+    )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Normally created by 0008; kept so this revision stands on its own
+    if not inspector.has_table("content_blobs"):
+        op.create_table(
+            "content_blobs",
+            sa.Column("hash", sa.String(64), primary_key=True),
+            sa.Column("data", sa.LargeBinary(), nullable=False),
+            sa.Column("size_bytes", sa.Integer(), nullable=False),
+            sa.Column("refcount", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    run_columns = {column["name"] for column in inspector.get_columns("project_runs")}
+    if "final_report_hash" not in run_columns:
+        op.add_column(
+            "project_runs",
+            sa.Column("final_report_hash", sa.String(64), sa.ForeignKey("content_blobs.hash"), nullable=True),
+        )
+    if "final_report" in run_columns:
+        _store_blobs(bind, "final_report")
+        op.drop_column("project_runs", "final_report")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    op.add_column("project_runs", sa.Column("final_report", postgresql.JSONB(), nullable=True))
+    _restore_blobs(bind, "final_report")
+    op.drop_column("project_runs", "final_report_hash")
+    op.execute("DELETE FROM content_blobs WHERE refcount <= 0")
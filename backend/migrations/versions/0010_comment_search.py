@@ -0,0 +1,48 @@
+"""Comment full-text and substring search (tsvector column, pg_trgm indexes)
+
+Revision ID: 0010_comment_search
+Revises: 0009_run_report_blobs
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+
+revision = '0010_comment_search'
+down_revision = '0009_run_report_blobs'
+branch_labels = None
+depends_on = None
+
+# Same weights as app.services.comment_search (title > content > work_summary)
+UPGRADE = [
+    """
+    ALTER TABLE task_comments ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(work_summary, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_comment_search ON task_comments USING GIN (search_vector)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS idx_comment_title_trgm ON task_comments USING GIN (title gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS idx_comment_content_trgm ON task_comments USING GIN (content gin_trgm_ops)",
+]
+
+DOWNGRADE = [
+    "DROP INDEX IF EXISTS idx_comment_content_trgm",
+    "DROP INDEX IF EXISTS idx_comment_title_trgm",
+    "DROP EXTENSION IF EXISTS pg_trgm",
+    "DROP INDEX IF EXISTS idx_comment_search",
+    "ALTER TABLE task_comments DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def upgrade() -> None:
+    # Adding the stored column rewrites task_comments once to fill it
+    for statement in UPGRADE:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    for statement in DOWNGRADE:
+        op.execute(statement)
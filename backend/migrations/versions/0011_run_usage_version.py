@@ -0,0 +1,24 @@
+"""Separate usage change counter on runs (keeps task/comment ETags stable)
+
+Revision ID: 0011_run_usage_version
+Revises: 0010_comment_search
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011_run_usage_version'
+down_revision = '0010_comment_search'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("project_runs")}
+    if "usage_version" not in columns:
+        op.add_column("project_runs", sa.Column("usage_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade() -> None:
+    op.drop_column("project_runs", "usage_version")
@@ -0,0 +1,84 @@
+"""Benchmark a 500-task PM plan: one POST per task vs. POST /api/tasks/bulk.
+
+Runs the app in-process against DATABASE_URL. Each leg gets its own run so
+the two inserts don't interfere.
+
+Usage:
+    python scripts/bench_bulk_tasks.py --tasks 500
+"""
+import argparse
+import time
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def make_plan(task_count: int):
+    """A decomposition: 10 epics, the rest chained two-deep under them."""
+    tasks = []
+    for i in range(task_count):
+        item = {"temp_id": f"t{i}", "title": f"Planned task {i}", "priority": i % 11}
+        if i >= 10:
+            item["parent_task_id"] = f"t{i % 10}"
+        if i >= 20:
+            item["dependencies"] = [f"t{i - 10}"]
+        tasks.append(item)
+    return tasks
+
+
+def new_run(client: TestClient) -> str:
+    """Create a project and start a run."""
+    project = client.post("/api/projects", json={
+        "name": f"bench-bulk-{uuid4().hex[:8]}",
+        "requirements_text": "Bulk task creation benchmark",
+    }).json()
+    return client.post(f"/api/runs/projects/{project['id']}/start").json()["id"]
+
+
+def one_by_one(client: TestClient, run_id: str, plan) -> float:
+    """Create the plan with one POST /api/tasks per task."""
+    real_ids = {}
+    started = time.perf_counter()
+    for item in plan:
+        body = {
+            "project_run_id": run_id,
+            "title": item["title"],
+            "priority": item["priority"],
+            "parent_task_id": real_ids.get(item.get("parent_task_id")),
+            "dependencies": [real_ids[d] for d in item.get("dependencies", [])],
+        }
+        response = client.post("/api/tasks", json=body)
+        response.raise_for_status()
+        real_ids[item["temp_id"]] = response.json()["id"]
+    return time.perf_counter() - started
+
+
+def bulk(client: TestClient, run_id: str, plan) -> float:
+    """Create the plan with a single POST /api/tasks/bulk."""
+    started = time.perf_counter()
+    response = client.post("/api/tasks/bulk", json={"project_run_id": run_id, "tasks": plan})
+    response.raise_for_status()
+    return time.perf_counter() - started
+
+
+def main(args):
+    plan = make_plan(args.tasks)
+    with TestClient(app) as client:
+        single = one_by_one(client, new_run(client), plan)
+        batched = bulk(client, new_run(client), plan)
+
+    logger.info(f"one-by-one: {single * 1000:8.1f}ms ({args.tasks / single:7.1f} tasks/s)")
+    logger.info(f"      bulk: {batched * 1000:8.1f}ms ({args.tasks / batched:7.1f} tasks/s)")
+    logger.info(f"   speedup: {single / batched:.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=500)
+    main(parser.parse_args())
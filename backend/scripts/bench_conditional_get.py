@@ -0,0 +1,68 @@
+"""Benchmark dashboard reads: full responses vs. If-None-Match revalidation.
+
+Seeds a run with ``--rows`` tasks and one task with ``--rows`` comments in
+DATABASE_URL, then times each read endpoint as a plain GET and as a GET
+that sends back the ETag of the previous response (a 304 after one
+version lookup). ``--cache`` adds a leg served from the Redis response
+cache at REDIS_URL.
+
+Usage:
+    python scripts/bench_conditional_get.py --rows 500 --requests 200 [--cache]
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.core.database import init_db
+from app.main import app
+from app.services.events import get_redis
+from app.services.response_cache import ResponseCache, get_response_cache
+from scripts.bench_list_serialization import seed
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def time_get(client: httpx.AsyncClient, path: str, requests: int, revalidate: bool) -> float:
+    """Mean seconds per GET of ``path`` (after one warm-up request)."""
+    first = await client.get(path)
+    first.raise_for_status()
+    headers = {"If-None-Match": first.headers["etag"]} if revalidate else {}
+    expected = 304 if revalidate else 200
+    started = time.perf_counter()
+    for _ in range(requests):
+        assert (await client.get(path, headers=headers)).status_code == expected
+    return (time.perf_counter() - started) / requests
+
+
+async def main(args):
+    init_db()
+    run_id, task_id = seed(args.rows)
+    paths = {
+        "run": f"/api/runs/{run_id}",
+        "summary": f"/api/runs/{run_id}/summary?breakdown=true",
+        "task": f"/api/tasks/{task_id}",
+        "comments": f"/api/tasks/{task_id}/comments?limit={args.rows}",
+    }
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for name, path in paths.items():
+            full = await time_get(client, path, args.requests, revalidate=False)
+            not_modified = await time_get(client, path, args.requests, revalidate=True)
+            line = f"{name:>9}: 200 {full * 1000:7.2f}ms, 304 {not_modified * 1000:7.2f}ms"
+            if args.cache:
+                app.dependency_overrides[get_response_cache] = lambda: ResponseCache(get_redis, ttl=60)
+                cached = await time_get(client, path, args.requests, revalidate=False)
+                app.dependency_overrides.clear()
+                line += f", cached 200 {cached * 1000:7.2f}ms"
+            logger.info(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--cache", action="store_true", help="Also time the Redis response cache")
+    asyncio.run(main(parser.parse_args()))
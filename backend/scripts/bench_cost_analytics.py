@@ -0,0 +1,100 @@
+"""Benchmark cost breakdowns: per-record Python loop vs. the NumPy frame.
+
+Generates synthetic usage rows in memory (no database), so the numbers
+compare only the aggregation of the recorded costs: grouping by model, role
+and agent plus an hourly timeline.
+
+Usage:
+    python scripts/bench_cost_analytics.py --records 1000000
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from app.services.cost_analytics import UsageFrame
+from app.utils.pricing import get_pricing
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ROLES = ["PM", "Architect", "Developer", "QA", "Security", "DevOps"]
+
+
+def make_rows(count: int, seed: int = 0):
+    """(run, agent, role, model, input, output, cost, created_at) rows over one week.
+
+    Each row is priced once from the current table, as the ledger does when recording.
+    """
+    rng = random.Random(seed)
+    pricing = get_pricing()
+    models = list(pricing.table.models) + ["unlisted-model"]
+    start = datetime(2026, 1, 1)
+    rows = []
+    for _ in range(count):
+        role = rng.choice(ROLES)
+        model = rng.choice(models)
+        inputs, outputs = rng.randrange(100, 8000), rng.randrange(10, 2000)
+        price = pricing.price(model)
+        rows.append((
+            f"run_{rng.randrange(20)}",
+            f"{role.lower()}_{rng.randrange(3)}",
+            role,
+            model,
+            inputs,
+            outputs,
+            inputs * price.input + outputs * price.output,
+            start + timedelta(seconds=rng.randrange(7 * 86400)),
+        ))
+    return rows
+
+
+def naive(rows):
+    """The per-record loop: a Python add per record and group."""
+    groups = {key: defaultdict(float) for key in ("model", "role", "agent")}
+    timeline = defaultdict(float)
+    total = 0.0
+    for _, agent, role, model, inputs, outputs, cost, created_at in rows:
+        total += cost
+        groups["model"][model] += cost
+        groups["role"][role] += cost
+        groups["agent"][agent] += cost
+        timeline[created_at.replace(minute=0, second=0, microsecond=0)] += cost
+    return total, groups, timeline
+
+
+def vectorized(frame: UsageFrame):
+    return (
+        frame.totals()["cost_usd"],
+        {key: frame.group(key) for key in ("model", "role", "agent")},
+        frame.timeline(3600, 6),
+    )
+
+
+def main(args):
+    rows = make_rows(args.records)
+
+    started = time.perf_counter()
+    loop_total, _, _ = naive(rows)
+    loop_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    frame = UsageFrame.from_rows(rows)
+    load_time = time.perf_counter() - started
+    started = time.perf_counter()
+    numpy_total, _, _ = vectorized(frame)
+    numpy_time = time.perf_counter() - started
+
+    assert abs(loop_total - numpy_total) < 1e-6 * max(1.0, loop_total)
+    logger.info(f"      python loop: {loop_time * 1000:8.1f}ms ({args.records / loop_time:12,.0f} records/s)")
+    logger.info(f" numpy (columns): {load_time * 1000:8.1f}ms to build the frame")
+    logger.info(f"numpy (aggregate): {numpy_time * 1000:8.1f}ms ({args.records / numpy_time:12,.0f} records/s)")
+    logger.info(f"  speedup (aggregate): {loop_time / numpy_time:.1f}x, incl. load: {loop_time / (load_time + numpy_time):.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--records", type=int, default=1_000_000)
+    main(parser.parse_args())
@@ -0,0 +1,140 @@
+"""Benchmark GET /api/tasks throughput with NullPool vs. pooled vs. async engines.
+
+Runs the FastAPI app in-process (no network hop) against DATABASE_URL, so the
+numbers isolate connection handling from HTTP parsing. Seed a run with tasks
+first (``--seed``) to make the query non-trivial.
+
+Usage:
+    python scripts/bench_db_pool.py --seed 500 --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+from fastapi import Depends, Query
+from sqlalchemy import create_engine, desc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.config import settings
+from app.core.database import _engine_kwargs, get_async_db, get_db, get_db_context
+from app.core.models import Project, ProjectRun, Task, TaskStatus, TaskType
+from app.core.schemas import TaskResponse
+from app.main import app
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@app.get("/bench/tasks-async", include_in_schema=False)
+async def list_tasks_async(
+    project_run_id: str = Query(...),
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """Async mirror of list_tasks used for the async leg of the benchmark."""
+    result = await db.execute(
+        select(Task)
+        .where(Task.project_run_id == project_run_id)
+        .order_by(desc(Task.priority), Task.created_at)
+        .limit(limit)
+    )
+    return {"tasks": [TaskResponse.model_validate(t) for t in result.scalars()]}
+
+
+def seed_run(task_count: int) -> str:
+    """Create a throwaway project/run with ``task_count`` tasks."""
+    with get_db_context() as db:
+        project = Project(
+            id=str(uuid4()),
+            name=f"bench-{uuid4().hex[:8]}",
+            requirements_text="Benchmark project",
+        )
+        run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+        db.add_all([project, run])
+        db.flush()
+        db.add_all([
+            Task(
+                id=str(uuid4()),
+                project_run_id=run.id,
+                title=f"Benchmark task {i}",
+                task_type=TaskType.FEATURE,
+                status=TaskStatus.PENDING,
+                priority=i % 11,
+            )
+            for i in range(task_count)
+        ])
+        db.commit()
+        logger.info(f"✓ Seeded run {run.id} with {task_count} tasks")
+        return run.id
+
+
+async def drive(path: str, total: int, concurrency: int) -> float:
+    """Fire ``total`` GETs at ``path`` with bounded concurrency; return req/s."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        async def one():
+            async with semaphore:
+                response = await client.get(path)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return total / (time.perf_counter() - started)
+
+
+def use_sync_engine(pool_mode: str):
+    """Point get_db at a fresh engine built for ``pool_mode``."""
+    engine = create_engine(
+        settings.database_url,
+        **_engine_kwargs(settings.database_url, pool_mode=pool_mode),
+    )
+    factory = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    return engine
+
+
+async def main(args):
+    run_id = args.run_id or seed_run(args.seed)
+    results = {}
+
+    for mode in ("null", "queue"):
+        engine = use_sync_engine(mode)
+        results[mode] = await drive(
+            f"/api/tasks?project_run_id={run_id}&limit={args.limit}",
+            args.requests,
+            args.concurrency,
+        )
+        engine.dispose()
+    app.dependency_overrides.clear()
+
+    results["async"] = await drive(
+        f"/bench/tasks-async?project_run_id={run_id}&limit={args.limit}",
+        args.requests,
+        args.concurrency,
+    )
+
+    for mode, rps in results.items():
+        logger.info(f"{mode:>6}: {rps:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--run-id", help="Benchmark an existing run instead of seeding one")
+    parser.add_argument("--seed", type=int, default=200, help="Tasks to seed")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--limit", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
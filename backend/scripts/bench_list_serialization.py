@@ -0,0 +1,146 @@
+"""Benchmark list_tasks and list_comments: validated models vs. the row fast path.
+
+Seeds a run with ``--rows`` tasks and one task with ``--rows`` comments in
+DATABASE_URL, then serves the same page two ways in-process: the previous
+implementation (ORM objects, ``model_validate`` per row, re-validated
+through ``response_model``, stdlib JSON), registered here under /bench, and
+the current endpoints (column rows to dicts, orjson).
+
+Usage:
+    python scripts/bench_list_serialization.py --rows 500 --requests 200
+"""
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+import httpx
+from fastapi import Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from app.api.comments import COMMENT_SORT_KEY
+from app.api.tasks import TASK_SORT_KEY
+from app.core.database import get_db, get_db_context, init_db
+from app.core.models import CommentType, Project, ProjectRun, Task, TaskComment, TaskStatus, TaskType
+from app.core.schemas import TaskCommentListResponse, TaskCommentResponse, TaskListResponse, TaskResponse
+from app.main import app
+from app.utils.pagination import paginate
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@app.get("/bench/tasks-validated", response_model=TaskListResponse, response_class=JSONResponse, include_in_schema=False)
+def list_tasks_validated(
+    project_run_id: str = Query(...),
+    limit: int = Query(500),
+    db: Session = Depends(get_db),
+) -> TaskListResponse:
+    """list_tasks as it was: ORM rows validated per row, then again via response_model."""
+    query = db.query(Task).filter(Task.project_run_id == project_run_id)
+    total = query.count()
+    tasks, next_cursor = paginate(query, TASK_SORT_KEY, limit)
+    return TaskListResponse(tasks=[TaskResponse.model_validate(t) for t in tasks], total=total, next_cursor=next_cursor)
+
+
+@app.get(
+    "/bench/comments-validated", response_model=TaskCommentListResponse, response_class=JSONResponse,
+    include_in_schema=False,
+)
+def list_comments_validated(
+    task_id: str = Query(...),
+    limit: int = Query(500),
+    db: Session = Depends(get_db),
+) -> TaskCommentListResponse:
+    """list_comments (full view) as it was."""
+    query = db.query(TaskComment).filter(TaskComment.task_id == task_id)
+    total = query.count()
+    comments, next_cursor = paginate(query, COMMENT_SORT_KEY, limit)
+    return TaskCommentListResponse(
+        comments=[TaskCommentResponse.model_validate(c) for c in comments], total=total, next_cursor=next_cursor,
+    )
+
+
+def seed(rows: int):
+    """A run with ``rows`` tasks, the first of which has ``rows`` comments."""
+    with get_db_context() as db:
+        project = Project(id=str(uuid4()), name=f"bench-{uuid4().hex[:8]}", requirements_text="Benchmark project")
+        run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+        db.add_all([project, run])
+        db.flush()
+        tasks = [
+            Task(
+                id=str(uuid4()),
+                project_run_id=run.id,
+                title=f"Benchmark task {i}",
+                description="Implement the endpoint, its validation and tests. " * 4,
+                task_type=TaskType.FEATURE,
+                status=TaskStatus.PENDING,
+                priority=i % 11,
+                acceptance_criteria=["returns 201", "validates input", "has tests"],
+                estimate_hours=2.5,
+            )
+            for i in range(rows)
+        ]
+        db.add_all(tasks)
+        db.flush()
+        db.add_all([
+            TaskComment(
+                id=str(uuid4()),
+                task_id=tasks[0].id,
+                agent_id="dev_agent_1",
+                agent_role="Developer",
+                comment_type=CommentType.PROGRESS,
+                title=f"Progress update {i}",
+                content="Implemented the endpoint and its tests; refactored the validation layer. " * 6,
+                challenges=["flaky fixture"],
+                solutions=["isolated the database"],
+                files_modified=["src/api/users.py", "tests/test_users.py"],
+                metrics={"lines_added": 120, "coverage": 0.84},
+            )
+            for i in range(rows)
+        ])
+        db.commit()
+        logger.info(f"✓ Seeded run {run.id} with {rows} tasks and {rows} comments")
+        return run.id, tasks[0].id
+
+
+async def time_get(client: httpx.AsyncClient, path: str, requests: int) -> float:
+    """Mean seconds per GET of ``path`` (after one warm-up request)."""
+    (await client.get(path)).raise_for_status()
+    started = time.perf_counter()
+    for _ in range(requests):
+        (await client.get(path)).raise_for_status()
+    return (time.perf_counter() - started) / requests
+
+
+async def main(args):
+    init_db()
+    run_id, task_id = seed(args.rows)
+    legs = {
+        "list_tasks": (
+            f"/bench/tasks-validated?project_run_id={run_id}&limit={args.rows}",
+            f"/api/tasks?project_run_id={run_id}&limit={args.rows}",
+        ),
+        "list_comments": (
+            f"/bench/comments-validated?task_id={task_id}&limit={args.rows}",
+            f"/api/tasks/{task_id}/comments?limit={args.rows}",
+        ),
+    }
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        for name, (validated_path, fast_path) in legs.items():
+            validated = await time_get(client, validated_path, args.requests)
+            fast = await time_get(client, fast_path, args.requests)
+            logger.info(
+                f"{name:>14} ({args.rows} rows): validated {validated * 1000:7.2f}ms, "
+                f"fast path {fast * 1000:7.2f}ms ({validated / fast:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=200)
+    asyncio.run(main(parser.parse_args()))
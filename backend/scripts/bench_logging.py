@@ -0,0 +1,79 @@
+"""Benchmark log calls per second: synchronous JSON handler vs. the queued pipeline.
+
+Each leg logs the routers' typical emoji f-string at INFO from one or more
+threads and reports calls/s as seen by the caller. Output goes to
+/dev/null, so a real terminal or pipe only widens the gap. The queued legs
+also report how long the listener took to drain what was queued.
+
+Usage:
+    python scripts/bench_logging.py --calls 100000 --threads 4
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+
+from app.utils import logger as log_setup
+
+BENCH_LOGGER = "app.api.bench"
+
+
+def run_calls(calls: int, threads: int) -> float:
+    """Seconds for ``threads`` threads to make ``calls`` log calls in total."""
+    logger = logging.getLogger(BENCH_LOGGER)
+    per_thread = calls // threads
+
+    def work():
+        for i in range(per_thread):
+            logger.info(f"✅ Created task: Build the API part {i} (id=3f2b8c1e-{i:08d})")
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def sync_handler():
+    """The previous setup: format and write on the calling thread."""
+    log_setup.stop_logging()
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(log_setup.CustomJsonFormatter('%(timestamp)s %(level)s %(name)s %(message)s'))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def main(args):
+    sys.stdout = open(os.devnull, "w")
+    legs = [
+        ("sync JSON handler", sync_handler),
+        ("queued", lambda: log_setup.setup_logging("INFO", queue_size=args.calls)),
+        ("queued, 10% sampled", lambda: log_setup.setup_logging(
+            "INFO", queue_size=args.calls, sample_rate=0.1, sampled_loggers=[BENCH_LOGGER],
+        )),
+    ]
+    results = []
+    for name, configure in legs:
+        configure()
+        elapsed = run_calls(args.calls, args.threads)
+        started = time.perf_counter()
+        log_setup.stop_logging()  # returns once the queue is drained
+        results.append((name, elapsed, time.perf_counter() - started))
+
+    sys.stdout = sys.__stdout__
+    for name, elapsed, drain in results:
+        print(f"{name:>22}: {args.calls / elapsed:12,.0f} calls/s  (drain {drain * 1000:7.1f}ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100_000)
+    parser.add_argument("--threads", type=int, default=4)
+    main(parser.parse_args())
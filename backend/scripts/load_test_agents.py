@@ -0,0 +1,100 @@
+"""Load test: concurrent agents posting comments and listing tasks.
+
+Simulates an agent fleet against a running API: each agent loops posting a
+comment to its task and listing the run's tasks. Reports p50/p95/p99 latency
+per operation, so runs against different builds (or DB_POOL_MODE /
+API_THREADPOOL_SIZE settings) can be compared directly.
+
+Usage:
+    python scripts/load_test_agents.py --base-url http://localhost:8000 --agents 50 --iterations 40
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import defaultdict
+from uuid import uuid4
+
+import httpx
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile in milliseconds."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index] * 1000
+
+
+async def setup_run(client: httpx.AsyncClient, agents: int):
+    """Create a project, a run and one task per agent."""
+    project = (await client.post("/api/projects", json={
+        "name": f"load-test-{uuid4().hex[:8]}",
+        "requirements_text": "Load test project for concurrent agents",
+    })).json()
+    run = (await client.post(f"/api/runs/projects/{project['id']}/start")).json()
+
+    task_ids = []
+    for i in range(agents):
+        task = (await client.post("/api/tasks", json={
+            "project_run_id": run["id"],
+            "title": f"Load test task {i}",
+        })).json()
+        task_ids.append(task["id"])
+    return run["id"], task_ids
+
+
+async def agent_loop(client, agent_no, run_id, task_id, iterations, latencies):
+    """One agent: alternate posting a comment and listing tasks."""
+    for i in range(iterations):
+        started = time.perf_counter()
+        response = await client.post(f"/api/tasks/{task_id}/comments", json={
+            "agent_id": f"dev_agent_{agent_no}",
+            "agent_role": "Developer",
+            "comment_type": "PROGRESS",
+            "title": f"Progress update {i}",
+            "content": "Implemented the next slice of the feature and ran the tests.",
+        })
+        latencies["post_comment"].append(time.perf_counter() - started)
+        response.raise_for_status()
+
+        started = time.perf_counter()
+        response = await client.get("/api/tasks", params={"project_run_id": run_id})
+        latencies["list_tasks"].append(time.perf_counter() - started)
+        response.raise_for_status()
+
+
+async def main(args):
+    latencies = defaultdict(list)
+    limits = httpx.Limits(max_connections=args.agents, max_keepalive_connections=args.agents)
+
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=60) as client:
+        run_id, task_ids = await setup_run(client, args.agents)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            agent_loop(client, n, run_id, task_ids[n], args.iterations, latencies)
+            for n in range(args.agents)
+        ))
+        elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    logger.info(f"{args.agents} agents, {total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s)")
+    for op, samples in latencies.items():
+        logger.info(
+            f"{op:>13}: p50={percentile(samples, 50):7.1f}ms "
+            f"p95={percentile(samples, 95):7.1f}ms "
+            f"p99={percentile(samples, 99):7.1f}ms "
+            f"mean={statistics.mean(samples) * 1000:7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--agents", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=20)
+    asyncio.run(main(parser.parse_args()))
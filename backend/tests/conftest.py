@@ -1,22 +1,32 @@
 """Pytest configuration and fixtures."""
 import pytest
+from contextlib import contextmanager
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import StaticPool
 from app.core.models import Base
-from app.core.database import get_db
+from app.core.database import get_db, get_session_factory
 from app.main import app
+from app.services import event_hub, events
+from app.services.metrics import capture_queries, instrument_queries
 from fastapi.testclient import TestClient
+import fakeredis
+import fakeredis.aioredis
 
 
 @pytest.fixture(scope="session")
 def db_engine():
     """Create test database engine."""
-    # Use SQLite for testing
+    # Use SQLite for testing; StaticPool shares the one in-memory database
+    # with the threadpool that runs the route handlers
     engine = create_engine(
         "sqlite:///:memory:",
         connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
     )
     Base.metadata.create_all(bind=engine)
+    # What instrument_engine() does for the app's engine
+    instrument_queries(engine)
     return engine
 
 
@@ -30,6 +40,21 @@ def db_session(db_engine):
     session.close()
 
 
+@pytest.fixture(autouse=True)
+def fake_redis():
+    """Point event publishing and subscriptions at an in-process Redis."""
+    server = fakeredis.FakeServer()
+    sync_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    events.set_redis_clients(
+        sync_client,
+        fakeredis.aioredis.FakeRedis(server=server, decode_responses=True),
+    )
+    event_hub._hub = None
+    yield sync_client
+    events.set_redis_clients(None, None)
+    event_hub._hub = None
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """Create FastAPI test client with test database."""
@@ -37,5 +62,22 @@ def client(db_session):
         yield db_session
 
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: sessionmaker(bind=db_session.get_bind())
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def assert_max_queries(db_engine):
+    """Fail when a block runs more than ``n`` statements.
+
+    ``with assert_max_queries(3): client.get(...)`` (also usable as a
+    decorator on a helper); yields the list of captured statements.
+    """
+    @contextmanager
+    def check(n: int):
+        with capture_queries(db_engine) as statements:
+            yield statements
+        assert len(statements) <= n, f"{len(statements)} queries (max {n}):\n" + "\n".join(statements)
+
+    return check
@@ -0,0 +1,232 @@
+"""Tests for task comment endpoints."""
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.models import Project, ProjectRun, Task, TaskComment
+from app.core.schemas import TaskCommentBatchItem, TaskCommentResponse
+from app.main import app
+from app.services.comment_buffer import CommentWriteBuffer, get_comment_buffer
+from app.services.comment_stream import stream_comments
+from app.services.comments import comment_values
+from app.services.event_hub import RunEventHub
+
+
+@pytest.fixture
+def tasks(db_session: Session):
+    """Create a run with two tasks."""
+    project = Project(
+        id=str(uuid4()),
+        name=f"Comment Test {uuid4().hex[:8]}",
+        requirements_text="Build something testable",
+    )
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    tasks = [
+        Task(id=str(uuid4()), project_run_id=run.id, title=f"Commented task {i}")
+        for i in range(2)
+    ]
+    db_session.add_all([project, run, *tasks])
+    db_session.commit()
+    return tasks
+
+
+def comment_payload(task_id: str, n: int = 0) -> dict:
+    return {
+        "task_id": task_id,
+        "agent_id": "dev_agent_1",
+        "agent_role": "Developer",
+        "comment_type": "PROGRESS",
+        "title": f"Progress update {n}",
+        "content": "Implemented the endpoint and its tests.",
+    }
+
+
+def test_create_comments_batch(client: TestClient, db_session: Session, tasks):
+    """Test a batch spanning two tasks is committed in one request."""
+    batch = {"comments": [comment_payload(t.id, i) for i, t in enumerate(tasks)]}
+
+    response = client.post("/api/comments/batch", json=batch)
+    assert response.status_code == 201
+    data = response.json()
+    assert data["total"] == 2
+    assert data["durability"] == "commit"
+    assert db_session.query(TaskComment).filter(TaskComment.id.in_(data["comment_ids"])).count() == 2
+
+
+def test_create_comments_batch_unknown_task(client: TestClient, tasks):
+    """Test that a batch naming an unknown task is rejected."""
+    batch = {"comments": [comment_payload(tasks[0].id), comment_payload("missing")]}
+
+    response = client.post("/api/comments/batch", json=batch)
+    assert response.status_code == 404
+
+
+def test_create_comments_batch_enqueue(client: TestClient, db_engine, db_session: Session, tasks):
+    """Test ack-on-enqueue through the write-behind buffer."""
+    buffer = CommentWriteBuffer(sessionmaker(bind=db_engine), max_batch=50, flush_interval=0.01)
+    buffer.start()
+    app.dependency_overrides[get_comment_buffer] = lambda: buffer
+    try:
+        batch = {
+            "comments": [comment_payload(tasks[0].id, i) for i in range(5)],
+            "durability": "enqueue",
+        }
+        response = client.post("/api/comments/batch", json=batch)
+        assert response.status_code == 202
+        assert response.json()["durability"] == "enqueue"
+    finally:
+        buffer.stop()
+
+    assert buffer.flushed_rows == 5
+    assert db_session.query(TaskComment).filter(TaskComment.task_id == tasks[0].id).count() == 5
+
+
+def test_comment_buffer_fails_only_rejected_rows(db_engine, db_session: Session, tasks):
+    """Test that a row the database rejects does not fail the rest of its batch."""
+    buffer = CommentWriteBuffer(sessionmaker(bind=db_engine), max_batch=50, flush_interval=0.01)
+    rows = [
+        comment_values(tasks[0].id, TaskCommentBatchItem(**comment_payload(tasks[0].id, i)))
+        for i in range(5)
+    ]
+    rows[3]["id"] = rows[1]["id"]  # duplicate primary key
+    futures = buffer.submit(rows)
+    buffer.start()
+    buffer.stop()
+
+    assert [future.exception() is None for future in futures] == [True, True, True, False, True]
+    assert [futures[i].result() for i in (0, 1, 2, 4)] == [rows[i]["id"] for i in (0, 1, 2, 4)]
+    assert buffer.flushed_rows == 4
+    assert db_session.query(TaskComment).filter(TaskComment.task_id == tasks[0].id).count() == 4
+
+
+def _sse_ids(frames):
+    return [line[4:] for frame in frames for line in frame.splitlines() if line.startswith("id: ")]
+
+
+@pytest.mark.asyncio
+async def test_comment_stream_resumes_then_goes_live(client: TestClient, db_session: Session, tasks):
+    """Test replay after Last-Event-ID followed by live comments, holding no session while live."""
+    run_id = tasks[0].project_run_id
+    batch = {"comments": [comment_payload(tasks[i % 2].id, i) for i in range(3)]}
+    assert client.post("/api/comments/batch", json=batch).status_code == 201
+
+    hub = RunEventHub()
+    sessions = []
+
+    def session_factory():
+        sessions.append(Session(bind=db_session.get_bind()))
+        return sessions[-1]
+
+    stream = stream_comments(session_factory, hub, run_id)
+    replay = [await stream.__anext__() for _ in range(4)]  # retry hint + 3 comments
+    await stream.aclose()
+    first_id = _sse_ids(replay)[0]
+
+    stream = stream_comments(session_factory, hub, run_id, first_id)
+    resumed = [await stream.__anext__() for _ in range(3)]
+    assert _sse_ids(resumed) == _sse_ids(replay)[1:]
+    assert sessions and not any(session.in_transaction() for session in sessions)
+
+    response = client.post(f"/api/tasks/{tasks[0].id}/comments", json=comment_payload(tasks[0].id, 9))
+    live = await stream.__anext__()
+    assert response.json()["id"] in live
+    await stream.aclose()
+    assert hub.subscriber_count() == 0
+
+
+def test_comment_stream_invalid_last_event_id(client: TestClient, tasks):
+    """Test that a malformed resume token is rejected before streaming."""
+    response = client.get(
+        f"/api/runs/{tasks[0].project_run_id}/comments/stream",
+        headers={"Last-Event-ID": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+
+
+def test_list_comments_summary_view(client: TestClient, db_session: Session, tasks):
+    """Test that view=summary and fields= return only the projected columns."""
+    client.post("/api/comments/batch", json={"comments": [comment_payload(tasks[0].id, i) for i in range(2)]})
+    url = f"/api/tasks/{tasks[0].id}/comments"
+
+    summary = client.get(url, params={"view": "summary"}).json()["comments"]
+    assert len(summary) == 2
+    assert set(summary[0]) == {
+        "id", "task_id", "agent_id", "agent_role", "comment_type", "title", "needs_review", "created_at",
+    }
+
+    with_content = client.get(url, params={"fields": "content,metrics"}).json()["comments"]
+    assert with_content[0]["content"] == "Implemented the endpoint and its tests."
+    assert with_content[0]["metrics"] == {}
+    assert "approach" not in with_content[0]
+
+    full = client.get(url).json()["comments"]
+    assert "approach" in full[0]
+    # The row fast path serializes exactly like the validated schema
+    rows = db_session.query(TaskComment).filter(TaskComment.task_id == tasks[0].id).all()
+    validated = {c.id: TaskCommentResponse.model_validate(c).model_dump(mode="json") for c in rows}
+    assert full == [validated[c["id"]] for c in full]
+
+    assert client.get(url, params={"fields": "secret"}).status_code == 400
+    assert client.get(url, params={"view": "compact"}).status_code == 400
+
+
+def test_search_run_comments(client: TestClient, tasks):
+    """Test ranked full-text search, highlighting, paging and substring mode."""
+    run_id = tasks[0].project_run_id
+    comments = [
+        dict(comment_payload(tasks[0].id), title="Migration deadlock", content="The migration deadlocked on the tasks table."),
+        dict(comment_payload(tasks[1].id), title="Auth notes", content="Fixed a deadlock in auth_service.py retry loop."),
+        dict(comment_payload(tasks[1].id), title="Documentation", content="Wrote the README for the scheduler."),
+    ]
+    assert client.post("/api/comments/batch", json={"comments": comments}).status_code == 201
+    url = f"/api/runs/{run_id}/comments/search"
+
+    data = client.get(url, params={"q": "deadlock"}).json()
+    assert [hit["title"] for hit in data["hits"]] == ["Migration deadlock", "Auth notes"]  # title match ranks first
+    assert "<mark>" in data["hits"][1]["highlight"]
+
+    first = client.get(url, params={"q": "deadlock", "limit": 1}).json()
+    second = client.get(url, params={"q": "deadlock", "limit": 1, "cursor": first["next_cursor"]}).json()
+    assert [first["hits"][0]["id"], second["hits"][0]["id"]] == [hit["id"] for hit in data["hits"]]
+
+    substring = client.get(url, params={"q": "auth_service.py", "mode": "substring"}).json()
+    assert [hit["title"] for hit in substring["hits"]] == ["Auth notes"]
+    assert "<mark>auth_service.py</mark>" in substring["hits"][0]["highlight"]
+
+    assert client.get(url, params={"q": "ab", "mode": "substring"}).status_code == 400
+
+
+def test_file_and_commit_lookups(client: TestClient, tasks):
+    """Test file path/prefix -> tasks and commit -> comments lookups."""
+    sha = uuid4().hex[:12]
+    full_sha = (uuid4().hex + uuid4().hex)[:40].upper()
+    batch = [
+        dict(comment_payload(tasks[0].id), files_created=["./src/api/users.py", "src/api/users.py"], git_commits=[sha]),
+        dict(comment_payload(tasks[1].id), files_modified=["src/api/users.py", "src/app.py"]),
+    ]
+    assert client.post("/api/comments/batch", json={"comments": batch}).status_code == 201
+    single = dict(comment_payload(tasks[1].id), files_modified=["src/api/auth.py"], git_commits=[full_sha])
+    single.pop("task_id")
+    assert client.post(f"/api/tasks/{tasks[1].id}/comments", json=single).status_code == 201
+    run_id = tasks[0].project_run_id
+
+    exact = client.get("/api/files/tasks", params={"path": "src/api/users.py", "project_run_id": run_id}).json()
+    assert {task["task_id"] for task in exact["tasks"]} == {t.id for t in tasks}
+
+    under_api = client.get(
+        "/api/files/tasks", params={"path": "src/api/", "prefix": True, "project_run_id": run_id},
+    ).json()
+    assert [(t["task_id"], t["paths_matched"], t["comment_count"]) for t in under_api["tasks"]] == [
+        (tasks[1].id, 2, 2), (tasks[0].id, 1, 1),
+    ]
+
+    commit = client.get(f"/api/commits/{sha.upper()}/comments").json()
+    assert [c["task_id"] for c in commit["comments"]] == [tasks[0].id]
+    assert "content" not in commit["comments"][0]
+    for prefix in (full_sha.lower()[:7], full_sha.lower(), full_sha):
+        commit = client.get(f"/api/commits/{prefix}/comments").json()
+        assert [c["task_id"] for c in commit["comments"]] == [tasks[1].id], prefix
+    assert [c["task_id"] for c in client.get(f"/api/commits/{sha[:7]}/comments").json()["comments"]] == [tasks[0].id]
+    stored = client.get(f"/api/tasks/{tasks[1].id}/comments").json()["comments"]
+    assert [c["git_commits"] for c in stored if c["git_commits"]] == [[full_sha.lower()]]
+    assert client.get("/api/commits/not-a-sha/comments").status_code == 400
@@ -0,0 +1,108 @@
+"""Tests for run-versioned ETags and the shared response cache."""
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.core.models import Project, ProjectRun
+from app.main import app
+from app.services.response_cache import ResponseCache, get_response_cache
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def task_url(client: TestClient, db_session: Session) -> str:
+    """Create a run with one task; returns the task's URL."""
+    project = Project(id=str(uuid4()), name=f"ETag Test {uuid4().hex[:8]}", requirements_text="Cache it")
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add_all([project, run])
+    db_session.commit()
+    task = client.post("/api/tasks", json={"project_run_id": run.id, "title": "Revalidate me"}).json()
+    return f"/api/tasks/{task['id']}"
+
+
+@pytest.fixture
+def response_cache(fake_redis):
+    """Enable the response cache on fakeredis."""
+    cache = ResponseCache(lambda: fake_redis, ttl=60)
+    app.dependency_overrides[get_response_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.pop(get_response_cache, None)
+
+
+def comment(task_id: str) -> dict:
+    return {
+        "task_id": task_id,
+        "agent_id": "dev_agent_1",
+        "agent_role": "Developer",
+        "comment_type": "PROGRESS",
+        "title": "Progress update",
+        "content": "Implemented the endpoint and its tests.",
+    }
+
+
+def test_reads_revalidate_until_the_run_changes(client: TestClient, task_url: str):
+    """Test that run, summary, task and comment reads 304 until any write to the run."""
+    task = client.get(task_url).json()
+    run_id, task_id = task["project_run_id"], task["id"]
+    urls = [
+        f"/api/runs/{run_id}",
+        f"/api/runs/{run_id}/summary?breakdown=true",
+        task_url,
+        f"{task_url}/comments?view=summary",
+    ]
+
+    first = {url: client.get(url) for url in urls}
+    for url, response in first.items():
+        etag = response.headers["etag"]
+        assert etag.startswith('W/"') and response.headers["cache-control"] == "no-cache"
+        repeat = client.get(url, headers={"If-None-Match": etag})
+        assert (repeat.status_code, repeat.content, repeat.headers["etag"]) == (304, b"", etag)
+        # Dates cannot tell apart two writes within one second; only the ETag validates
+        since = client.get(url, headers={"If-Modified-Since": response.headers["last-modified"]})
+        assert since.status_code == 200
+
+    assert len({response.headers["etag"] for response in first.values()}) == len(urls)
+    other_params = client.get(f"/api/runs/{run_id}/summary", headers={"If-None-Match": first[urls[1]].headers["etag"]})
+    assert other_params.status_code == 200
+
+    # A comment is a write to the run: every cached representation goes stale
+    client.post("/api/comments/batch", json={"comments": [comment(task_id)]}).raise_for_status()
+    for url, response in first.items():
+        fresh = client.get(url, headers={"If-None-Match": response.headers["etag"]})
+        assert fresh.status_code == 200 and fresh.headers["etag"] != response.headers["etag"]
+    assert client.get(urls[3]).json()["total"] == 1
+
+
+def test_recorded_usage_only_changes_reads_that_show_spend(client: TestClient, task_url: str):
+    """Test that usage writes leave task and comment ETags valid but refresh run detail and summary."""
+    task = client.get(task_url).json()
+    run_id = task["project_run_id"]
+    unaffected = [task_url, f"{task_url}/comments"]
+    spend = [f"/api/runs/{run_id}", f"/api/runs/{run_id}/summary"]
+    etags = {url: client.get(url).headers["etag"] for url in unaffected + spend}
+
+    usage = {"model": "gpt-4o", "input_tokens": 1000, "output_tokens": 100}
+    assert client.post(f"/api/runs/{run_id}/usage", json=usage).status_code == 201
+
+    for url in unaffected:
+        assert client.get(url, headers={"If-None-Match": etags[url]}).status_code == 304
+    for url in spend:
+        assert client.get(url, headers={"If-None-Match": etags[url]}).status_code == 200
+
+
+def test_response_cache_serves_repeats_until_a_write(
+    client: TestClient, task_url: str, response_cache: ResponseCache, assert_max_queries,
+):
+    """Test that a repeated summary comes from Redis after one query, and a write invalidates it."""
+    run_id = client.get(task_url).json()["project_run_id"]
+    url = f"/api/runs/{run_id}/summary?breakdown=true"
+
+    missed = client.get(url)
+    with assert_max_queries(1):  # the version lookup
+        hit = client.get(url)
+    assert hit.json() == missed.json() and hit.headers["etag"] == missed.headers["etag"]
+    assert (response_cache.stats["hits"], response_cache.stats["misses"]) == (1, 1)
+
+    client.patch(task_url, json={"status": "IN_PROGRESS"}).raise_for_status()
+    updated = client.get(url).json()
+    assert updated["task_counts"]["in_progress"] == 1
+    assert response_cache.stats["misses"] == 2
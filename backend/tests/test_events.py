@@ -0,0 +1,80 @@
+"""Tests for run events (Redis pub/sub + WebSocket fan-out)."""
+import json
+import pytest
+import time
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.core.models import Project, ProjectRun
+from app.config import settings
+from app.services import events
+from app.services.events import encode_event, run_channel
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def run(db_session: Session) -> ProjectRun:
+    """Create a project with one run."""
+    project = Project(
+        id=str(uuid4()),
+        name=f"Events Test {uuid4().hex[:8]}",
+        requirements_text="Build something observable",
+    )
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add_all([project, run])
+    db_session.commit()
+    return run
+
+
+def test_mutations_publish_events(client: TestClient, fake_redis, run: ProjectRun):
+    """Test that task and comment writes publish on the run's channel."""
+    pubsub = fake_redis.pubsub()
+    pubsub.subscribe(run_channel(run.id))
+    pubsub.get_message()  # subscribe confirmation
+
+    task = client.post("/api/tasks", json={"project_run_id": run.id, "title": "Watch me"}).json()
+    client.patch(f"/api/tasks/{task['id']}", json={"status": "IN_PROGRESS"})
+    response = client.post(
+        f"/api/tasks/{task['id']}/comments",
+        json={
+            "agent_id": "dev-1",
+            "agent_role": "developer",
+            "comment_type": "PROGRESS",
+            "title": "Started work",
+            "content": "Schema drafted, starting on the API",
+        },
+    )
+    assert response.status_code == 201
+
+    events = []
+    while (message := pubsub.get_message()) is not None:
+        events.append(json.loads(message["data"]))
+    assert [e["type"] for e in events] == ["task.created", "task.updated", "comment.created"]
+    assert events[1]["status"] == "IN_PROGRESS"
+    assert events[2]["task_id"] == task["id"]
+    assert all(e["run_id"] == run.id for e in events)
+
+
+def test_websocket_receives_run_events(client: TestClient, fake_redis, run: ProjectRun):
+    """Test that a socket subscribed to a run receives its events."""
+    other = encode_event("other-run", "task.created", {"task_id": "x"})
+    event = encode_event(run.id, "task.updated", {"task_id": "t1", "status": "DONE"})
+
+    with client.websocket_connect(f"/ws/runs/{run.id}") as websocket:
+        fake_redis.publish(run_channel("other-run"), other)
+        fake_redis.publish(run_channel(run.id), event)
+        received = websocket.receive_json()
+
+    assert received["type"] == "task.updated"
+    assert received["task_id"] == "t1"
+
+
+def test_publish_gives_up_on_unreachable_redis(monkeypatch):
+    """Test that a best-effort publish to an unresponsive Redis fails fast instead of hanging the request."""
+    monkeypatch.setattr(settings, "redis_url", "redis://10.255.255.1:6379")  # non-routable
+    events.set_redis_clients(None, None)
+    client = events.get_redis()
+    assert client.connection_pool.connection_kwargs["socket_timeout"] == settings.redis_socket_timeout
+
+    started = time.monotonic()
+    events.publish_event("run-1", "run.updated", status="RUNNING")
+    assert time.monotonic() - started < settings.redis_connect_timeout + 1.0
@@ -0,0 +1,57 @@
+"""Tests for the queued logging pipeline and request ids."""
+import logging
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.core.models import Project, ProjectRun
+from app.utils.logger import DroppingQueueHandler, SamplingFilter
+from sqlalchemy.orm import Session
+
+
+def test_request_id_reaches_handler_logs_and_response(client: TestClient, db_session: Session, caplog):
+    """Test that a sync handler's records carry the caller's X-Request-ID, which is echoed back."""
+    project = Project(id=str(uuid4()), name=f"Log Test {uuid4().hex[:8]}", requirements_text="Log it")
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add_all([project, run])
+    db_session.commit()
+
+    with caplog.at_level(logging.INFO, logger="app.api.tasks"):
+        response = client.post(
+            "/api/tasks", json={"project_run_id": run.id, "title": "Trace me"}, headers={"X-Request-ID": "agent-42.step-7"},
+        )
+    assert response.headers["x-request-id"] == "agent-42.step-7"
+    created = [r for r in caplog.records if "Created task" in r.getMessage()]
+    assert created and created[0].request_id == "agent-42.step-7"
+
+    generated = client.get("/health", headers={"X-Request-ID": "bad id with spaces"}).headers["x-request-id"]
+    assert len(generated) == 32 and " " not in generated
+
+
+def test_sampling_and_queue_overflow():
+    """Test that only chatty INFO records are sampled and a full queue drops instead of blocking."""
+    sampler = SamplingFilter(0.0, ["app.api"])
+
+    def record(name, level, **extra):
+        made = logging.LogRecord(name, level, __file__, 1, "message %s", ("arg",), None)
+        made.__dict__.update(extra)
+        return made
+
+    assert not sampler.filter(record("app.api.tasks", logging.INFO))
+    assert sampler.filter(record("app.api.tasks", logging.WARNING))
+    assert sampler.filter(record("app.services.scheduler", logging.INFO))
+    assert sampler.filter(record("app.api.tasks", logging.INFO, sample=False))
+    assert sampler.sampled == 1
+
+    handler = DroppingQueueHandler(max_size=2)
+    for _ in range(3):
+        handler.handle(record("app.api.tasks", logging.INFO))
+    assert handler.dropped == 1
+    queued = handler.queue.get_nowait()
+    assert (queued.msg, queued.args) == ("message %s", ("arg",))  # formatting left to the listener
+
+    tags = ["a"]
+    mutable = logging.LogRecord("app.api.tasks", logging.INFO, __file__, 1, "tags %s", (tags,), None)
+    handler.queue.get_nowait()
+    handler.handle(mutable)
+    tags.append("b")  # after the call, before the listener would format it
+    queued = handler.queue.get_nowait()
+    assert (queued.getMessage(), queued.args) == ("tags ['a']", None)
@@ -0,0 +1,80 @@
+"""Tests for the metrics middleware, /metrics and /status."""
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session, sessionmaker
+from app import main
+from app.core.models import Project
+from app.services import budget_ledger
+from app.services.budget_ledger import BudgetLedger
+from app.services.metrics import REGISTRY, instrument_queries
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_metrics_record_route_templates_queries_and_budgets(
+    client: TestClient, db_engine, db_session: Session, monkeypatch,
+):
+    """Test latency by route template, per-request query counts and budget gauges."""
+    project = Project(id=str(uuid4()), name=f"Metrics {uuid4().hex[:8]}", requirements_text="Measure it")
+    db_session.add(project)
+    db_session.commit()
+    run_id = client.post(f"/api/runs/projects/{project.id}/start", json={}).json()["id"]
+
+    route = "/api/runs/{run_id}/budget"
+    requests = sample("http_request_duration_seconds_count", method="GET", route=route)
+    queries = sample("http_request_db_queries_sum", route=route)
+    tokens = sample("llm_tokens_total", model="gpt-4o", direction="input")
+
+    client.post(f"/api/runs/{run_id}/usage", json={"model": "gpt-4o-2024-08-06", "input_tokens": 1000, "output_tokens": 10})
+    assert client.get(f"/api/runs/{run_id}/budget").status_code == 200
+    client.get("/no/such/path")
+
+    assert sample("http_request_duration_seconds_count", method="GET", route=route) == requests + 1
+    assert sample("http_request_db_queries_sum", route=route) > queries
+    assert sample("http_requests_total", method="GET", route="unmatched", status="404") >= 1
+    assert sample("http_requests_in_flight") == 0
+    assert sample("llm_tokens_total", model="gpt-4o", direction="input") == tokens + 1000
+
+    ledger = BudgetLedger(sessionmaker(bind=db_engine))
+    monkeypatch.setattr(budget_ledger, "_ledger", ledger)
+    ledger.add_usage(run_id, "o3", 100, 100)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert f'budget_spent_tokens{{direction="input",run_id="{run_id}"}} 1100.0' in response.text
+    assert f'budget_spent_usd{{run_id="{run_id}"}}' in response.text
+
+
+def test_query_listeners_only_time_instrumented_engines():
+    """Test that statement timing is registered per engine, not on every Engine."""
+    engine = create_engine("sqlite://")
+
+    def timed_selects():
+        before = sample("db_query_duration_seconds_count", operation="SELECT")
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        return sample("db_query_duration_seconds_count", operation="SELECT") - before
+
+    assert timed_selects() == 0
+    instrument_queries(engine)
+    instrument_queries(engine)  # idempotent
+    assert timed_selects() == 1
+
+
+def test_status_checks_database_and_redis(client: TestClient, monkeypatch):
+    """Test that /status reports real dependency health."""
+    monkeypatch.setattr(main, "check_database", lambda: True)
+    response = client.get("/status")
+    assert response.status_code == 200
+    assert (response.json()["database"], response.json()["redis"]) == ("connected", "connected")
+
+    monkeypatch.setattr(main, "check_database", lambda: False)
+    response = client.get("/status")
+    assert response.status_code == 503
+    assert response.json()["status"] == "degraded"
+    assert response.json()["database"] == "unavailable"
@@ -0,0 +1,27 @@
+"""Tests for keyset pagination helpers."""
+import pytest
+from datetime import datetime
+from app.core.models import Task
+from app.utils.pagination import encode_cursor, decode_cursor
+
+TASK_SORT_KEY = [(Task.priority, True), (Task.created_at, False), (Task.id, False)]
+
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes back to typed sort-key values."""
+    created_at = datetime(2024, 1, 6, 20, 0, 0, 123456)
+    cursor = encode_cursor([7, created_at, "task-1"])
+
+    assert decode_cursor(cursor, TASK_SORT_KEY) == [7, created_at, "task-1"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor",
+    encode_cursor([7, "2024-01-06T20:00:00"]),
+    encode_cursor(["7", "2024-01-06T20:00:00", "task-1"]),
+    encode_cursor([7, "yesterday", "task-1"]),
+])
+def test_decode_invalid_cursor(cursor):
+    """Test that malformed cursors are rejected."""
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, TASK_SORT_KEY)
@@ -0,0 +1,52 @@
+"""Tests for the pricing registry and token estimates."""
+import json
+import os
+from app.utils import tokens
+from app.utils.pricing import PricingRegistry
+
+
+def write_table(path, version, gpt4o_input):
+    path.write_text(json.dumps({
+        "version": version,
+        "default_model": "gpt-4o-mini",
+        "tokenizers": {"o200k": {"chars_per_token": 4.0}},
+        "models": {
+            "gpt-4o": {"input": gpt4o_input, "output": 1.5e-5, "tokenizer": "o200k"},
+            "gpt-4o-mini": {"input": 1.5e-7, "output": 6e-7, "tokenizer": "o200k"},
+        },
+    }))
+
+
+def test_registry_hot_reloads_and_resolves_models(tmp_path):
+    """Test prefix resolution, unknown models and reloading a changed file."""
+    path = tmp_path / "pricing.json"
+    write_table(path, "v1", 5e-6)
+    registry = PricingRegistry(str(path), check_interval=0)
+
+    assert registry.price("gpt-4o-2024-08-06").model == "gpt-4o"
+    assert registry.price("gpt-4o-mini-2024-07-18").model == "gpt-4o-mini"
+    assert registry.price("mystery-model").model == "gpt-4o-mini"
+    assert registry.unknown_models == {"mystery-model"}
+
+    write_table(path, "v2", 2.5e-6)
+    os.utime(path, (1, 1))  # mtime resolution can hide a quick rewrite
+    assert registry.price("gpt-4o").input == 2.5e-6
+    assert registry.table.version == "v2"
+
+    path.write_text("{not json")
+    os.utime(path, (2, 2))
+    assert registry.table.version == "v2"  # a broken file keeps the last good table
+
+
+def test_estimate_tokens_memoizes_shared_prefixes():
+    """Test that estimates are plausible and repeated prefixes hit the chunk cache."""
+    assert tokens.estimate_tokens("") == 0
+    assert 8 <= tokens.estimate_tokens("Implement the /api/users endpoint with tests.", "gpt-4o") <= 14
+
+    system_prompt = "You are the developer agent. Follow the acceptance criteria exactly. " * 200
+    first = tokens.estimate_tokens(system_prompt + "Step 1: write the model.", "gpt-4o")
+    hits = tokens.cache_info().hits
+    second = tokens.estimate_tokens(system_prompt + "Step 2: write the migration.", "gpt-4o")
+
+    assert tokens.cache_info().hits - hits >= len(system_prompt) // tokens.CHUNK_SIZE
+    assert abs(second - first) <= 3
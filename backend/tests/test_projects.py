@@ -0,0 +1,29 @@
+"""Tests for projects endpoints."""
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+from app.core.models import Project
+from app.core.schemas import ProjectResponse
+
+
+def test_list_projects_serializes_like_the_schema(client: TestClient, db_session: Session):
+    """Test that the row fast path matches ProjectResponse, and pages by cursor."""
+    prefix = f"Listed {uuid4().hex[:8]}"
+    for i in range(3):
+        client.post("/api/projects", json={
+            "name": f"{prefix} {i}",
+            "requirements_text": "Build something listable",
+            "config_overrides": {"team": {"agents_count": i + 1}},
+        })
+
+    first = client.get("/api/projects", params={"limit": 2})
+    assert first.headers["content-type"] == "application/json"
+    page = first.json()
+    rest = client.get("/api/projects", params={"cursor": page["next_cursor"], "limit": 500}).json()
+    listed = page["projects"] + rest["projects"]
+    assert len(listed) == page["total"]
+
+    rows = {p.id: p for p in db_session.query(Project).filter(Project.name.startswith(prefix))}
+    mine = [p for p in listed if p["id"] in rows]
+    assert len(mine) == 3
+    assert mine == [ProjectResponse.model_validate(rows[p["id"]]).model_dump(mode="json") for p in mine]
@@ -0,0 +1,119 @@
+"""Query ceilings for the main endpoints, and the slow-query log."""
+import logging
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.config import settings
+
+# Statements per request on SQLite with the test session (which expires
+# objects on commit, so writes that return rows pay for a reload). Raise a
+# ceiling only with a reason; a jump usually means a new per-row query.
+LIMITS = {
+    "create template": 3,
+    "list templates": 2,
+    "get template": 1,
+    "create project": 4,
+    "list projects": 2,
+    "get project": 1,
+    "start run": 15,
+    "get run": 1,
+    "bulk tasks": 4,
+    "create task": 7,
+    "list tasks": 2,
+    "get task": 1,
+    "claim": 9,
+    "update task": 6,
+    "subtasks": 2,
+    "task tree": 2,
+    "run tree": 2,
+    "ready": 2,
+    "create comment": 6,
+    "batch comments": 4,
+    "list comments": 3,
+    "get comment": 1,
+    "search comments": 4,
+    "files": 1,
+    "usage": 4,
+    "budget": 2,
+    "model decision": 3,
+    "cost breakdown": 3,
+    "summary": 3,
+    "project runs": 3,
+}
+
+
+def test_endpoint_query_ceilings(client: TestClient, assert_max_queries):
+    """Walk a run's lifecycle, holding every request to its statement budget."""
+    def call(label, method, url, **kwargs):
+        with assert_max_queries(LIMITS[label]):
+            response = client.request(method, url, **kwargs)
+        assert response.status_code < 400, (label, response.text)
+        return response.json()
+
+    suffix = uuid4().hex[:8]
+    template = call("create template", "POST", "/api/templates", json={
+        "name": f"Budget {suffix}", "version": "1.0.0", "config_patch": {"team": {"agents_count": 3}},
+    })
+    call("list templates", "GET", "/api/templates")
+    call("get template", "GET", f"/api/templates/{template['id']}")
+    project = call("create project", "POST", "/api/projects", json={
+        "name": f"Budget {suffix}", "requirements_text": "Count queries", "template_id": template["id"],
+    })
+    call("list projects", "GET", "/api/projects")
+    call("get project", "GET", f"/api/projects/{project['id']}")
+    run = call("start run", "POST", f"/api/runs/projects/{project['id']}/start")
+    run_id = run["id"]
+    call("get run", "GET", f"/api/runs/{run_id}")
+    ids = call("bulk tasks", "POST", "/api/tasks/bulk", json={"project_run_id": run_id, "tasks": [
+        {"temp_id": f"t{i}", "title": f"Task {i}", "dependencies": [f"t{i - 1}"] if i else []} for i in range(20)
+    ]})["task_ids"]
+    task = call("create task", "POST", "/api/tasks", json={
+        "project_run_id": run_id, "title": "One more", "parent_task_id": ids["t0"], "dependencies": [ids["t1"], ids["t2"]],
+    })
+    call("list tasks", "GET", "/api/tasks", params={"project_run_id": run_id})
+    call("get task", "GET", f"/api/tasks/{task['id']}")
+    call("claim", "POST", "/api/tasks/claim", json={"project_run_id": run_id, "agent_id": "dev_1"})
+    call("update task", "PATCH", f"/api/tasks/{ids['t0']}", json={"status": "DONE"})
+    call("subtasks", "GET", f"/api/tasks/{ids['t0']}/subtasks")
+    call("task tree", "GET", f"/api/tasks/{ids['t0']}/tree")
+    call("run tree", "GET", f"/api/runs/{run_id}/tree")
+    call("ready", "GET", f"/api/runs/{run_id}/ready")
+    comment = {"task_id": task["id"], "agent_id": "dev_1", "agent_role": "Developer", "comment_type": "PROGRESS",
+               "title": "Progress", "content": "Implemented the endpoint.", "files_modified": ["src/app.py"]}
+    created = call("create comment", "POST", f"/api/tasks/{task['id']}/comments", json=comment)
+    call("batch comments", "POST", "/api/comments/batch", json={"comments": [comment] * 20})
+    call("list comments", "GET", f"/api/tasks/{task['id']}/comments")
+    call("get comment", "GET", f"/api/tasks/{task['id']}/comments/{created['id']}")
+    call("search comments", "GET", f"/api/runs/{run_id}/comments/search", params={"q": "progress"})
+    call("files", "GET", "/api/files/tasks", params={"path": "src/app.py", "project_run_id": run_id})
+    call("usage", "POST", f"/api/runs/{run_id}/usage", json={"model": "gpt-4o", "input_tokens": 10, "output_tokens": 1})
+    call("budget", "GET", f"/api/runs/{run_id}/budget")
+    call("model decision", "POST", f"/api/runs/{run_id}/model-decision", json={"role": "dev"})
+    call("cost breakdown", "GET", f"/api/runs/{run_id}/cost-breakdown")
+    call("summary", "GET", f"/api/runs/{run_id}/summary", params={"breakdown": True})
+    call("project runs", "GET", f"/api/projects/{project['id']}/runs")
+
+
+def test_slow_queries_and_budget_overruns_are_logged(client: TestClient, monkeypatch, caplog):
+    """Test that slow statements log their route (parameters only when enabled), and over-budget requests their repeats."""
+    run_id = f"missing-{uuid4().hex[:8]}"
+    monkeypatch.setattr(settings, "db_slow_query_ms", 1e-6)
+    monkeypatch.setattr(settings, "db_query_budget", 0)
+    with caplog.at_level(logging.WARNING, logger="app.services.metrics"):
+        client.get(f"/api/runs/{run_id}")
+    slow = [r.getMessage() for r in caplog.records if "Slow query" in r.getMessage()]
+    assert slow and "GET /api/runs/{run_id}" in slow[0] and run_id not in slow[0] and "<redacted>" in slow[0]
+
+    caplog.clear()
+    monkeypatch.setattr(settings, "db_slow_query_log_params", True)
+    with caplog.at_level(logging.WARNING, logger="app.services.metrics"):
+        client.get(f"/api/runs/{run_id}")
+    slow = [r.getMessage() for r in caplog.records if "Slow query" in r.getMessage()]
+    assert slow and run_id in slow[0]
+
+    caplog.clear()
+    monkeypatch.setattr(settings, "db_slow_query_ms", 0)
+    monkeypatch.setattr(settings, "db_query_budget", 1)
+    with caplog.at_level(logging.WARNING, logger="app.services.metrics"):
+        client.get("/api/projects")
+    overrun = [r.getMessage() for r in caplog.records if "budget 1" in r.getMessage()]
+    assert overrun and overrun[0].startswith("⚠️ GET /api/projects ran 2 queries")
@@ -0,0 +1,326 @@
+"""Tests for project run endpoints."""
+import pytest
+import threading
+from datetime import datetime, timedelta
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.models import ContentBlob, Project, ProjectRun, RunTaskCounters, Task, TaskStatus, TaskType, UsageRecord
+from app.services import blobs
+from app.services.budget_guard import BudgetGuard
+from app.services.budget_ledger import BudgetLedger, LedgerFullError
+from app.utils import tokens
+from app.utils.budget import BudgetTracker
+
+
+@pytest.fixture
+def project(db_session: Session) -> Project:
+    """Create a project."""
+    project = Project(
+        id=str(uuid4()),
+        name=f"Run Test {uuid4().hex[:8]}",
+        requirements_text="Build something testable",
+    )
+    db_session.add(project)
+    db_session.commit()
+    return project
+
+
+def test_run_summary_tracks_task_writes(client: TestClient, project: Project):
+    """Test that the summary counters follow task creation and transitions."""
+    run_id = client.post(f"/api/runs/projects/{project.id}/start").json()["id"]
+    task_ids = [
+        client.post("/api/tasks", json={
+            "project_run_id": run_id,
+            "title": f"Summary task {i}",
+            "estimate_hours": 2.0,
+        }).json()["id"]
+        for i in range(3)
+    ]
+    client.patch(f"/api/tasks/{task_ids[0]}", json={"status": "DONE", "actual_hours": 1.5})
+    client.patch(f"/api/tasks/{task_ids[1]}", json={"status": "IN_PROGRESS", "assigned_agent_id": "dev_1"})
+
+    response = client.get(f"/api/runs/{run_id}/summary", params={"breakdown": True})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["task_counts"]["total"] == 3
+    assert data["task_counts"]["done"] == 1
+    assert data["task_counts"]["in_progress"] == 1
+    assert data["task_counts"]["pending"] == 1
+    assert data["progress_percent"] == 33
+    assert data["hours"] == {"estimate": 6.0, "actual": 1.5}
+    assert data["task_counts_by_agent"] == {"dev_1": 1, "unassigned": 2}
+    assert data["task_counts_by_type"] == {"FEATURE": 3}
+
+
+def test_run_summary_computes_missing_counters(client: TestClient, db_session: Session, project: Project):
+    """Test that runs without a counters row are summarized from their tasks, without writing."""
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add(run)
+    db_session.add_all([
+        Task(id=str(uuid4()), project_run_id=run.id, title="Done task", status=TaskStatus.DONE),
+        Task(id=str(uuid4()), project_run_id=run.id, title="Test task", task_type=TaskType.TEST),
+    ])
+    db_session.commit()
+
+    data = client.get(f"/api/runs/{run.id}/summary").json()
+    assert data["task_counts"]["total"] == 2
+    assert data["task_counts"]["done"] == 1
+    assert data["progress_percent"] == 50
+    assert db_session.get(RunTaskCounters, run.id) is None
+
+
+def test_start_run_resolves_config_layers(client: TestClient, db_session: Session):
+    """Test defaults < template patch < project overrides < run overrides, with shared snapshots."""
+    template_id = client.post("/api/templates", json={
+        "name": f"Layered {uuid4().hex[:8]}",
+        "version": "1.0.0",
+        "config_patch": {"team": {"agents_count": 5}, "quality": {"complexity": "MVP"}},
+    }).json()["id"]
+    project_id = client.post("/api/projects", json={
+        "name": f"Layered Project {uuid4().hex[:8]}",
+        "requirements_text": "Build something configurable",
+        "template_id": template_id,
+        "config_overrides": {"team": {"max_parallel_tasks": 2}},
+    }).json()["id"]
+
+    first = client.post(f"/api/runs/projects/{project_id}/start").json()
+    second = client.post(f"/api/runs/projects/{project_id}/start").json()
+    custom = client.post(
+        f"/api/runs/projects/{project_id}/start",
+        json={"config_overrides": {"budget": {"max_usd": 9.0}}},
+    ).json()
+
+    config = custom["config_snapshot"]
+    assert config["team"]["agents_count"] == 5
+    assert config["team"]["max_parallel_tasks"] == 2
+    assert config["quality"]["complexity"] == "MVP"
+    assert config["quality"]["min_test_coverage"] == 0.7  # default
+    assert config["budget"]["max_usd"] == 9.0
+    assert first["config_snapshot_hash"] == second["config_snapshot_hash"]
+    assert custom["config_snapshot_hash"] != first["config_snapshot_hash"]
+    hashes = {run["config_snapshot_hash"] for run in (first, second, custom)}
+    blobs = db_session.query(ContentBlob).filter(ContentBlob.hash.in_(hashes)).all()
+    assert sorted(blob.refcount for blob in blobs) == [1, 2]
+
+
+def test_start_run_rejects_invalid_overrides(client: TestClient, project: Project):
+    """Test that overrides failing ProjectConfig validation are rejected."""
+    response = client.post(
+        f"/api/runs/projects/{project.id}/start",
+        json={"config_overrides": {"team": {"agents_count": 0}}},
+    )
+    assert response.status_code == 400
+    assert "Invalid config" in response.json()["detail"]
+
+
+def test_get_run_loads_blob_fields_on_request(client: TestClient, project: Project):
+    """Test that config_snapshot is only returned (and decompressed) when included."""
+    run_id = client.post(f"/api/runs/projects/{project.id}/start").json()["id"]
+
+    plain = client.get(f"/api/runs/{run_id}").json()
+    assert plain["config_snapshot"] is None
+    assert plain["config_snapshot_hash"]
+
+    full = client.get(f"/api/runs/{run_id}", params={"include": "config_snapshot,final_report"}).json()
+    assert full["config_snapshot"]["team"]["agents_count"] == 3
+    assert full["final_report"] is None
+
+    assert client.get(f"/api/runs/{run_id}", params={"include": "tasks"}).status_code == 400
+
+
+def test_blob_refcounts_and_purge(db_session: Session):
+    """Test that identical documents share a blob and unreferenced blobs are purged."""
+    report = {"summary": "done", "tasks": [{"id": i, "notes": "x" * 100} for i in range(50)]}
+    digest = blobs.put_blob(db_session, report)
+    assert blobs.put_blob(db_session, dict(reversed(report.items()))) == digest
+    db_session.commit()
+
+    blob = db_session.get(ContentBlob, digest)
+    assert blob.refcount == 2
+    assert len(blob.data) < blob.size_bytes
+    assert blob.value == report
+
+    new_digest = blobs.replace_blob(db_session, digest, {"summary": "redone"})
+    blobs.release_blob(db_session, digest)
+    db_session.commit()
+    assert blobs.purge_unreferenced(db_session) >= 1
+    assert db_session.get(ContentBlob, digest, populate_existing=True) is None
+    assert db_session.get(ContentBlob, new_digest) is not None
+
+
+def test_record_usage_updates_run_budget(client: TestClient, db_session: Session, project: Project):
+    """Test that reported usage is priced, recorded and checked against the run's budget."""
+    run_id = client.post(
+        f"/api/runs/projects/{project.id}/start",
+        json={"config_overrides": {"budget": {"max_usd": 0.1}}},
+    ).json()["id"]
+
+    response = client.post(f"/api/runs/{run_id}/usage", json={
+        "model": "gpt-4o", "input_tokens": 10000, "output_tokens": 2000, "agent_id": "dev_1",
+    })
+    assert response.status_code == 201
+    data = response.json()
+    assert data["cost_usd"] == pytest.approx(0.08)
+    assert data["budget"]["is_exceeded"] is False
+
+    client.post(f"/api/runs/{run_id}/usage", json={"model": "gpt-4o", "input_tokens": 5000, "output_tokens": 0})
+    budget = client.get(f"/api/runs/{run_id}/budget").json()
+    assert budget["spent_tokens"] == 17000
+    assert budget["is_exceeded"] is True
+
+    run = db_session.get(ProjectRun, run_id)
+    db_session.refresh(run)
+    assert (run.budget_spent_input_tokens, run.budget_spent_output_tokens) == (15000, 2000)
+    assert db_session.query(UsageRecord).filter(UsageRecord.project_run_id == run_id).count() == 2
+    assert client.post("/api/runs/missing/usage", json={"model": "o3", "input_tokens": 1, "output_tokens": 1}).status_code == 404
+
+
+def test_budget_ledger_concurrent_usage_loses_no_updates(db_engine, db_session: Session, project: Project):
+    """Test many threads recording usage for one run while the ledger flushes in batches."""
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add(run)
+    db_session.commit()
+
+    ledger = BudgetLedger(sessionmaker(bind=db_engine), flush_interval=0.005, max_batch=200)
+    ledger.tracker(run.id)  # warm the cache so the workers never touch the database
+    ledger.start()
+    threads_count, calls = 16, 500
+
+    def worker():
+        for _ in range(calls):
+            ledger.add_usage(run.id, "gpt-4o-mini", 100, 10)
+
+    threads = [threading.Thread(target=worker) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    ledger.stop()
+
+    total = threads_count * calls
+    assert ledger.pending == 0
+    assert ledger.flushed_records == total
+    assert ledger.flushed_batches < total  # batched, not one write per call
+    db_session.refresh(run)
+    assert run.budget_spent_input_tokens == 100 * total
+    assert run.budget_spent_output_tokens == 10 * total
+    assert run.budget_spent_usd_estimate == pytest.approx(total * (100 * 1.5e-7 + 10 * 6e-7))
+    assert db_session.query(UsageRecord).filter(UsageRecord.project_run_id == run.id).count() == total
+    assert ledger.tracker(run.id).total_tokens == 110 * total
+
+
+def test_budget_ledger_bounds_queue_drops_rejected_records_and_evicts(db_engine, db_session: Session, project: Project):
+    """Test the pending cap, requeue on an unreachable database, poison-row isolation and guard eviction."""
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add(run)
+    db_session.commit()
+
+    ledger = BudgetLedger(sessionmaker(bind=db_engine), max_pending=3, guard_ttl=60)
+    for _ in range(2):
+        ledger.add_usage(run.id, "gpt-4o-mini", 100, 10)
+    ledger._pending.insert(1, dict(ledger._pending[0], id=str(uuid4()), model=None))  # violates NOT NULL
+    with pytest.raises(LedgerFullError):
+        ledger.add_usage(run.id, "gpt-4o-mini", 100, 10)
+
+    working = ledger.session_factory
+    ledger.session_factory = sessionmaker(bind=create_engine("sqlite:////nonexistent/ledger.db"))
+    assert ledger.flush() == 0
+    assert ledger.pending == 3  # requeued, not dropped
+
+    ledger.session_factory = working
+    assert ledger.flush() == 2
+    assert (ledger.pending, ledger.dropped_records) == (0, 1)
+    db_session.refresh(run)
+    assert run.budget_spent_input_tokens == 200
+    assert run.id in ledger.guards()
+
+    ledger.expire(run.id)
+    ledger.flush()
+    assert ledger.guards() == {}
+    assert ledger.tracker(run.id).total_tokens == 220  # reloaded from the persisted totals
+
+
+def test_cost_breakdown_groups_and_buckets_usage(client: TestClient, db_session: Session, project: Project):
+    """Test run and project cost breakdowns at the prices recorded in the ledger."""
+    runs = [ProjectRun(id=str(uuid4()), project_id=project.id, run_number=i) for i in (1, 2)]
+    db_session.add_all(runs)
+    start = datetime(2026, 1, 1, 9, 0)
+    usage = [
+        # run, agent, role, model, input, output, cost, minutes after start
+        (runs[0], "dev_1", "Developer", "gpt-4o", 1000, 100, 0.0065, 0),
+        (runs[0], "dev_1", "Developer", "gpt-4o", 1000, 100, 0.005, 30),  # priced under an older table
+        (runs[0], "pm_1", "PM", "o3", 500, 50, 0.014, 70),
+        (runs[1], "qa_1", None, "gpt-4o-mini", 2000, 0, 0.0003, 10),
+    ]
+    db_session.add_all([
+        UsageRecord(
+            project_run_id=run.id, agent_id=agent, agent_role=role, model=model,
+            input_tokens=inputs, output_tokens=outputs, cost_usd=cost,
+            created_at=start + timedelta(minutes=minutes),
+        )
+        for run, agent, role, model, inputs, outputs, cost, minutes in usage
+    ])
+    db_session.commit()
+
+    data = client.get(f"/api/runs/{runs[0].id}/cost-breakdown", params={"bucket": "hour", "window": 2}).json()
+    assert data["total"]["calls"] == 3
+    assert data["total"]["cost_usd"] == pytest.approx(0.0065 + 0.005 + 0.014)  # not re-priced
+    assert [(g["key"], g["calls"]) for g in data["by_role"]] == [("PM", 1), ("Developer", 2)]
+    assert [g["key"] for g in data["by_model"]] == ["o3", "gpt-4o"]  # most expensive first
+    hours = data["timeline"]
+    assert [b["cost_usd"] for b in hours] == pytest.approx([0.0115, 0.014])
+    assert hours[1]["burn_rate_usd_per_hour"] == pytest.approx((0.0115 + 0.014) / 2)
+    assert data["projection"]["usd_remaining"] == pytest.approx(3.0)  # ledger columns untouched here
+
+    rollup = client.get(f"/api/projects/{project.id}/cost-breakdown").json()
+    assert rollup["total"]["calls"] == 4
+    assert {g["key"] for g in rollup["by_run"]} == {run.id for run in runs}
+    assert {g["key"] for g in rollup["by_role"]} == {"Developer", "PM", "unknown"}
+    assert client.get(f"/api/runs/{runs[0].id}/cost-breakdown", params={"bucket": "week"}).status_code == 400
+
+
+def test_budget_guard_degrades_ahead_of_limit():
+    """Test the guard's tiers, burn-rate projection and stop mode."""
+    models = {"model_by_role": {"dev": "o3", "docs": "gpt-4o-mini"}, "fallback_model": "gpt-4o"}
+    tracker = BudgetTracker(max_usd=1.0, max_tokens=10_000_000)
+    guard = BudgetGuard(tracker, models, horizon=600, half_life=300)
+
+    assert guard.decide("Dev", 1000, 500, now=0).model == "o3"
+    tracker.set_spent(0.85, 0, 0)
+    assert guard.decide("dev", 1000, 500, now=0)[:2] == ("degrade", "gpt-4o")
+    tracker.set_spent(0.96, 0, 0)
+    assert guard.decide("dev", 1000, 500, now=0)[:2] == ("degrade", "gpt-4o-mini")
+    assert guard.decide("docs", 1000, 500, now=0)[:2] == ("allow", "gpt-4o-mini")  # never "degrade" upwards
+
+    # A burst of spend projects past the limit before it is reached
+    tracker.set_spent(0.5, 0, 0)
+    for _ in range(10):
+        guard.observe(0.05, now=0)
+    assert guard.decide("dev", 1000, 500, now=0)[:2] == ("degrade", "gpt-4o-mini")
+    assert guard.decide("dev", 1000, 500, now=3600).model == "o3"  # burn rate decayed
+
+    stopper = BudgetGuard(tracker, models, on_exceed="stop")
+    tracker.set_spent(0.99, 0, 0)
+    assert stopper.decide("dev", 1000, 500, now=0)[:2] == ("stop", None)
+
+
+def test_model_decision_uses_run_config(client: TestClient, project: Project):
+    """Test the model-decision endpoint against a run's models and budget config."""
+    run_id = client.post(f"/api/runs/projects/{project.id}/start", json={"config_overrides": {
+        "models": {"model_by_role": {"dev": "o3"}, "fallback_model": "gpt-4o"},
+        "budget": {"max_usd": 0.1},
+    }}).json()["id"]
+    url = f"/api/runs/{run_id}/model-decision"
+
+    first = client.post(url, json={"role": "dev", "prompt_chars": 4000, "max_output_tokens": 500}).json()
+    assert (first["action"], first["model"]) == ("allow", "o3")
+    assert first["estimated_cost_usd"] == pytest.approx(tokens.estimate_tokens_from_length(4000, "o3") * 2e-5 + 500 * 8e-5)
+
+    client.post(f"/api/runs/{run_id}/usage", json={"model": "o3", "input_tokens": 2000, "output_tokens": 500})
+    degraded = client.post(url, json={"role": "dev", "prompt_tokens": 1000}).json()
+    assert degraded["action"] == "degrade"
+    assert degraded["model"] in {"gpt-4o", "gpt-4o-mini"}
+    assert degraded["burn_rate_usd_per_hour"] > 0
+    assert client.post("/api/runs/missing/model-decision", json={"role": "dev"}).status_code == 404
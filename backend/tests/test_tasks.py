@@ -0,0 +1,183 @@
+"""Tests for tasks endpoints."""
+import pytest
+from uuid import uuid4
+from fastapi.testclient import TestClient
+from app.core.models import Project, ProjectRun, Task
+from app.core.schemas import TaskResponse
+from app.services import config_resolver, scheduler
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture
+def run(db_session: Session) -> ProjectRun:
+    """Create a project with one run."""
+    project = Project(
+        id=str(uuid4()),
+        name=f"Task Test {uuid4().hex[:8]}",
+        requirements_text="Build something testable",
+    )
+    run = ProjectRun(id=str(uuid4()), project_id=project.id, run_number=1)
+    db_session.add_all([project, run])
+    db_session.commit()
+    return run
+
+
+def test_create_tasks_bulk(client: TestClient, db_session: Session, run: ProjectRun):
+    """Test creating a task tree with temp ID references."""
+    plan = {
+        "project_run_id": run.id,
+        "tasks": [
+            {"temp_id": "api", "title": "Build the API", "parent_task_id": "epic", "dependencies": ["db"]},
+            {"temp_id": "epic", "title": "User management epic"},
+            {"temp_id": "db", "title": "Design the schema", "parent_task_id": "epic", "priority": 8},
+        ],
+    }
+
+    response = client.post("/api/tasks/bulk", json=plan)
+    assert response.status_code == 201
+    data = response.json()
+    assert data["total"] == 3
+    ids = data["task_ids"]
+
+    api_task = db_session.query(Task).filter(Task.id == ids["api"]).one()
+    assert api_task.parent_task_id == ids["epic"]
+    assert api_task.dependencies == [ids["db"]]
+
+
+def test_create_tasks_bulk_rejects_cycle(client: TestClient, run: ProjectRun):
+    """Test that a dependency cycle is rejected before inserting."""
+    plan = {
+        "project_run_id": run.id,
+        "tasks": [
+            {"temp_id": "a", "title": "Task A first", "dependencies": ["b"]},
+            {"temp_id": "b", "title": "Task B second", "dependencies": ["a"]},
+        ],
+    }
+
+    response = client.post("/api/tasks/bulk", json=plan)
+    assert response.status_code == 400
+    assert "cycle" in response.json()["detail"]
+
+
+def test_create_tasks_bulk_epic_depends_on_subtasks(client: TestClient, db_session: Session, run: ProjectRun):
+    """Test that parent links and dependencies are separate graphs, and a cycle names only its members."""
+    plan = {
+        "project_run_id": run.id,
+        "tasks": [
+            {"temp_id": "epic", "title": "Ship the epic", "dependencies": ["api", "ui"]},
+            {"temp_id": "api", "title": "Build the API", "parent_task_id": "epic"},
+            {"temp_id": "ui", "title": "Build the UI", "parent_task_id": "epic", "dependencies": ["api"]},
+        ],
+    }
+    response = client.post("/api/tasks/bulk", json=plan)
+    assert response.status_code == 201
+    epic = db_session.get(Task, response.json()["task_ids"]["epic"])
+    assert epic.pending_dependencies == 2
+
+    plan["tasks"][1]["dependencies"] = ["ui"]
+    plan["tasks"].append({"temp_id": "docs", "title": "Write the docs", "dependencies": ["epic"]})
+    response = client.post("/api/tasks/bulk", json=plan)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Dependency cycle between: api, ui"
+
+
+def test_create_tasks_bulk_unknown_reference(client: TestClient, run: ProjectRun):
+    """Test that references to unknown tasks are rejected."""
+    plan = {
+        "project_run_id": run.id,
+        "tasks": [{"temp_id": "a", "title": "Task A first", "dependencies": ["missing"]}],
+    }
+
+    response = client.post("/api/tasks/bulk", json=plan)
+    assert response.status_code == 404
+
+
+def test_claim_follows_dependencies(client: TestClient, run: ProjectRun):
+    """Test that claims hand out ready tasks by priority and unblock dependents."""
+    ids = client.post("/api/tasks/bulk", json={
+        "project_run_id": run.id,
+        "tasks": [
+            {"temp_id": "schema", "title": "Design the schema", "priority": 3},
+            {"temp_id": "docs", "title": "Write the docs", "priority": 1},
+            {"temp_id": "api", "title": "Build the API", "priority": 9, "dependencies": ["schema"]},
+        ],
+    }).json()["task_ids"]
+
+    ready = client.get(f"/api/runs/{run.id}/ready").json()["tasks"]
+    assert [t["id"] for t in ready] == [ids["schema"], ids["docs"]]
+
+    claimed = client.post("/api/tasks/claim", json={"project_run_id": run.id, "agent_id": "dev_1"}).json()
+    assert claimed["task"]["id"] == ids["schema"]
+    assert claimed["task"]["status"] == "IN_PROGRESS"
+
+    client.patch(f"/api/tasks/{ids['schema']}", json={"status": "DONE"})
+    claimed = client.post("/api/tasks/claim", json={"project_run_id": run.id, "agent_id": "dev_2"}).json()
+    assert claimed["task"]["id"] == ids["api"]
+
+
+def test_claim_honors_max_parallel_tasks(client: TestClient, db_session: Session, run: ProjectRun):
+    """Test that claims stop at team.max_parallel_tasks."""
+    resolved = config_resolver.resolve_config({"team": {"max_parallel_tasks": 1}})
+    run.config_snapshot_hash = config_resolver.store_snapshot(db_session, resolved)
+    db_session.commit()
+    client.post("/api/tasks/bulk", json={
+        "project_run_id": run.id,
+        "tasks": [{"temp_id": f"t{i}", "title": f"Parallel task {i}"} for i in range(2)],
+    })
+
+    first = client.post("/api/tasks/claim", json={"project_run_id": run.id, "agent_id": "dev_1"}).json()
+    second = client.post("/api/tasks/claim", json={"project_run_id": run.id, "agent_id": "dev_2"}).json()
+    assert first["task"] is not None
+    assert second["task"] is None
+    assert "max_parallel_tasks" in second["reason"]
+    assert scheduler._parallel_limits[run.config_snapshot_hash] == 1
+
+
+def test_task_tree(client: TestClient, run: ProjectRun):
+    """Test loading a nested hierarchy with depth limit and projection."""
+    ids = client.post("/api/tasks/bulk", json={
+        "project_run_id": run.id,
+        "tasks": [
+            {"temp_id": "epic", "title": "User management"},
+            {"temp_id": "story", "title": "User signup", "parent_task_id": "epic"},
+            {"temp_id": "subtask", "title": "Signup form", "parent_task_id": "story"},
+        ],
+    }).json()["task_ids"]
+
+    data = client.get(f"/api/runs/{run.id}/tree", params={"fields": "title,status"}).json()
+    assert data["total"] == 3
+    epic = data["tasks"][0]
+    assert epic["id"] == ids["epic"]
+    assert set(epic) == {"id", "parent_task_id", "title", "status", "depth", "subtasks"}
+    assert epic["subtasks"][0]["subtasks"][0]["id"] == ids["subtask"]
+
+    data = client.get(f"/api/tasks/{ids['story']}/tree", params={"max_depth": 0}).json()
+    assert data["total"] == 1
+    assert data["tasks"][0]["subtasks"] == []
+
+    response = client.get(f"/api/tasks/{ids['epic']}/tree", params={"stream": True})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert len(response.text.splitlines()) == 3
+
+
+def test_list_tasks_serializes_like_the_schema(client: TestClient, db_session: Session, run: ProjectRun):
+    """Test that the row fast path matches TaskResponse, and pages by cursor."""
+    ids = client.post("/api/tasks/bulk", json={
+        "project_run_id": run.id,
+        "tasks": [
+            {"temp_id": f"t{i}", "title": f"Task {i}", "priority": i % 3, "estimate_hours": 1.5,
+             "acceptance_criteria": ["passes"], "dependencies": ["t0"] if i else []}
+            for i in range(5)
+        ],
+    }).json()["task_ids"]
+    client.patch(f"/api/tasks/{ids['t0']}", json={"status": "DONE", "actual_hours": 2.0})
+
+    first = client.get("/api/tasks", params={"project_run_id": run.id, "limit": 3})
+    assert first.headers["content-type"] == "application/json"
+    page = first.json()
+    rest = client.get("/api/tasks", params={"project_run_id": run.id, "cursor": page["next_cursor"]}).json()
+    listed = page["tasks"] + rest["tasks"]
+    assert page["total"] == 5 and len(listed) == 5
+
+    rows = {t.id: t for t in db_session.query(Task).filter(Task.project_run_id == run.id)}
+    assert listed == [TaskResponse.model_validate(rows[t["id"]]).model_dump(mode="json") for t in listed]
@@ -1,8 +1,13 @@
 """Tests for project templates endpoints."""
 import pytest
+import time
 from uuid import uuid4
 from fastapi.testclient import TestClient
 from app.core.models import ProjectTemplate
+from app.core.schemas import ProjectTemplateResponse
+from app.main import app
+from app.services import template_cache as template_cache_module
+from app.services.template_cache import TemplateCache, TTLCache, get_template_cache, list_key
 from sqlalchemy.orm import Session
 
 
@@ -77,3 +82,116 @@ def test_get_template_not_found(client: TestClient):
     """Test getting non-existent template."""
     response = client.get(f"/api/templates/nonexistent")
     assert response.status_code == 404
+
+
+@pytest.fixture
+def template_cache(fake_redis):
+    """Enable a fresh two-tier template cache (Redis tier on fakeredis)."""
+    cache = TemplateCache(TTLCache(max_size=100, ttl=60), redis_factory=lambda: fake_redis)
+    app.dependency_overrides[get_template_cache] = lambda: cache
+    yield cache
+    app.dependency_overrides.pop(get_template_cache, None)
+
+
+def template_payload(version: str) -> dict:
+    return {"name": "Cached", "version": version, "config_patch": {"team": {"agents_count": 2}}}
+
+
+def test_get_template_etag_revalidation(client: TestClient, template_cache):
+    """Test that a matching If-None-Match gets a 304 from the cache."""
+    template_id = client.post("/api/templates", json=template_payload("1.0.0")).json()["id"]
+
+    first = client.get(f"/api/templates/{template_id}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    second = client.get(f"/api/templates/{template_id}", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+
+    stats = client.get("/api/templates/cache-stats").json()
+    assert stats["misses"] == 1
+    assert stats["local_hits"] == 1
+
+
+def test_new_version_invalidates_version_list(client: TestClient, template_cache, fake_redis):
+    """Test that creating a version drops cached version lists in both tiers."""
+    client.post("/api/templates", json=template_payload("1.0.0"))
+    assert len(client.get("/api/templates/by-name/Cached").json()) == 1
+    assert fake_redis.exists("templates:versions:Cached")
+
+    client.post("/api/templates", json=template_payload("1.1.0"))
+    assert not fake_redis.exists("templates:versions:Cached")
+    assert [t["version"] for t in client.get("/api/templates/by-name/Cached").json()] == ["1.1.0", "1.0.0"]
+
+
+def test_redis_tier_serves_cold_process(client: TestClient, template_cache):
+    """Test that a process with an empty local tier is filled from Redis."""
+    template_id = client.post("/api/templates", json=template_payload("2.0.0")).json()["id"]
+    client.get(f"/api/templates/{template_id}")
+
+    template_cache.local.clear()
+    response = client.get(f"/api/templates/{template_id}")
+    assert response.status_code == 200
+    assert template_cache.stats["redis_hits"] == 1
+
+
+def test_list_templates_serializes_like_the_schema(client: TestClient, db_session: Session, template_cache):
+    """Test that listed (and cached) rows match ProjectTemplateResponse, with validators on every response."""
+    template_ids = [client.post("/api/templates", json=template_payload(f"3.0.{i}")).json()["id"] for i in range(2)]
+
+    first = client.get("/api/templates", params={"limit": 500})
+    cached = client.get("/api/templates", params={"limit": 500})
+    assert first.headers["content-type"] == "application/json"
+    assert first.headers["etag"] == cached.headers["etag"] and first.json() == cached.json()
+    assert cached.headers["cache-control"] == "no-cache"
+
+    listed = [t for t in first.json()["templates"] if t["id"] in template_ids]
+    rows = {t.id: t for t in db_session.query(ProjectTemplate).filter(ProjectTemplate.id.in_(template_ids))}
+    assert listed == [ProjectTemplateResponse.model_validate(rows[t["id"]]).model_dump(mode="json") for t in listed]
+
+
+def test_list_loaded_across_an_invalidation_is_not_cached(template_cache, fake_redis):
+    """Test that a list read racing a new version is served but not stored in either tier."""
+    key = list_key(skip=0, limit=10)
+
+    def loader():
+        template_cache.invalidate_name("Cached")  # another request creates a version mid-load
+        return {"templates": [], "total": 0}
+
+    assert template_cache.get_or_load(key, loader)["body"]["total"] == 0
+    assert template_cache.local.get(key) is None
+    assert not fake_redis.exists(f"templates:{key}")
+
+    template_cache.get_or_load(key, lambda: {"templates": [], "total": 0})
+    assert template_cache.local.get(key) is not None
+    assert fake_redis.exists(f"templates:{key}")
+
+
+def test_invalidation_listener_reconnects(template_cache, fake_redis, monkeypatch):
+    """Test that the listener survives a Redis failure and applies later invalidations."""
+    attempts = []
+
+    def flaky_redis():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise template_cache_module.redis.ConnectionError("connection refused")
+        return fake_redis
+
+    monkeypatch.setattr(template_cache_module, "get_redis", flaky_redis)
+    monkeypatch.setattr(template_cache_module, "LISTENER_BACKOFF_MIN", 0.01)
+    template_cache.listen()
+    try:
+        deadline = time.monotonic() + 5
+        while fake_redis.pubsub_numsub(template_cache_module.INVALIDATION_CHANNEL)[0][1] == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        invalidations = template_cache.stats["invalidations"]
+        template_cache.local.set("versions:Cached", {"etag": "x", "body": []})
+        fake_redis.publish(template_cache_module.INVALIDATION_CHANNEL, '{"name": "Cached"}')
+        while template_cache.local.get("versions:Cached") is not None:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+    finally:
+        template_cache.close()
+    assert template_cache.stats["invalidations"] > invalidations